@@ -42,6 +42,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'tinymce',
     'portfolio',
     'blog',
@@ -177,8 +178,60 @@ STATIC_ROOT = BASE_DIR / 'staticfiles'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
 
+# Chunked uploads are assembled here before becoming MediaFiles
+MEDIA_UPLOAD_STAGING_DIR = BASE_DIR / 'upload_staging'
+MEDIA_UPLOAD_CHUNK_SIZE = 5 * 1024 * 1024
+
+# Threads doing post-upload metadata and thumbnail work; 0 processes inline
+MEDIA_PROCESSING_WORKERS = int(os.getenv('MEDIA_PROCESSING_WORKERS', 2))
+
+# Hash uploads as they stream in so duplicates can be reused
+FILE_UPLOAD_HANDLERS = [
+    'media_manager.uploadhandlers.HashingMemoryFileUploadHandler',
+    'media_manager.uploadhandlers.HashingTemporaryFileUploadHandler',
+]
+
 AUTH_USER_MODEL = 'auth.User'
 
+# The page, fragment, category, pending comment and dashboard counter caches
+# are invalidated by bumping version keys in the default cache, so it must be
+# shared by every process serving the site. Without REDIS_URL the cache is
+# local to each process and those caches stay off (check utils.W001), unless
+# SINGLE_PROCESS_CACHE says only one process serves the site.
+REDIS_URL = os.getenv('REDIS_URL')
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        }
+    }
+SINGLE_PROCESS_CACHE = os.getenv('SINGLE_PROCESS_CACHE', '').lower() in ('1', 'true', 'yes')
+
+# Seconds dashboard widget counts are cached; 0 always queries the database
+DASHBOARD_COUNTERS_CACHE_TIMEOUT = 60
+
+# Seconds public pages are cached for anonymous visitors; 0 disables the page cache
+PAGE_CACHE_TIMEOUT = 10 * 60
+
+# Seconds cached blog template fragments (post cards, sidebars) are kept
+FRAGMENT_CACHE_TIMEOUT = 60 * 60
+
+# Seconds the blog category list is kept in the shared cache
+CATEGORY_CACHE_TIMEOUT = 60 * 60
+
+# Blog search. Leave SEARCH_BACKEND unset to use PostgreSQL full-text search
+# on PostgreSQL and the in-process inverted index elsewhere
+SEARCH_BACKEND = os.getenv('SEARCH_BACKEND')
+SEARCH_CONFIG = 'english'
+SEARCH_INDEX_PATH = BASE_DIR / 'search_index' / 'posts.idx'
+# Keywords whose ordered result ids are kept per process, and for how many seconds
+SEARCH_RESULT_CACHE_SIZE = 256
+SEARCH_RESULT_CACHE_TIMEOUT = 5 * 60
+
+# Points SEARCH_INDEX_PATH at a temporary directory while tests run
+TEST_RUNNER = 'utils.test_runner.TestRunner'
+
 EMAIL_BACKEND = 'utils.gmail_backend.GmailAPIBackend'
 
 # Gmail API settings
@@ -1,6 +1,10 @@
+import os
+
 from django.http import JsonResponse
 from django.core.files.storage import default_storage
 from django.views.decorators.csrf import csrf_exempt
+from media_manager.metadata import upload_digest
+from media_manager.models import MediaFile
 
 @csrf_exempt
 def tinymce_upload(request):
@@ -11,7 +15,18 @@ def tinymce_upload(request):
     if not file:
         return JsonResponse({'error': 'No file provided'}, status=400)
     
-    filename = default_storage.save(f'tinymce/{file.name}', file)
+    digest = upload_digest(file)
+    
+    # Same content already in the media library
+    existing = MediaFile.objects.find_by_digest(digest)
+    if existing:
+        return JsonResponse({'location': existing.file.url})
+    
+    # Content-addressed name so re-uploading an image reuses the stored copy
+    name, ext = os.path.splitext(file.name)
+    filename = f'tinymce/{digest[:12]}-{name}{ext}'
+    if not default_storage.exists(filename):
+        filename = default_storage.save(filename, file)
     file_url = default_storage.url(filename)
     
-    return JsonResponse({'location': file_url})
\ No newline at end of file
+    return JsonResponse({'location': file_url})
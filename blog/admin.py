@@ -3,12 +3,19 @@ from django.contrib import admin
 from django.utils.html import format_html
 from django.utils import timezone
 from .models import Post, Page, Category, Comment, UserProfile
+from .counters import refresh_category_counts, refresh_comment_counts, reset_pending_comment_count
+from .page_cache import comment_tags
+from .search import reindex_posts
+from dashboard.counters import invalidate_counters
+from utils.page_cache import invalidate_pages
 
 
 class BaseContentAdmin(admin.ModelAdmin):
     prepopulated_fields = {'slug': ('title',)}
     date_hierarchy = 'published_date'
     actions = ['move_to_trash', 'restore_from_trash', 'mark_as_published', 'mark_as_draft']
+    # Cached public pages showing this model; update() below sends no signals
+    page_cache_tag = None
     
     def get_queryset(self, request):
         return self.model.all_objects.get_queryset()
@@ -43,10 +50,14 @@ class BaseContentAdmin(admin.ModelAdmin):
     
     def mark_as_published(self, request, queryset):
         queryset.update(status='published', published_date=timezone.now())
+        invalidate_counters()
+        invalidate_pages(self.page_cache_tag)
     mark_as_published.short_description = 'Mark as published'
     
     def mark_as_draft(self, request, queryset):
         queryset.update(status='draft')
+        invalidate_counters()
+        invalidate_pages(self.page_cache_tag)
     mark_as_draft.short_description = 'Mark as draft'
 
 
@@ -56,6 +67,7 @@ class PostAdmin(BaseContentAdmin):
     list_filter = ['status', 'is_featured', 'is_trashed', 'category', 'created_at']
     search_fields = ['title', 'content', 'author_name']
     filter_horizontal = ['category']
+    page_cache_tag = 'posts'
     
     fieldsets = [
         ('Basic Information', {
@@ -84,6 +96,19 @@ class PostAdmin(BaseContentAdmin):
         if not change and not obj.author:
             obj.author = request.user
         super().save_model(request, obj, form, change)
+    
+    # QuerySet.update() sends no signals, so refresh counters and the search index here
+    def mark_as_published(self, request, queryset):
+        super().mark_as_published(request, queryset)
+        refresh_category_counts(queryset.values_list('category', flat=True))
+        reindex_posts(queryset.values_list('pk', flat=True))
+    mark_as_published.short_description = 'Mark as published'
+    
+    def mark_as_draft(self, request, queryset):
+        super().mark_as_draft(request, queryset)
+        refresh_category_counts(queryset.values_list('category', flat=True))
+        reindex_posts(queryset.values_list('pk', flat=True))
+    mark_as_draft.short_description = 'Mark as draft'
 
 
 @admin.register(Page)
@@ -91,6 +116,7 @@ class PageAdmin(BaseContentAdmin):
     list_display = ['title', 'status_badge', 'published_date', 'page_views']
     list_filter = ['status', 'is_trashed', 'created_at']
     search_fields = ['title', 'content']
+    page_cache_tag = 'pages'
     
     fieldsets = [
         ('Basic Information', {
@@ -112,8 +138,9 @@ class CategoryAdmin(admin.ModelAdmin):
     search_fields = ['name', 'description']
     
     def post_count(self, obj):
-        return obj.posts.filter(is_trashed=False).count()
-    post_count.short_description = 'Posts'
+        return obj.published_post_count
+    post_count.short_description = 'Published posts'
+    post_count.admin_order_field = 'published_post_count'
 
 @admin.register(Comment)
 class CommentAdmin(admin.ModelAdmin):
@@ -123,7 +150,12 @@ class CommentAdmin(admin.ModelAdmin):
     actions = ['approve_comments']
 
     def approve_comments(self, request, queryset):
+        post_ids = list(queryset.values_list('post_id', flat=True).distinct())
         queryset.update(approved=True)
+        refresh_comment_counts(post_ids)
+        invalidate_counters()
+        invalidate_pages(*comment_tags(post_ids))
+        reset_pending_comment_count()
     approve_comments.short_description = "Approve selected comments"
 
 @admin.register(UserProfile)
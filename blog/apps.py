@@ -1,6 +1,15 @@
 from django.apps import AppConfig
+from django.core import checks
 
 
 class BlogConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'blog'
+
+    def ready(self):
+        # Connect the signal handlers that maintain counters and caches
+        from . import category_cache, counters, fragment_cache, page_cache  # noqa: F401
+        from .search import signals  # noqa: F401
+
+        from utils.cache import check_shared_cache
+        checks.register(check_shared_cache, checks.Tags.caches)
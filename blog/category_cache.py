@@ -0,0 +1,53 @@
+"""
+Two-level cache for the category list shown in the blog navigation and sidebars.
+
+Each process keeps the last list it built next to the cache version it was
+built for, so a warm request costs one shared-cache read (the version
+number) and no queries. Saving or deleting a category, or any change to a
+category's published post count, bumps the version and every process
+rebuilds on its next read. Without a shared cache the list is queried on
+every read.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from utils.cache import bump_cache_version, get_cache_version, is_shared_cache, versioned_key
+
+from .models import Category
+
+NAMESPACE = 'categories'
+
+_process_cache = {}
+
+
+def get_cached_categories():
+    """All categories in display order, as a list"""
+    if not is_shared_cache():
+        # Other processes would never see this one's invalidations
+        return list(Category.objects.order_by('order'))
+    version = get_cache_version(NAMESPACE)
+    cached = _process_cache.get('categories')
+    if cached is not None and cached[0] == version:
+        return cached[1]
+
+    key = versioned_key(NAMESPACE, 'list')
+    categories = cache.get(key)
+    if categories is None:
+        categories = list(Category.objects.order_by('order'))
+        cache.set(key, categories, getattr(settings, 'CATEGORY_CACHE_TIMEOUT', 60 * 60))
+
+    # A single assignment, so concurrent threads never see a half-built entry
+    _process_cache['categories'] = (version, categories)
+    return categories
+
+
+def invalidate_categories():
+    bump_cache_version(NAMESPACE)
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def category_changed(sender, **kwargs):
+    invalidate_categories()
@@ -0,0 +1,52 @@
+"""
+Text derived from the HTML body of a post or page.
+
+Stripping tags from the body is the costly part of saving, and the editor's
+autosave saves every few seconds. The derived values (plain text, word
+count, read time) are therefore stored on the row and recomputed only when
+a hash of the body changes; saves that leave ``content`` out of
+``update_fields`` don't even hash it.
+"""
+import hashlib
+import html
+import math
+
+from django.utils.html import strip_tags
+from django.utils.text import Truncator
+
+WORDS_PER_MINUTE = 200
+
+# Length of the excerpt shown for posts without one
+SUMMARY_WORDS = 30
+
+# Stored by derive_text(); added to update_fields when content is saved
+DERIVED_FIELDS = ('plain_text', 'word_count', 'read_time', 'content_hash')
+
+
+def html_to_text(value):
+    """Visible text of an HTML fragment, entities decoded and whitespace collapsed"""
+    return ' '.join(html.unescape(strip_tags(value or '')).split())
+
+
+def content_hash(value):
+    return hashlib.sha256((value or '').encode()).hexdigest()
+
+
+def read_time(word_count):
+    return math.ceil(word_count / WORDS_PER_MINUTE) if word_count > 0 else 0
+
+
+def derive_text(instance):
+    """Refresh the stored text of ``instance`` if its body changed; True if it did"""
+    digest = content_hash(instance.content)
+    if digest == instance.content_hash:
+        return False
+    instance.plain_text = html_to_text(instance.content)
+    instance.word_count = len(instance.plain_text.split())
+    instance.read_time = read_time(instance.word_count)
+    instance.content_hash = digest
+    return True
+
+
+def summarize(text, words=SUMMARY_WORDS):
+    return Truncator(text).words(words)
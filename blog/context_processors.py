@@ -1,13 +1,10 @@
-from .models import Category
-from django.db.models import Count, Q
+from django.utils.functional import SimpleLazyObject
+
+from .category_cache import get_cached_categories
 
-def get_categories(request):
-    categories = list(
-        Category.objects.annotate(
-            posts_count=Count('posts', filter=Q(posts__status='published'))
-        ).order_by('order') 
-    )
 
+def get_categories(request):
+    """Categories for the navigation; only loaded if a template uses them"""
     return {
-        'categories': categories
+        'categories': SimpleLazyObject(get_cached_categories)
     }
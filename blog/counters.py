@@ -0,0 +1,174 @@
+"""
+Denormalized counters on Category and Post.
+
+``Category.published_post_count`` and ``Post.approved_comment_count`` are
+recomputed for just the affected rows whenever a post is published,
+unpublished, trashed or re-categorised, or a comment is approved or
+removed. Each refresh is a single correlated ``UPDATE``, so the stored value
+is always exact rather than drifting like ``F() + 1`` increments can.
+Bulk ``QuerySet.update()`` calls bypass signals and must call the refresh
+functions themselves; ``recount_blog_counters`` repairs everything.
+
+The site-wide number of comments awaiting moderation is a running counter
+in the cache instead: it is counted once, then incremented and decremented
+as comments are created, approved, unapproved and deleted. Without a cache
+shared by every process it is counted on each read.
+"""
+from django.core.cache import cache
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.db.models.signals import m2m_changed, post_delete, post_init, post_save, pre_delete
+from django.dispatch import receiver
+
+from utils.cache import is_shared_cache
+
+from .category_cache import invalidate_categories
+from .models import Category, Comment, Post
+
+PENDING_COMMENTS_KEY = 'comments:pending'
+# Upper bound on how long a drifted count can survive
+PENDING_COMMENTS_TIMEOUT = 60 * 60
+
+
+def refresh_category_counts(category_ids=None):
+    """Recount published posts for the given categories, or all of them"""
+    published = (
+        Post.objects.published()
+        .filter(category=OuterRef('pk'))
+        .order_by()
+        .values('category')
+        .annotate(count=Count('id'))
+        .values('count')
+    )
+    categories = Category.objects.all()
+    if category_ids is not None:
+        categories = categories.filter(pk__in=category_ids)
+    updated = categories.update(published_post_count=Coalesce(Subquery(published), 0))
+    if updated:
+        invalidate_categories()
+    return updated
+
+
+def refresh_comment_counts(post_ids=None):
+    """Recount approved comments for the given posts, or all of them"""
+    approved = (
+        Comment.objects.filter(post=OuterRef('pk'), approved=True)
+        .order_by()
+        .values('post')
+        .annotate(count=Count('id'))
+        .values('count')
+    )
+    posts = Post.all_objects.all()
+    if post_ids is not None:
+        posts = posts.filter(pk__in=post_ids)
+    return posts.update(approved_comment_count=Coalesce(Subquery(approved), 0))
+
+
+def pending_comment_count():
+    """Number of comments awaiting approval"""
+    if not is_shared_cache():
+        # Each process would adjust its own copy of the running count
+        return Comment.objects.filter(approved=False).count()
+    count = cache.get(PENDING_COMMENTS_KEY)
+    if count is None:
+        count = Comment.objects.filter(approved=False).count()
+        cache.add(PENDING_COMMENTS_KEY, count, PENDING_COMMENTS_TIMEOUT)
+    return count
+
+
+def reset_pending_comment_count():
+    """Forget the running count; the next read recounts"""
+    cache.delete(PENDING_COMMENTS_KEY)
+
+
+def _adjust_pending(delta):
+    try:
+        if delta > 0:
+            count = cache.incr(PENDING_COMMENTS_KEY, delta)
+        else:
+            count = cache.decr(PENDING_COMMENTS_KEY, -delta)
+    except ValueError:
+        # Not cached yet; the next read counts from the database
+        return
+    if count < 0:
+        reset_pending_comment_count()
+
+
+def _is_public(post):
+    return post.status == 'published' and not post.is_trashed
+
+
+def _loaded(instance, *fields):
+    # Reading a deferred field would cost a query per instance
+    deferred = instance.get_deferred_fields()
+    return not any(field in deferred for field in fields)
+
+
+@receiver(post_init, sender=Post)
+def remember_post_state(sender, instance, **kwargs):
+    # None means unknown: the next save refreshes unconditionally
+    instance._counted_public = _is_public(instance) if _loaded(instance, 'status', 'is_trashed') else None
+
+
+@receiver(post_save, sender=Post)
+def post_saved(sender, instance, created, **kwargs):
+    is_public = _is_public(instance) if _loaded(instance, 'status', 'is_trashed') else None
+    if not created and (is_public is None or is_public != instance._counted_public):
+        refresh_category_counts(instance.category.values_list('pk', flat=True))
+    instance._counted_public = is_public
+
+
+@receiver(pre_delete, sender=Post)
+def post_deleting(sender, instance, **kwargs):
+    # The M2M rows are gone by post_delete, so note the categories now
+    instance._counted_categories = list(instance.category.values_list('pk', flat=True))
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted(sender, instance, **kwargs):
+    if getattr(instance, '_counted_categories', None):
+        refresh_category_counts(instance._counted_categories)
+
+
+@receiver(m2m_changed, sender=Post.category.through)
+def post_categories_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if action == 'pre_clear':
+        if reverse:
+            instance._counted_categories = [instance.pk]
+        else:
+            instance._counted_categories = list(instance.category.values_list('pk', flat=True))
+    elif action == 'post_clear':
+        refresh_category_counts(getattr(instance, '_counted_categories', []))
+    elif action in ('post_add', 'post_remove'):
+        refresh_category_counts([instance.pk] if reverse else pk_set)
+
+
+@receiver(post_init, sender=Comment)
+def remember_comment_state(sender, instance, **kwargs):
+    instance._counted_approved = instance.approved if _loaded(instance, 'approved') else None
+
+
+@receiver(post_save, sender=Comment)
+def comment_saved(sender, instance, created, **kwargs):
+    if instance.approved != instance._counted_approved or (created and instance.approved):
+        refresh_comment_counts([instance.post_id])
+
+    if created:
+        if not instance.approved:
+            _adjust_pending(1)
+    elif instance._counted_approved is None:
+        reset_pending_comment_count()
+    elif instance.approved != instance._counted_approved:
+        _adjust_pending(-1 if instance.approved else 1)
+    instance._counted_approved = instance.approved
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted(sender, instance, **kwargs):
+    if instance._counted_approved is not False:
+        refresh_comment_counts([instance.post_id])
+
+    if instance._counted_approved is None:
+        reset_pending_comment_count()
+    elif not instance._counted_approved:
+        _adjust_pending(-1)
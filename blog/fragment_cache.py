@@ -0,0 +1,127 @@
+"""
+Cache for template fragments repeated across blog pages.
+
+``{% fragment_cache 'post-card' post post.author 'latest' %}`` caches its
+contents under the fragment name plus the values it varies on. A model
+instance contributes its primary key and ``updated_at``, so editing a post
+retires its cached fragments without touching anyone else's. Users have no
+``updated_at``; they contribute a version that saving the user or their
+profile bumps. Fragments can also depend on page cache tags
+(``depends='posts'``) when they show content other than the objects they
+vary on.
+
+Fragments are only cached when every process shares the cache (see
+``utils.cache.is_shared_cache``) and FRAGMENT_CACHE_TIMEOUT is not 0. Hits
+and misses are counted per fragment name in the shared cache; see the
+``fragment_cache_stats`` command.
+"""
+import hashlib
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db.models import Model
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from utils.cache import bump_cache_version, get_cache_versions, is_shared_cache
+from utils.page_cache import tag_versions
+
+from .models import Post, UserProfile
+
+# Every cacheable fragment; the template tag rejects other names
+FRAGMENT_NAMES = ('post-card', 'post-sidebar', 'author-box')
+
+
+def _user_namespace(user_id):
+    return f'fragment-user:{user_id}'
+
+
+def _key_part(value, user_versions):
+    if isinstance(value, User):
+        return f'{value._meta.label_lower}:{value.pk}:{user_versions[_user_namespace(value.pk)]}'
+    if isinstance(value, Model):
+        updated_at = getattr(value, 'updated_at', None)
+        stamp = updated_at.timestamp() if updated_at else ''
+        return f'{value._meta.label_lower}:{value.pk}:{stamp}'
+    return str(value)
+
+
+def fragment_key(name, vary_on=(), depends=()):
+    user_versions = get_cache_versions([_user_namespace(value.pk) for value in vary_on if isinstance(value, User)])
+    parts = [_key_part(value, user_versions) for value in vary_on]
+    parts += [f'{tag}:{version}' for tag, version in sorted(tag_versions(depends).items())]
+    digest = hashlib.md5('|'.join(parts).encode()).hexdigest()
+    return f'fragment:{name}:{digest}'
+
+
+def fragments_enabled():
+    return bool(getattr(settings, 'FRAGMENT_CACHE_TIMEOUT', 60 * 60)) and is_shared_cache()
+
+
+def _count(name, outcome):
+    key = f'fragment-stats:{name}:{outcome}'
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.add(key, 0, None)
+        cache.incr(key)
+
+
+def get_fragment(key, name):
+    html = cache.get(key)
+    _count(name, 'misses' if html is None else 'hits')
+    return html
+
+
+def set_fragment(key, html):
+    cache.set(key, html, getattr(settings, 'FRAGMENT_CACHE_TIMEOUT', 60 * 60))
+
+
+def fragment_stats():
+    """{fragment name: (hits, misses)}, counted by every process sharing the cache"""
+    keys = [f'fragment-stats:{name}:{outcome}' for name in FRAGMENT_NAMES for outcome in ('hits', 'misses')]
+    found = cache.get_many(keys)
+    return {
+        name: (found.get(f'fragment-stats:{name}:hits', 0), found.get(f'fragment-stats:{name}:misses', 0))
+        for name in FRAGMENT_NAMES
+    }
+
+
+def reset_fragment_stats():
+    cache.delete_many([f'fragment-stats:{name}:{outcome}' for name in FRAGMENT_NAMES for outcome in ('hits', 'misses')])
+
+
+@receiver(m2m_changed, sender=Post.category.through)
+def touch_recategorised_posts(sender, instance, action, reverse, pk_set, **kwargs):
+    # Category badges are part of a post's cached fragments, but changing
+    # them leaves updated_at alone
+    if not reverse:
+        post_ids = [instance.pk]
+    elif action == 'pre_clear':
+        instance._touched_posts = list(instance.posts.values_list('pk', flat=True))
+        return
+    elif action == 'post_clear':
+        post_ids = getattr(instance, '_touched_posts', [])
+    else:
+        post_ids = pk_set or []
+
+    if action in ('post_add', 'post_remove', 'post_clear') and post_ids:
+        Post.all_objects.filter(pk__in=post_ids).update(updated_at=timezone.now())
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def user_changed(sender, instance, update_fields=None, **kwargs):
+    # Logging in only saves last_login, which no fragment shows
+    if update_fields is not None and set(update_fields) <= {'last_login'}:
+        return
+    bump_cache_version(_user_namespace(instance.pk))
+
+
+@receiver(post_save, sender=UserProfile)
+@receiver(post_delete, sender=UserProfile)
+def profile_changed(sender, instance, **kwargs):
+    # UserProfile.save() copies names to the user with update(), which sends no signal
+    bump_cache_version(_user_namespace(instance.user_id))
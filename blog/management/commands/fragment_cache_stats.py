@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+from blog.fragment_cache import fragment_stats, reset_fragment_stats
+
+
+class Command(BaseCommand):
+    help = "Show hit and miss counts for cached blog template fragments"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reset', action='store_true', help='Zero the counters after reporting')
+
+    def handle(self, *args, **options):
+        for name, (hits, misses) in fragment_stats().items():
+            lookups = hits + misses
+            ratio = f'{hits / lookups:.0%}' if lookups else '-'
+            self.stdout.write(f'{name:<20} {hits:>8} hits {misses:>8} misses   hit rate {ratio}')
+
+        if options['reset']:
+            reset_fragment_stats()
+        self.stdout.write(self.style.SUCCESS("✅ Fragment cache stats reported."))
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from blog.search import get_backend
+
+
+class Command(BaseCommand):
+    help = "Rebuild the blog search index for the configured backend"
+
+    def handle(self, *args, **options):
+        backend = get_backend()
+        total = backend.rebuild()
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ Rebuilt {type(backend).__name__} index for {total} item(s)."
+        ))
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from blog.counters import refresh_category_counts, refresh_comment_counts
+
+
+class Command(BaseCommand):
+    help = "Recompute denormalized category post counts and post comment counts"
+
+    def handle(self, *args, **options):
+        categories = refresh_category_counts()
+        posts = refresh_comment_counts()
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ Recounted {categories} categor{'y' if categories == 1 else 'ies'} and {posts} post(s)."
+        ))
@@ -0,0 +1,44 @@
+# Generated by Django 5.2.7 on 2026-10-17 00:00
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def populate_counters(apps, schema_editor):
+    Category = apps.get_model('blog', 'Category')
+    Post = apps.get_model('blog', 'Post')
+    Comment = apps.get_model('blog', 'Comment')
+
+    published = (
+        Post.objects.filter(category=OuterRef('pk'), status='published', is_trashed=False)
+        .order_by().values('category').annotate(count=Count('id')).values('count')
+    )
+    Category.objects.update(published_post_count=Coalesce(Subquery(published), 0))
+
+    approved = (
+        Comment.objects.filter(post=OuterRef('pk'), approved=True)
+        .order_by().values('post').annotate(count=Count('id')).values('count')
+    )
+    Post.objects.update(approved_comment_count=Coalesce(Subquery(approved), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0007_alter_post_featured_image'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='category',
+            name='published_post_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='approved_comment_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(populate_counters, migrations.RunPython.noop),
+    ]
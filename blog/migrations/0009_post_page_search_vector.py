@@ -0,0 +1,69 @@
+# Generated by Django 5.2.7 on 2026-10-17 00:02
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.conf import settings
+from django.db import migrations
+
+SEARCH_INDEXES = {
+    'post': django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='blog_post_search_gin'),
+    'page': django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='blog_page_search_gin'),
+}
+
+# Same weighting as blog.search.postgres: title A, excerpt B, content C
+BACKFILL_SQL = """
+UPDATE {table} SET search_vector =
+    setweight(to_tsvector(%(config)s::regconfig, coalesce(title, '')), 'A') ||
+    setweight(to_tsvector(%(config)s::regconfig, regexp_replace(coalesce(excerpt, ''), '<[^>]+>', ' ', 'g')), 'B') ||
+    setweight(to_tsvector(%(config)s::regconfig, regexp_replace(coalesce(content, ''), '<[^>]+>', ' ', 'g')), 'C')
+"""
+
+
+def create_search_indexes(apps, schema_editor):
+    # GIN and tsvector are PostgreSQL-only; other databases use the Python index
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for model_name, index in SEARCH_INDEXES.items():
+        model = apps.get_model('blog', model_name)
+        schema_editor.execute(
+            BACKFILL_SQL.format(table=schema_editor.quote_name(model._meta.db_table)),
+            {'config': getattr(settings, 'SEARCH_CONFIG', 'english')},
+        )
+        schema_editor.add_index(model, index)
+
+
+def drop_search_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for model_name, index in SEARCH_INDEXES.items():
+        schema_editor.remove_index(apps.get_model('blog', model_name), index)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0008_denormalized_counters'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='page',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True),
+        ),
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AddIndex(model_name='page', index=SEARCH_INDEXES['page']),
+                migrations.AddIndex(model_name='post', index=SEARCH_INDEXES['post']),
+            ],
+            database_operations=[
+                migrations.RunPython(create_search_indexes, drop_search_indexes),
+            ],
+        ),
+    ]
@@ -0,0 +1,60 @@
+# Generated by Django 5.2.7 on 2026-10-17 09:12
+
+import django.contrib.postgres.indexes
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+# Dashboard search boxes (dashboard.search); content is covered by search_vector
+TRIGRAM_INDEXES = {
+    'post': [
+        django.contrib.postgres.indexes.GinIndex(fields=['title'], name='blog_post_title_trgm', opclasses=['gin_trgm_ops']),
+        django.contrib.postgres.indexes.GinIndex(fields=['excerpt'], name='blog_post_excerpt_trgm', opclasses=['gin_trgm_ops']),
+    ],
+    'page': [
+        django.contrib.postgres.indexes.GinIndex(fields=['title'], name='blog_page_title_trgm', opclasses=['gin_trgm_ops']),
+        django.contrib.postgres.indexes.GinIndex(fields=['excerpt'], name='blog_page_excerpt_trgm', opclasses=['gin_trgm_ops']),
+    ],
+}
+
+
+def create_trigram_indexes(apps, schema_editor):
+    # pg_trgm is PostgreSQL-only; other databases keep the icontains search
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for model_name, indexes in TRIGRAM_INDEXES.items():
+        model = apps.get_model('blog', model_name)
+        for index in indexes:
+            # Built without blocking writes to a large, live table
+            schema_editor.add_index(model, index, concurrently=True)
+
+
+def drop_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for model_name, indexes in TRIGRAM_INDEXES.items():
+        model = apps.get_model('blog', model_name)
+        for index in indexes:
+            schema_editor.remove_index(model, index, concurrently=True)
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY can't run inside a transaction
+    atomic = False
+
+    dependencies = [
+        ('blog', '0009_post_page_search_vector'),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AddIndex(model_name=model_name, index=index)
+                for model_name, indexes in TRIGRAM_INDEXES.items()
+                for index in indexes
+            ],
+            database_operations=[
+                migrations.RunPython(create_trigram_indexes, drop_trigram_indexes),
+            ],
+        ),
+    ]
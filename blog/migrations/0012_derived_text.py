@@ -0,0 +1,67 @@
+# Generated by Django 5.2.7 on 2026-10-17 00:25
+
+import hashlib
+import html
+import math
+
+from django.db import migrations, models
+from django.utils.html import strip_tags
+
+
+def populate_derived_text(apps, schema_editor):
+    # Same derivation as blog.content.derive_text at the time of writing
+    for model_name in ('Post', 'Page'):
+        model = apps.get_model('blog', model_name)
+        batch = []
+        for instance in model.objects.only('id', 'content').iterator(chunk_size=200):
+            instance.plain_text = ' '.join(html.unescape(strip_tags(instance.content or '')).split())
+            instance.word_count = len(instance.plain_text.split())
+            instance.read_time = math.ceil(instance.word_count / 200) if instance.word_count else 0
+            instance.content_hash = hashlib.sha256((instance.content or '').encode()).hexdigest()
+            batch.append(instance)
+            if len(batch) == 200:
+                model.objects.bulk_update(batch, ['plain_text', 'word_count', 'read_time', 'content_hash'])
+                batch = []
+        if batch:
+            model.objects.bulk_update(batch, ['plain_text', 'word_count', 'read_time', 'content_hash'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('blog', '0011_hot_filter_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='page',
+            name='content_hash',
+            field=models.CharField(blank=True, editable=False, max_length=64),
+        ),
+        migrations.AddField(
+            model_name='page',
+            name='plain_text',
+            field=models.TextField(blank=True, default='', editable=False),
+        ),
+        migrations.AddField(
+            model_name='page',
+            name='word_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='content_hash',
+            field=models.CharField(blank=True, editable=False, max_length=64),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='plain_text',
+            field=models.TextField(blank=True, default='', editable=False),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='word_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(populate_derived_text, migrations.RunPython.noop),
+    ]
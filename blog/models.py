@@ -3,11 +3,17 @@ from django.db import models
 from django.contrib.auth.models import User
 from django.utils import timezone
 from django.utils.text import slugify
-from django.utils.html import strip_tags
 from django.db.models import Sum
 from datetime import timedelta
-import math
 from tinymce.models import HTMLField
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
+
+from .content import DERIVED_FIELDS, derive_text, html_to_text, summarize
+
+# Partial index condition; keep in step with BaseContentQuerySet.published()
+PUBLISHED = models.Q(status='published', is_trashed=False)
+
 
 class BaseContentQuerySet(models.QuerySet):
     def active(self):
@@ -20,6 +26,20 @@ class BaseContentQuerySet(models.QuerySet):
         return self.active().filter(status='published')
 
 
+class PostQuerySet(BaseContentQuerySet):
+    def for_listing(self):
+        """Posts shown as cards: author names and category badges in bulk"""
+        return (
+            self.select_related('author__profile')
+            .prefetch_related('category')
+            .defer('search_vector', 'content')
+        )
+
+    def for_detail(self):
+        """A post shown on its own page, with its author box and categories"""
+        return self.select_related('author__profile').prefetch_related('category')
+
+
 class BaseContentManager(models.Manager):
     def get_queryset(self):
         return BaseContentQuerySet(self.model, using=self._db)
@@ -31,6 +51,17 @@ class BaseContentManager(models.Manager):
         return self.get_queryset().published()
 
 
+class PostManager(BaseContentManager):
+    def get_queryset(self):
+        return PostQuerySet(self.model, using=self._db)
+
+    def for_listing(self):
+        return self.get_queryset().for_listing()
+
+    def for_detail(self):
+        return self.get_queryset().for_detail()
+
+
 class BaseContent(models.Model):
     STATUS_CHOICES = (
         ('draft', 'Draft'),
@@ -64,6 +95,17 @@ class BaseContent(models.Model):
     read_time = models.PositiveIntegerField(default=0, help_text="Estimated reading time in minutes")
     page_views = models.PositiveIntegerField(default=0)
     
+    # Derived from content by blog.content.derive_text, once per content hash
+    plain_text = models.TextField(blank=True, default='', editable=False)
+    word_count = models.PositiveIntegerField(default=0, editable=False)
+    content_hash = models.CharField(max_length=64, blank=True, editable=False)
+    
+    # Bumped on every edit; autosaves must name the revision they started from
+    revision = models.PositiveIntegerField(default=0, editable=False)
+    
+    # Weighted full-text document, maintained by blog.search
+    search_vector = SearchVectorField(null=True, editable=False)
+    
     # Managers
     objects = BaseContentManager()
     all_objects = models.Manager()
@@ -76,14 +118,21 @@ class BaseContent(models.Model):
         if not self.slug:
             self.slug = slugify(self.title)
         
-        self.read_time = self.calculate_read_time()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is None and not self._state.adding:
+            # A full save may change anything an open editor is showing
+            self.revision += 1
+        if update_fields is None or 'content' in update_fields:
+            if derive_text(self) and update_fields is not None:
+                kwargs['update_fields'] = {*update_fields, *DERIVED_FIELDS}
         super().save(*args, **kwargs)
     
-    def calculate_read_time(self):
-        plain_text = strip_tags(self.content)
-        word_count = len(plain_text.split())
-        words_per_minute = 200
-        return math.ceil(word_count / words_per_minute) if word_count > 0 else 0
+    @property
+    def summary(self):
+        """The excerpt, or the start of the body for posts without one, as plain text"""
+        if self.excerpt:
+            return html_to_text(self.excerpt)
+        return summarize(self.plain_text)
     
     def move_to_trash(self, user=None):
         self.is_trashed = True
@@ -113,11 +162,26 @@ class Post(BaseContent):
     featured_image = models.ImageField(upload_to='uploads/', null=True, blank=True)
     category = models.ManyToManyField('Category', blank=True, related_name='posts')
     is_featured = models.BooleanField(default=False)
+
+    objects = PostManager()
+    
+    # Denormalized, maintained by blog.counters
+    approved_comment_count = models.PositiveIntegerField(default=0, editable=False)
     
     class Meta:
         ordering = ['-published_date']
         verbose_name = 'Post'
         verbose_name_plural = 'Posts'
+        indexes = [
+            # Public listings: published, not trashed, newest first
+            models.Index(fields=['-published_date'], condition=PUBLISHED, name='blog_post_published_idx'),
+            models.Index(fields=['author', '-published_date'], condition=PUBLISHED, name='blog_post_author_pub_idx'),
+            # Dashboard lists, newest first; the trash tab is small enough to scan
+            models.Index(fields=['-created_at'], condition=models.Q(is_trashed=False), name='blog_post_active_created_idx'),
+            GinIndex(fields=['search_vector'], name='blog_post_search_gin'),
+            GinIndex(fields=['title'], opclasses=['gin_trgm_ops'], name='blog_post_title_trgm'),
+            GinIndex(fields=['excerpt'], opclasses=['gin_trgm_ops'], name='blog_post_excerpt_trgm'),
+        ]
     
     def __str__(self):
         return self.title
@@ -135,6 +199,13 @@ class Page(BaseContent):
         ordering = ['-published_date']
         verbose_name = 'Page'
         verbose_name_plural = 'Pages'
+        indexes = [
+            models.Index(fields=['-published_date'], condition=PUBLISHED, name='blog_page_published_idx'),
+            models.Index(fields=['-created_at'], condition=models.Q(is_trashed=False), name='blog_page_active_created_idx'),
+            GinIndex(fields=['search_vector'], name='blog_page_search_gin'),
+            GinIndex(fields=['title'], opclasses=['gin_trgm_ops'], name='blog_page_title_trgm'),
+            GinIndex(fields=['excerpt'], opclasses=['gin_trgm_ops'], name='blog_page_excerpt_trgm'),
+        ]
     
     def __str__(self):
         return self.title
@@ -147,6 +218,9 @@ class Category(models.Model):
     order = models.IntegerField(default=0)
     created_at = models.DateTimeField(auto_now_add=True)
     
+    # Denormalized, maintained by blog.counters
+    published_post_count = models.PositiveIntegerField(default=0, editable=False)
+    
     class Meta:
         verbose_name_plural = 'Categories'
         ordering = ['name']
@@ -171,6 +245,12 @@ class Comment(models.Model):
 
     class Meta:
         ordering = ['-created_on']
+        indexes = [
+            # Approved comments of a post (the post page, comment counters)
+            models.Index(fields=['post', '-created_on'], condition=models.Q(approved=True), name='blog_comment_approved_idx'),
+            # Moderation queue
+            models.Index(fields=['-created_on'], condition=models.Q(approved=False), name='blog_comment_pending_idx'),
+        ]
 
     def __str__(self):
         return f'Comment by {self.name} on {self.post}'
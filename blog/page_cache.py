@@ -0,0 +1,106 @@
+"""
+Evict cached public blog pages when the content they show changes.
+
+Post lists and post pages depend on ``posts`` (post pages list related
+posts), every blog page on ``categories`` (the navigation), standalone
+pages on ``pages``, and a post page on ``post:<post id>`` for its own body
+and ``comments:<post id>`` for its comment thread. Bulk
+``QuerySet.update()`` calls send no signals and call ``invalidate_pages``
+themselves.
+
+Saving a post that is not public before or after (e.g. a draft autosave)
+evicts nothing. Saving a public post evicts its own page, and the lists only
+if it was published, unpublished or trashed, or a field its card shows
+changed.
+"""
+from django.db.models.signals import m2m_changed, post_delete, post_init, post_save
+from django.dispatch import receiver
+
+from utils.page_cache import invalidate_pages
+
+from .models import Category, Comment, Page, Post
+
+
+# Shown on post cards (lists, related posts); ``plain_text`` for the summary
+LISTED_FIELDS = (
+    'title', 'slug', 'excerpt', 'plain_text', 'featured_image', 'published_date',
+    'author_id', 'is_featured', 'read_time',
+)
+
+
+def comment_tags(post_ids):
+    return [f'comments:{post_id}' for post_id in post_ids]
+
+
+def post_tag(post_id):
+    return f'post:{post_id}'
+
+
+def _listed_state(post):
+    """(is public, card field values); None and missing values are unknown"""
+    deferred = post.get_deferred_fields()
+    is_public = None
+    if not deferred & {'status', 'is_trashed'}:
+        is_public = post.status == 'published' and not post.is_trashed
+    # FieldFile compares by name, but the same object may be renamed in place
+    values = {
+        name: getattr(getattr(post, name), 'name', getattr(post, name))
+        for name in LISTED_FIELDS
+        if name not in deferred
+    }
+    return is_public, values
+
+
+@receiver(post_init, sender=Post)
+def remember_listed_state(sender, instance, **kwargs):
+    instance._listed_state = _listed_state(instance)
+
+
+@receiver(post_save, sender=Post)
+def post_saved(sender, instance, created, **kwargs):
+    was_public, before = instance._listed_state
+    is_public, after = instance._listed_state = _listed_state(instance)
+    if was_public is False and is_public is False:
+        return
+
+    tags = [post_tag(instance.pk)]
+    listing_changed = created or was_public != is_public or any(
+        name not in before or before[name] != value for name, value in after.items()
+    )
+    if listing_changed or len(after) < len(LISTED_FIELDS):
+        tags.append('posts')
+    invalidate_pages(*tags)
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted(sender, instance, **kwargs):
+    if instance._listed_state[0] is not False:
+        invalidate_pages('posts', post_tag(instance.pk))
+
+
+@receiver(m2m_changed, sender=Post.category.through)
+def post_categories_changed(sender, instance, action, reverse, **kwargs):
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if reverse:
+        invalidate_pages('posts')
+    elif instance._listed_state[0] is not False:
+        invalidate_pages('posts', post_tag(instance.pk))
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def category_changed(sender, **kwargs):
+    invalidate_pages('categories')
+
+
+@receiver(post_save, sender=Page)
+@receiver(post_delete, sender=Page)
+def page_changed(sender, **kwargs):
+    invalidate_pages('pages')
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def comment_changed(sender, instance, **kwargs):
+    invalidate_pages(*comment_tags([instance.post_id]))
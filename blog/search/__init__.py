@@ -0,0 +1,88 @@
+"""
+Blog search behind a pluggable backend.
+
+SEARCH_BACKEND names the backend class. When it is unset, PostgreSQL gets
+full-text search over the stored, GIN-indexed ``search_vector``, and other
+databases get the in-process inverted index. Backends return ordered post
+ids, so callers can paginate cheaply and load only the posts on the
+current page. Result lists are cached per process for repeated searches.
+
+Anything derived from published posts (suggestions, cached results) is
+stamped with the search content version, which is bumped whenever a post
+is published, edited, unpublished or deleted.
+"""
+import threading
+
+from django.conf import settings
+from django.db import connection
+from django.utils.module_loading import import_string
+
+from blog.models import Post
+from utils.cache import bump_cache_version, get_cache_version
+
+from .results import normalize_keyword, result_cache
+
+NAMESPACE = 'search'
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_backend():
+    """The configured search backend, created once per process"""
+    global _backend
+    with _backend_lock:
+        if _backend is None:
+            path = getattr(settings, 'SEARCH_BACKEND', None)
+            if not path:
+                if connection.vendor == 'postgresql':
+                    path = 'blog.search.postgres.PostgresSearchBackend'
+                else:
+                    path = 'blog.search.inverted.InvertedIndexBackend'
+            _backend = import_string(path)()
+    return _backend
+
+
+def content_version():
+    return get_cache_version(NAMESPACE)
+
+
+def mark_content_changed():
+    """Invalidate suggestions and cached results built from older posts"""
+    bump_cache_version(NAMESPACE)
+
+
+def suggest(query, limit=8):
+    """Title suggestions for a partially typed query, served from memory"""
+    from .prefix import get_prefix_index
+    return get_prefix_index(content_version()).lookup(query, limit)
+
+
+def search_post_ids(keyword):
+    """Ids of published posts matching ``keyword``, best match first"""
+    keyword = normalize_keyword(keyword)
+    version = content_version()
+    ids = result_cache.get(keyword, version)
+    if ids is None:
+        ids = get_backend().search(keyword)
+        result_cache.set(keyword, version, ids)
+    return list(ids)
+
+
+def add_snippets(posts, keyword):
+    """Set ``search_snippet`` on each post to a highlighted excerpt"""
+    get_backend().add_snippets(posts, keyword)
+
+
+def reindex_posts(post_ids):
+    """Re-index posts changed with QuerySet.update(), which sends no signals"""
+    backend = get_backend()
+    for post in Post.all_objects.filter(pk__in=list(post_ids)):
+        backend.index(post)
+    mark_content_changed()
+
+
+def fetch_posts(ids):
+    """Load published posts for a list of ids, keeping the order of the ids"""
+    posts = Post.objects.published().for_listing().in_bulk(ids)
+    return [posts[pk] for pk in ids if pk in posts]
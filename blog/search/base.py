@@ -0,0 +1,25 @@
+class SearchBackend:
+    """
+    Interface every blog search backend implements.
+
+    ``search`` returns ids of published posts, best match first; the view
+    paginates that list and loads only the posts it displays.
+    """
+
+    def search(self, keyword):
+        raise NotImplementedError
+
+    def add_snippets(self, posts, keyword):
+        """Set ``search_snippet`` on each post to a highlighted excerpt"""
+        for post in posts:
+            post.search_snippet = ''
+
+    def index(self, instance, update_fields=None):
+        """Bring the index up to date after a post or page was saved"""
+
+    def remove(self, instance):
+        """Drop a deleted post or page from the index"""
+
+    def rebuild(self):
+        """Re-index everything; returns the number of documents indexed"""
+        return 0
@@ -0,0 +1,32 @@
+"""Substring search, the original behaviour; slow but needs no index"""
+from django.db.models import Case, IntegerField, Q, Value, When
+
+from blog.models import Post
+
+from .base import SearchBackend
+from .text import WORD_RE, make_snippet
+
+
+class SubstringSearchBackend(SearchBackend):
+    """``icontains`` matching over title, body text and excerpt; needs no index"""
+
+    def search(self, keyword):
+        return list(
+            Post.objects.published().filter(
+                Q(title__icontains=keyword) |
+                Q(plain_text__icontains=keyword) |
+                Q(excerpt__icontains=keyword)
+            ).annotate(
+                relevance=Case(
+                    When(title__iexact=keyword, then=Value(3)),
+                    When(title__icontains=keyword, then=Value(2)),
+                    default=Value(1),
+                    output_field=IntegerField()
+                )
+            ).order_by('-relevance', '-published_date').values_list('id', flat=True)
+        )
+
+    def add_snippets(self, posts, keyword):
+        terms = WORD_RE.findall(keyword)
+        for post in posts:
+            post.search_snippet = make_snippet(post.plain_text, terms)
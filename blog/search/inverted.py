@@ -0,0 +1,395 @@
+"""
+Pure-Python inverted index with BM25 ranking, for databases without full-text search.
+
+Every indexed version of a post occupies a *slot*. Postings are kept per
+term as two parallel arrays (slot numbers and weighted term frequencies),
+and per-slot data (post id, document length, publish time) is stored in
+flat arrays too. Re-indexing a post retires its old slot and appends a new
+one, so updates never rewrite existing postings. Retired slots are dropped
+when the index is compacted, which happens on every save to disk.
+
+The index is persisted to SEARCH_INDEX_PATH as a small JSON header followed
+by the raw array bytes. Loading it is a few ``frombytes`` calls, not a
+rebuild. Updates are not written there one by one: each is appended as a
+JSON line to a journal next to it (``posts.idx.log``), which costs the size
+of one document. Once COMPACT_AFTER records have accumulated the base file
+is rewritten, compacted, and the journal emptied. Every process replays
+journal lines it hasn't seen yet, and reloads the base file when another
+process has rewritten it, before its next search or update.
+"""
+import json
+import math
+import os
+import struct
+import threading
+from contextlib import contextmanager
+from array import array
+from collections import defaultdict
+
+from django.conf import settings
+
+from blog.models import Post
+
+from .base import SearchBackend
+from .stemmer import stem
+from .text import WORD_RE, document_fields, make_snippet
+
+FORMAT_VERSION = 1
+MAGIC = b'WTDIDX'
+
+# Weight of a term occurrence in each field (BM25F-style field boosting)
+FIELD_WEIGHTS = (3.0, 2.0, 1.0)  # title, excerpt, body
+
+# Journal records kept before the base file is rewritten
+COMPACT_AFTER = 200
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# Saving only other fields (e.g. page_views) leaves the index untouched
+INDEXED_FIELDS = {'title', 'excerpt', 'content', 'status', 'is_trashed', 'published_date'}
+
+STOP_WORDS = frozenset("""
+a an and are as at be but by for from has have he in is it its of on or
+that the this to was were will with you your we our i
+""".split())
+
+
+def tokenize(text):
+    """Lower-case, stemmed terms of ``text`` with stop words removed"""
+    return [
+        stem(word)
+        for word in WORD_RE.findall(text.lower())
+        if word not in STOP_WORDS and len(word) > 1
+    ]
+
+
+class InvertedIndex:
+    """In-memory postings with slot-based incremental updates"""
+
+    def __init__(self):
+        self.slot_post = array('q')     # post id per slot, -1 once retired
+        self.slot_length = array('d')   # weighted document length
+        self.slot_date = array('d')     # publish timestamp, for tie-breaking
+        self.postings = {}              # term -> (array('I') slots, array('f') weights)
+        self.post_slot = {}             # post id -> live slot
+        self.total_length = 0.0
+
+    def __len__(self):
+        return len(self.post_slot)
+
+    @property
+    def retired(self):
+        return len(self.slot_post) - len(self.post_slot)
+
+    def add(self, post_id, fields, timestamp):
+        """Index (or re-index) one post from its (title, excerpt, body) texts"""
+        self.remove(post_id)
+
+        weights = defaultdict(float)
+        for text, field_weight in zip(fields, FIELD_WEIGHTS):
+            for term in tokenize(text):
+                weights[term] += field_weight
+        if not weights:
+            return
+
+        slot = len(self.slot_post)
+        length = sum(weights.values())
+        self.slot_post.append(post_id)
+        self.slot_length.append(length)
+        self.slot_date.append(timestamp)
+        self.post_slot[post_id] = slot
+        self.total_length += length
+
+        for term, weight in weights.items():
+            if term not in self.postings:
+                self.postings[term] = (array('I'), array('f'))
+            slots, term_weights = self.postings[term]
+            slots.append(slot)
+            term_weights.append(weight)
+
+    def remove(self, post_id):
+        slot = self.post_slot.pop(post_id, None)
+        if slot is not None:
+            self.slot_post[slot] = -1
+            self.total_length -= self.slot_length[slot]
+
+    def __contains__(self, post_id):
+        return post_id in self.post_slot
+
+    def apply(self, record):
+        """Replay one journal record: an (re-)indexed post, or a removal"""
+        if 'fields' in record:
+            self.add(record['id'], record['fields'], record['date'])
+        else:
+            self.remove(record['id'])
+
+    def search(self, query):
+        """Post ids matching any query term, ordered by BM25 score then recency"""
+        terms = set(tokenize(query))
+        doc_count = len(self.post_slot)
+        if not terms or not doc_count:
+            return []
+        avg_length = self.total_length / doc_count
+
+        scores = defaultdict(float)
+        for term in terms:
+            if term not in self.postings:
+                continue
+            slots, term_weights = self.postings[term]
+            live = [(slot, tf) for slot, tf in zip(slots, term_weights) if self.slot_post[slot] != -1]
+            if not live:
+                continue
+            idf = math.log(1 + (doc_count - len(live) + 0.5) / (len(live) + 0.5))
+            for slot, tf in live:
+                norm = BM25_K1 * (1 - BM25_B + BM25_B * self.slot_length[slot] / avg_length)
+                scores[slot] += idf * tf * (BM25_K1 + 1) / (tf + norm)
+
+        ranked = sorted(scores, key=lambda slot: (-scores[slot], -self.slot_date[slot]))
+        return [self.slot_post[slot] for slot in ranked]
+
+    def compact(self):
+        """Drop retired slots and renumber the live ones"""
+        if not self.retired:
+            return
+        remap = {}
+        slot_post, slot_length, slot_date = array('q'), array('d'), array('d')
+        for old_slot, post_id in enumerate(self.slot_post):
+            if post_id == -1:
+                continue
+            remap[old_slot] = len(slot_post)
+            slot_post.append(post_id)
+            slot_length.append(self.slot_length[old_slot])
+            slot_date.append(self.slot_date[old_slot])
+
+        postings = {}
+        for term, (slots, term_weights) in self.postings.items():
+            new_slots, new_weights = array('I'), array('f')
+            for slot, weight in zip(slots, term_weights):
+                if slot in remap:
+                    new_slots.append(remap[slot])
+                    new_weights.append(weight)
+            if new_slots:
+                postings[term] = (new_slots, new_weights)
+
+        self.slot_post, self.slot_length, self.slot_date = slot_post, slot_length, slot_date
+        self.postings = postings
+        self.post_slot = {post_id: slot for slot, post_id in enumerate(slot_post)}
+        self.total_length = sum(slot_length)
+
+    def dump(self, fh):
+        """Write the compacted index: header length, JSON header, then raw arrays"""
+        self.compact()
+        terms = sorted(self.postings)
+        all_slots, all_weights = array('I'), array('f')
+        for term in terms:
+            slots, term_weights = self.postings[term]
+            all_slots.extend(slots)
+            all_weights.extend(term_weights)
+
+        header = json.dumps({
+            'version': FORMAT_VERSION,
+            'slots': len(self.slot_post),
+            'terms': terms,
+            'counts': [len(self.postings[term][0]) for term in terms],
+        }).encode()
+        fh.write(MAGIC + struct.pack('<I', len(header)) + header)
+        for data in (self.slot_post, self.slot_length, self.slot_date, all_slots, all_weights):
+            fh.write(data.tobytes())
+
+    @classmethod
+    def load(cls, fh):
+        if fh.read(len(MAGIC)) != MAGIC:
+            raise ValueError('Not a search index file')
+        (header_length,) = struct.unpack('<I', fh.read(4))
+        header = json.loads(fh.read(header_length))
+        if header['version'] != FORMAT_VERSION:
+            raise ValueError('Unsupported search index version')
+
+        def read(typecode, count):
+            data = array(typecode)
+            data.frombytes(fh.read(count * data.itemsize))
+            return data
+
+        index = cls()
+        slot_count, total = header['slots'], sum(header['counts'])
+        index.slot_post = read('q', slot_count)
+        index.slot_length = read('d', slot_count)
+        index.slot_date = read('d', slot_count)
+        all_slots, all_weights = read('I', total), read('f', total)
+
+        offset = 0
+        for term, count in zip(header['terms'], header['counts']):
+            index.postings[term] = (all_slots[offset:offset + count], all_weights[offset:offset + count])
+            offset += count
+        index.post_slot = {post_id: slot for slot, post_id in enumerate(index.slot_post)}
+        index.total_length = sum(index.slot_length)
+        return index
+
+
+try:
+    import fcntl
+except ImportError:  # Windows: single-process development only
+    fcntl = None
+
+
+@contextmanager
+def _locked(fh):
+    """Exclusive lock on the journal across processes, where supported"""
+    if fcntl is None:
+        yield
+        return
+    fcntl.flock(fh.fileno(), fcntl.LOCK_EX)
+    try:
+        yield
+    finally:
+        fcntl.flock(fh.fileno(), fcntl.LOCK_UN)
+
+
+class InvertedIndexBackend(SearchBackend):
+    """Searches an InvertedIndex of published posts, persisted to SEARCH_INDEX_PATH"""
+
+    def __init__(self, path=None):
+        self.path = str(path or settings.SEARCH_INDEX_PATH)
+        self.journal_path = f'{self.path}.log'
+        self._index = None
+        self._loaded_mtime = None
+        self._journal_offset = 0    # bytes of the journal already applied
+        self._journal_records = 0   # records since the base file was written
+        self._lock = threading.RLock()
+
+    def _file_mtime(self):
+        try:
+            return os.stat(self.path).st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+    def get_index(self):
+        """The current index, caught up with other processes' updates"""
+        with self._lock:
+            mtime = self._file_mtime()
+            if self._index is None or mtime != self._loaded_mtime:
+                self._load(mtime)
+            self._replay_journal()
+            return self._index
+
+    def _load(self, mtime):
+        self._journal_offset = self._journal_records = 0
+        if mtime is None:
+            self.rebuild()
+            return
+        try:
+            with open(self.path, 'rb') as fh:
+                self._index = InvertedIndex.load(fh)
+            self._loaded_mtime = mtime
+        except (OSError, ValueError, KeyError, struct.error):
+            self.rebuild()
+
+    def _replay_journal(self, fh=None):
+        """Apply complete journal lines written since we last looked"""
+        if fh is None:
+            try:
+                with open(self.journal_path, 'rb') as journal:
+                    return self._replay_journal(journal)
+            except FileNotFoundError:
+                return
+        fh.seek(self._journal_offset)
+        for line in fh:
+            if not line.endswith(b'\n'):
+                break  # still being written
+            self._journal_offset += len(line)
+            self._journal_records += 1
+            try:
+                self._index.apply(json.loads(line))
+            except (ValueError, KeyError, TypeError):
+                continue
+
+    def _catch_up(self, journal):
+        """With the journal locked: reload a rewritten base file, then replay"""
+        mtime = self._file_mtime()
+        if mtime is not None and mtime != self._loaded_mtime:
+            try:
+                with open(self.path, 'rb') as fh:
+                    self._index = InvertedIndex.load(fh)
+                self._loaded_mtime = mtime
+                self._journal_offset = self._journal_records = 0
+            except (OSError, ValueError, KeyError, struct.error):
+                pass
+        self._replay_journal(journal)
+
+    def _append(self, record):
+        """Apply ``record`` and journal it, compacting when the journal is long"""
+        with self._lock:
+            self.get_index()
+            with open(self.journal_path, 'ab+') as fh, _locked(fh):
+                # Another process may have appended or compacted meanwhile
+                self._catch_up(fh)
+                fh.seek(0, os.SEEK_END)
+                fh.write(json.dumps(record, separators=(',', ':')).encode() + b'\n')
+                fh.flush()
+                self._journal_offset = fh.tell()
+                self._journal_records += 1
+                self._index.apply(record)
+                if self._journal_records >= COMPACT_AFTER:
+                    self._write_base(fh)
+
+    def save(self):
+        """Rewrite the base file from the (compacted) index and empty the journal"""
+        with self._lock:
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            with open(self.journal_path, 'ab+') as fh, _locked(fh):
+                self._write_base(fh)
+
+    def _write_base(self, journal):
+        tmp_path = f'{self.path}.{os.getpid()}.tmp'
+        with open(tmp_path, 'wb') as fh:
+            self._index.dump(fh)
+        os.replace(tmp_path, self.path)
+        journal.truncate(0)
+        self._loaded_mtime = self._file_mtime()
+        self._journal_offset = self._journal_records = 0
+
+    def search(self, keyword):
+        # Held while scoring so a concurrent update can't compact under us
+        with self._lock:
+            return self.get_index().search(keyword)
+
+    def add_snippets(self, posts, keyword):
+        # Stems match other forms of a word ("cach" -> "cache"), raw words the rest
+        terms = WORD_RE.findall(keyword.lower()) + tokenize(keyword)
+        for post in posts:
+            post.search_snippet = make_snippet(post.plain_text, terms)
+
+    def index(self, instance, update_fields=None):
+        if not isinstance(instance, Post):
+            return
+        if update_fields is not None and not INDEXED_FIELDS & set(update_fields):
+            return
+        with self._lock:
+            if instance.status == 'published' and not instance.is_trashed:
+                self._append({
+                    'id': instance.pk,
+                    'fields': document_fields(instance),
+                    'date': instance.published_date.timestamp(),
+                })
+            elif instance.pk in self.get_index():
+                self._append({'id': instance.pk})
+            # Drafts that were never indexed (e.g. autosaves) cost nothing
+
+    def remove(self, instance):
+        if not isinstance(instance, Post):
+            return
+        with self._lock:
+            if instance.pk in self.get_index():
+                self._append({'id': instance.pk})
+
+    def rebuild(self):
+        with self._lock:
+            index = InvertedIndex()
+            posts = Post.objects.published().only('id', 'title', 'excerpt', 'plain_text', 'published_date')
+            for post in posts.iterator(chunk_size=200):
+                index.add(post.pk, document_fields(post), post.published_date.timestamp())
+            self._index = index
+            self._loaded_mtime = None
+            self.save()
+            return len(index)
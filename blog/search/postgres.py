@@ -0,0 +1,86 @@
+"""PostgreSQL full-text search over the stored, weighted ``search_vector``"""
+from django.conf import settings
+from django.contrib.postgres.search import SearchHeadline, SearchQuery, SearchRank, SearchVector
+from django.db.models import F, Value
+
+from blog.models import Page, Post
+
+from .base import SearchBackend
+from .text import HIGHLIGHT_START, HIGHLIGHT_STOP, document_fields, render_highlights
+
+
+def _config():
+    return getattr(settings, 'SEARCH_CONFIG', 'english')
+
+
+def search_query(keyword):
+    # websearch syntax: quoted phrases, OR and -exclusions, never a syntax error
+    return SearchQuery(keyword, search_type='websearch', config=_config())
+
+
+def build_search_vector(instance):
+    """Weighted tsvector expression for a post or page: title A, excerpt B, content C"""
+    title, excerpt, body = document_fields(instance)
+    return (
+        SearchVector(Value(title), weight='A', config=_config()) +
+        SearchVector(Value(excerpt), weight='B', config=_config()) +
+        SearchVector(Value(body), weight='C', config=_config())
+    )
+
+
+def update_search_vector(instance):
+    type(instance).all_objects.filter(pk=instance.pk).update(search_vector=build_search_vector(instance))
+
+
+INDEXED_FIELDS = {'title', 'excerpt', 'content'}
+
+
+class PostgresSearchBackend(SearchBackend):
+    """Ranks with ``ts_rank`` against the GIN-indexed ``search_vector`` column"""
+
+    def search(self, keyword):
+        query = search_query(keyword)
+        return list(
+            Post.objects.published()
+            .filter(search_vector=query)
+            .annotate(rank=SearchRank(F('search_vector'), query))
+            .order_by('-rank', '-published_date')
+            .values_list('id', flat=True)
+        )
+
+    def add_snippets(self, posts, keyword):
+        """Attach ts_headline fragments, built only for the posts on the current page"""
+        posts = list(posts)
+        if not posts:
+            return
+        headlines = dict(
+            Post.objects.filter(id__in=[post.id for post in posts])
+            .annotate(snippet=SearchHeadline(
+                'plain_text',
+                search_query(keyword),
+                config=_config(),
+                start_sel=HIGHLIGHT_START,
+                stop_sel=HIGHLIGHT_STOP,
+                max_words=35,
+                min_words=15,
+                max_fragments=2,
+                fragment_delimiter=' … ',
+            ))
+            .values_list('id', 'snippet')
+        )
+        for post in posts:
+            post.search_snippet = render_highlights(headlines.get(post.id) or '')
+
+    def index(self, instance, update_fields=None):
+        # Status and trash changes don't alter the document
+        if update_fields is not None and not INDEXED_FIELDS & set(update_fields):
+            return
+        update_search_vector(instance)
+
+    def rebuild(self):
+        total = 0
+        for model in (Post, Page):
+            for instance in model.all_objects.only('id', 'title', 'excerpt', 'plain_text').iterator(chunk_size=200):
+                update_search_vector(instance)
+                total += 1
+        return total
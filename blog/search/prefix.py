@@ -0,0 +1,104 @@
+"""
+In-memory prefix index for search-as-you-type suggestions.
+
+Every word of every published post title, and the slug, becomes a key in
+one sorted list. A lookup is a ``bisect`` to the first key starting with
+the typed prefix, followed by a short forward scan. The suggestion payloads
+are prepared when the index is built, so answering needs neither the
+database nor template rendering. The index is rebuilt lazily when the
+search content version changes, i.e. after a post is published, edited,
+unpublished or deleted.
+"""
+import threading
+import unicodedata
+from bisect import bisect_left
+
+from django.urls import reverse
+
+from blog.models import Post
+
+from .text import WORD_RE
+
+# Keys scanned per lookup; bounds the cost of one-letter prefixes
+MAX_SCAN = 500
+
+
+def normalize(text):
+    """Lower-case and strip accents so 'Café' is found by 'cafe'"""
+    text = unicodedata.normalize('NFKD', text.lower())
+    return ''.join(char for char in text if not unicodedata.combining(char))
+
+
+class PrefixIndex:
+    def __init__(self, posts=()):
+        keys = []
+        self.suggestions = []
+        for number, post in enumerate(posts):
+            self.suggestions.append({
+                'title': post.title,
+                'url': reverse('posts_by_category_page_or_post', kwargs={'slug': post.slug}),
+                'date': post.published_date.date().isoformat(),
+                'image': post.featured_image.url if post.featured_image else None,
+            })
+            words = WORD_RE.findall(normalize(post.title))
+            # Rank: earlier words match better, then more recent posts
+            for position, word in enumerate(words):
+                keys.append((word, position, number))
+            keys.append((normalize(post.slug), len(words), number))
+
+        keys.sort()
+        self.keys = [key for key, _, _ in keys]
+        self.entries = [(position, number) for _, position, number in keys]
+
+    def __len__(self):
+        return len(self.suggestions)
+
+    def lookup(self, query, limit=8):
+        """Suggestions whose title words all start with the typed words"""
+        words = WORD_RE.findall(normalize(query))
+        if not words:
+            return []
+
+        # Every word matches as a prefix, so abbreviated earlier words
+        # ("dja cach") still narrow the results; the last one, still being
+        # typed, alone decides the ranking
+        *earlier, last = words
+        candidates = self._matches(last)
+        for word in earlier:
+            matched = self._matches(word)
+            candidates = {number: position for number, position in candidates.items() if number in matched}
+
+        ranked = sorted(candidates, key=lambda number: (candidates[number], number))
+        return [self.suggestions[number] for number in ranked[:limit]]
+
+    def _matches(self, prefix):
+        """post number -> best word position, for keys starting with ``prefix``"""
+        found = {}
+        start = bisect_left(self.keys, prefix)
+        for i in range(start, min(start + MAX_SCAN, len(self.keys))):
+            if not self.keys[i].startswith(prefix):
+                break
+            position, number = self.entries[i]
+            if position < found.get(number, position + 1):
+                found[number] = position
+        return found
+
+
+_index = None
+_index_version = None
+_lock = threading.Lock()
+
+
+def get_prefix_index(version):
+    """The prefix index for a search content version, rebuilt when it changes"""
+    global _index, _index_version
+    if _index is not None and _index_version == version:
+        return _index
+    with _lock:
+        if _index is None or _index_version != version:
+            posts = Post.objects.published().order_by('-published_date').only(
+                'id', 'title', 'slug', 'published_date', 'featured_image'
+            )
+            _index = PrefixIndex(posts)
+            _index_version = version
+    return _index
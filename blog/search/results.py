@@ -0,0 +1,61 @@
+"""
+Per-process cache of search results.
+
+Each entry is the full, ordered list of matching post ids for one
+normalized keyword, so every page of a result set is a slice of the same
+entry. Entries carry the search content version they were computed for and
+an expiry time; a stale or expired entry is treated as a miss. The least
+recently used entry is evicted once SEARCH_RESULT_CACHE_SIZE is reached.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+
+
+def normalize_keyword(keyword):
+    """Case-fold and collapse whitespace; every backend ignores both"""
+    return ' '.join(keyword.casefold().split())
+
+
+class ResultCache:
+    def __init__(self, max_size, timeout):
+        self.max_size = max_size
+        self.timeout = timeout
+        self._entries = OrderedDict()   # keyword -> (version, expires, ids)
+        self._lock = threading.Lock()
+        self.hits = self.misses = 0
+
+    def get(self, keyword, version):
+        with self._lock:
+            entry = self._entries.get(keyword)
+            if entry is None or entry[0] != version or entry[1] < time.monotonic():
+                self.misses += 1
+                return None
+            self._entries.move_to_end(keyword)
+            self.hits += 1
+            return entry[2]
+
+    def set(self, keyword, version, ids):
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            # A tuple, so callers can't alter the cached list
+            self._entries[keyword] = (version, time.monotonic() + self.timeout, tuple(ids))
+            self._entries.move_to_end(keyword)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+result_cache = ResultCache(
+    getattr(settings, 'SEARCH_RESULT_CACHE_SIZE', 256),
+    getattr(settings, 'SEARCH_RESULT_CACHE_TIMEOUT', 5 * 60),
+)
@@ -0,0 +1,44 @@
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+
+from blog.models import Page, Post
+
+from . import get_backend, mark_content_changed
+
+# Fields that affect what search and suggestions show for a post
+PUBLIC_FIELDS = {'title', 'slug', 'excerpt', 'content', 'status', 'is_trashed', 'published_date', 'featured_image'}
+
+
+def _is_public(post):
+    """Whether search can show the post; None if its status wasn't loaded"""
+    if post.get_deferred_fields() & {'status', 'is_trashed'}:
+        return None
+    return post.status == 'published' and not post.is_trashed
+
+
+@receiver(post_init, sender=Post)
+def remember_public_state(sender, instance, **kwargs):
+    instance._search_public = _is_public(instance)
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_save, sender=Page)
+def index_saved(sender, instance, update_fields=None, **kwargs):
+    get_backend().index(instance, update_fields)
+    if sender is not Post:
+        return
+    was_public = instance._search_public
+    instance._search_public = _is_public(instance)
+    # Drafts, including every autosave, are invisible to search before and after
+    if was_public is False and instance._search_public is False:
+        return
+    if update_fields is None or PUBLIC_FIELDS & set(update_fields):
+        mark_content_changed()
+
+
+@receiver(post_delete, sender=Post)
+@receiver(post_delete, sender=Page)
+def unindex_deleted(sender, instance, **kwargs):
+    get_backend().remove(instance)
+    if sender is Post and instance._search_public is not False:
+        mark_content_changed()
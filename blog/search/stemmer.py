@@ -0,0 +1,141 @@
+"""
+The Porter stemming algorithm (M.F. Porter, 1980), used by the in-process index.
+
+Only English is supported, matching the default SEARCH_CONFIG.
+"""
+
+VOWELS = frozenset('aeiou')
+
+
+def _is_consonant(word, i):
+    char = word[i]
+    if char in VOWELS:
+        return False
+    if char == 'y':
+        return i == 0 or not _is_consonant(word, i - 1)
+    return True
+
+
+def _measure(stem):
+    """Number of vowel-consonant sequences, the ``m`` of the paper"""
+    m = 0
+    previous_vowel = False
+    for i in range(len(stem)):
+        consonant = _is_consonant(stem, i)
+        if consonant and previous_vowel:
+            m += 1
+        previous_vowel = not consonant
+    return m
+
+
+def _has_vowel(stem):
+    return any(not _is_consonant(stem, i) for i in range(len(stem)))
+
+
+def _ends_double_consonant(word):
+    return len(word) >= 2 and word[-1] == word[-2] and _is_consonant(word, len(word) - 1)
+
+
+def _ends_cvc(word):
+    if len(word) < 3:
+        return False
+    return (
+        _is_consonant(word, len(word) - 3)
+        and not _is_consonant(word, len(word) - 2)
+        and _is_consonant(word, len(word) - 1)
+        and word[-1] not in 'wxy'
+    )
+
+
+def _replace(word, rules, min_measure):
+    for suffix, replacement in rules:
+        if word.endswith(suffix):
+            stem = word[:-len(suffix)] if suffix else word
+            if _measure(stem) > min_measure:
+                return stem + replacement
+            return word
+    return word
+
+
+STEP2_RULES = [
+    ('ational', 'ate'), ('tional', 'tion'), ('enci', 'ence'), ('anci', 'ance'),
+    ('izer', 'ize'), ('bli', 'ble'), ('alli', 'al'), ('entli', 'ent'), ('eli', 'e'),
+    ('ousli', 'ous'), ('ization', 'ize'), ('ation', 'ate'), ('ator', 'ate'),
+    ('alism', 'al'), ('iveness', 'ive'), ('fulness', 'ful'), ('ousness', 'ous'),
+    ('aliti', 'al'), ('iviti', 'ive'), ('biliti', 'ble'), ('logi', 'log'),
+]
+
+STEP3_RULES = [
+    ('icate', 'ic'), ('ative', ''), ('alize', 'al'), ('iciti', 'ic'),
+    ('ical', 'ic'), ('ful', ''), ('ness', ''),
+]
+
+STEP4_SUFFIXES = [
+    'al', 'ance', 'ence', 'er', 'ic', 'able', 'ible', 'ant', 'ement', 'ment',
+    'ent', 'ion', 'ou', 'ism', 'ate', 'iti', 'ous', 'ive', 'ize',
+]
+
+
+def _step1ab(word):
+    if word.endswith('sses'):
+        word = word[:-2]
+    elif word.endswith('ies'):
+        word = word[:-2]
+    elif word.endswith('s') and not word.endswith('ss'):
+        word = word[:-1]
+
+    if word.endswith('eed'):
+        if _measure(word[:-3]) > 0:
+            word = word[:-1]
+        return word
+
+    for suffix in ('ed', 'ing'):
+        if word.endswith(suffix) and _has_vowel(word[:-len(suffix)]):
+            word = word[:-len(suffix)]
+            if word.endswith(('at', 'bl', 'iz')):
+                word += 'e'
+            elif _ends_double_consonant(word) and word[-1] not in 'lsz':
+                word = word[:-1]
+            elif _measure(word) == 1 and _ends_cvc(word):
+                word += 'e'
+            break
+    return word
+
+
+def _step1c(word):
+    if word.endswith('y') and _has_vowel(word[:-1]):
+        return word[:-1] + 'i'
+    return word
+
+
+def _step4(word):
+    for suffix in sorted(STEP4_SUFFIXES, key=len, reverse=True):
+        if word.endswith(suffix):
+            stem = word[:-len(suffix)]
+            if suffix == 'ion' and not stem.endswith(('s', 't')):
+                return word
+            return stem if _measure(stem) > 1 else word
+    return word
+
+
+def _step5(word):
+    if word.endswith('e'):
+        stem = word[:-1]
+        m = _measure(stem)
+        if m > 1 or (m == 1 and not _ends_cvc(stem)):
+            word = stem
+    if _measure(word) > 1 and _ends_double_consonant(word) and word.endswith('l'):
+        word = word[:-1]
+    return word
+
+
+def stem(word):
+    """Porter stem of a lower-case word"""
+    if len(word) <= 2:
+        return word
+    word = _step1ab(word)
+    word = _step1c(word)
+    word = _replace(word, STEP2_RULES, 0)
+    word = _replace(word, STEP3_RULES, 0)
+    word = _step4(word)
+    return _step5(word)
@@ -0,0 +1,60 @@
+import re
+
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+from blog.content import html_to_text
+
+# Highlight markers that cannot occur in stripped text; swapped for <mark> after escaping
+HIGHLIGHT_START = '\x02'
+HIGHLIGHT_STOP = '\x03'
+
+WORD_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def plain_text(html):
+    """Visible text of an HTML fragment with whitespace collapsed"""
+    return html_to_text(html)
+
+
+def document_fields(instance):
+    """The (title, excerpt, body) texts indexed for a post or page, weighted A, B and C"""
+    # The body text is stored on save, see blog.content
+    return instance.title or '', plain_text(instance.excerpt), instance.plain_text
+
+
+def render_highlights(fragment):
+    """Escape a marked-up fragment and turn the markers into <mark> tags"""
+    html = escape(fragment)
+    html = html.replace(HIGHLIGHT_START, '<mark>').replace(HIGHLIGHT_STOP, '</mark>')
+    return mark_safe(html)
+
+
+def make_snippet(text, terms, max_words=35):
+    """
+    Window of ``text`` around the first matching term with matches marked.
+
+    Used where the database cannot build headlines itself. ``terms`` are
+    compared case-insensitively as word prefixes.
+    """
+    words = text.split()
+    if not words:
+        return ''
+    terms = [term.lower() for term in terms if term]
+
+    def matches(word):
+        word = word.lower().strip('.,;:!?()[]"\'')
+        return any(word.startswith(term) for term in terms)
+
+    first = next((i for i, word in enumerate(words) if matches(word)), 0)
+    start = max(0, first - max_words // 3)
+    window = words[start:start + max_words]
+    marked = ' '.join(
+        f'{HIGHLIGHT_START}{word}{HIGHLIGHT_STOP}' if matches(word) else word
+        for word in window
+    )
+    if start > 0:
+        marked = '… ' + marked
+    if start + max_words < len(words):
+        marked += ' …'
+    return render_highlights(marked)
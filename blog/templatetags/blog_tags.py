@@ -0,0 +1,77 @@
+from django import template
+from blog.fragment_cache import FRAGMENT_NAMES, fragment_key, fragments_enabled, get_fragment, set_fragment
+from media_manager.renditions import field_renditions, render_picture
+
+register = template.Library()
+
+
+@register.simple_tag
+def responsive_image(image, size=800, sizes=None, alt='', css_class='', loading='lazy'):
+    """
+    Render a sized ``<picture>`` for an ImageField such as
+    ``Post.featured_image`` or ``Project.image``.
+
+    ``size`` is the widest the image is displayed at (CSS pixels) and picks
+    the default ``src``; ``sizes`` is passed through to the browser.
+    """
+    if not image:
+        return ''
+    return render_picture(
+        field_renditions(image),
+        image.storage,
+        image.url,
+        alt=alt,
+        sizes=sizes,
+        css_class=css_class,
+        size=size,
+        loading=loading,
+    )
+
+
+class FragmentCacheNode(template.Node):
+    def __init__(self, nodelist, name, vary_on, depends):
+        self.nodelist = nodelist
+        self.name = name
+        self.vary_on = vary_on
+        self.depends = depends
+
+    def render(self, context):
+        if not fragments_enabled():
+            return self.nodelist.render(context)
+        vary_on = [value.resolve(context) for value in self.vary_on]
+        key = fragment_key(self.name, vary_on, self.depends)
+        html = get_fragment(key, self.name)
+        if html is None:
+            html = self.nodelist.render(context)
+            set_fragment(key, html)
+        return html
+
+
+@register.tag
+def fragment_cache(parser, token):
+    """
+    Cache the enclosed template fragment::
+
+        {% fragment_cache 'post-card' post post.author 'latest' depends='categories' %}
+            ...
+        {% endfragment_cache %}
+
+    The name must be listed in ``blog.fragment_cache.FRAGMENT_NAMES``; the
+    other arguments are the values the fragment varies on. ``depends``
+    takes space-separated page cache tags.
+    """
+    bits = token.split_contents()
+    if len(bits) < 2:
+        raise template.TemplateSyntaxError(f"'{bits[0]}' tag requires a fragment name")
+    name = bits[1].strip('\'"')
+    if name not in FRAGMENT_NAMES:
+        raise template.TemplateSyntaxError(f"Unknown cached fragment '{name}'")
+
+    depends = ()
+    if bits[-1].startswith('depends='):
+        depends = tuple(bits.pop()[len('depends='):].strip('\'"').split())
+
+    nodelist = parser.parse(('endfragment_cache',))
+    parser.delete_first_token()
+    vary_on = [parser.compile_filter(bit) for bit in bits[2:]]
+    return FragmentCacheNode(nodelist, name, vary_on, depends)
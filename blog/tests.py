@@ -1,3 +1,1028 @@
-from django.test import TestCase
+import io
+import json
+import os
+import re
+import shutil
+import tempfile
+import time
+from unittest import mock
 
-# Create your tests here.
+from django.contrib import messages
+from django.contrib.auth.models import AnonymousUser, User
+from django.contrib.messages.storage.cookie import CookieStorage
+from django.contrib.postgres.search import SearchQuery, SearchVector
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.db.models import Value
+from django.http import HttpResponse
+from django.template import Context, Template, TemplateSyntaxError
+from django.test import Client, RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from PIL import Image
+
+from dashboard.context_processors import comment_notifications
+from media_manager import processing
+from media_manager.models import MediaFile
+from media_manager.renditions import FIELD_MANIFEST_TIMEOUT
+from utils.cache import check_shared_cache, is_shared_cache, versioned_key
+from utils.page_cache import cache_public_page, depends_on, invalidate_pages
+
+from . import category_cache, counters, fragment_cache
+from .context_processors import get_categories
+from .models import Category, Comment, Page, Post, UserProfile
+from . import search
+from .search import inverted, postgres, prefix, results
+from .search.inverted import InvertedIndex, InvertedIndexBackend
+from .search.stemmer import stem
+
+
+class PublicListingQueryCountTests(TestCase):
+    """Public pages run a fixed number of queries however many cards they show"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user('writer', first_name='Ada', last_name='Writer')
+        UserProfile.objects.get_or_create(user=cls.author)
+        categories = [
+            Category.objects.create(name='Design', slug='design'),
+            Category.objects.create(name='Development', slug='development'),
+        ]
+        for i in range(12):
+            post = Post.objects.create(
+                title=f'Listing post {i}',
+                slug=f'listing-post-{i}',
+                content='<p>Notes on query budgets.</p>',
+                author=cls.author,
+                status='published',
+                is_featured=i < 3,
+            )
+            post.category.set(categories)
+        post = Post.objects.create(
+            title='Zebra crossing', slug='zebra-crossing', content='<p>Stripes.</p>',
+            author=cls.author, status='published',
+        )
+        post.category.set(categories)
+
+    def setUp(self):
+        # Page, fragment and category caches would hide the queries
+        cache.clear()
+
+    def assertPageQueries(self, num, url):
+        with self.assertNumQueries(num):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+
+    def test_blog_index(self):
+        self.assertPageQueries(6, reverse('blog'))
+
+    def test_category_listing(self):
+        self.assertPageQueries(5, reverse('posts_by_category_page_or_post', kwargs={'slug': 'design'}))
+
+    def test_author_page(self):
+        self.assertPageQueries(8, reverse('author_page', kwargs={'username': 'writer'}))
+
+    def test_post_detail(self):
+        self.assertPageQueries(11, reverse('posts_by_category_page_or_post', kwargs={'slug': 'listing-post-4'}))
+
+    def test_search_queries_do_not_grow_with_results(self):
+        # The number of queries depends on the search backend, but not on
+        # how many posts are shown
+        counts = []
+        for keyword in ('zebra', 'listing'):
+            cache.clear()
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(reverse('search'), {'q': keyword})
+            self.assertEqual(response.status_code, 200)
+            counts.append(len(queries))
+        self.assertEqual(counts[0], counts[1])
+
+
+class IndexUsageTests(TestCase):
+    """The hot public and dashboard queries are answered from their indexes"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user('indexed')
+        cls.post = Post.objects.create(
+            title='Indexed', slug='indexed', content='<p>Plans.</p>', author=cls.author, status='published',
+        )
+        Comment.objects.create(post=cls.post, name='Reader', email='reader@example.com', body='Hi', approved=True)
+
+    def setUp(self):
+        if connection.vendor == 'postgresql':
+            # A handful of rows is cheaper to scan; make the planner show its index choice
+            with connection.cursor() as cursor:
+                cursor.execute('SET LOCAL enable_seqscan = off')
+
+    def assertUsesIndex(self, queryset, index_name):
+        plan = queryset.explain()
+        self.assertIn(index_name, plan)
+
+    def test_published_posts_by_date(self):
+        self.assertUsesIndex(Post.objects.published().order_by('-published_date'), 'blog_post_published_idx')
+
+    def test_author_posts_by_date(self):
+        self.assertUsesIndex(
+            Post.objects.published().filter(author=self.author).order_by('-published_date'),
+            'blog_post_author_pub_idx',
+        )
+
+    def test_published_pages_by_date(self):
+        self.assertUsesIndex(Page.objects.published().order_by('-published_date'), 'blog_page_published_idx')
+
+    def test_dashboard_posts_by_creation(self):
+        self.assertUsesIndex(
+            Post.objects.filter(is_trashed=False, status='draft').order_by('-created_at'),
+            'blog_post_active_created_idx',
+        )
+
+    def test_approved_comments_of_post(self):
+        self.assertUsesIndex(self.post.comments.filter(approved=True, parent=None), 'blog_comment_approved_idx')
+
+    def test_pending_comments(self):
+        self.assertUsesIndex(Comment.objects.filter(approved=False), 'blog_comment_pending_idx')
+
+
+class DerivedTextTests(TestCase):
+    """Plain text, word count and read time are derived once per body"""
+
+    def setUp(self):
+        self.post = Post.objects.create(
+            title='Derived', slug='derived', content='<p>Fish &amp; chips</p> <p>for <b>two</b></p>',
+        )
+
+    def test_derived_from_content(self):
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.plain_text, 'Fish & chips for two')
+        self.assertEqual(self.post.word_count, 5)
+        self.assertEqual(self.post.read_time, 1)
+        self.assertEqual(self.post.summary, 'Fish & chips for two')
+
+    def test_excerpt_markup_is_not_rendered(self):
+        author = User.objects.create_user('excerpted')
+        UserProfile.objects.get_or_create(user=author)
+        self.post.author = author
+        self.post.status = 'published'
+        self.post.excerpt = '<img src=x onerror=alert(1)><b>Bold</b> intro'
+        self.post.save()
+        self.assertEqual(self.post.summary, 'Bold intro')
+        cache.clear()
+        for url in (reverse('blog'), reverse('author_page', kwargs={'username': 'excerpted'})):
+            response = self.client.get(url)
+            self.assertContains(response, 'Bold intro')
+            self.assertNotContains(response, 'onerror')
+
+    def test_unchanged_content_is_not_derived_again(self):
+        self.post.plain_text = 'stale'
+        self.post.title = 'Autosaved'
+        self.post.save()
+        self.assertEqual(self.post.plain_text, 'stale')
+
+    def test_update_fields_save_includes_derived_fields(self):
+        self.post.content = '<p>One two three</p>'
+        self.post.save(update_fields=['content'])
+        self.post.refresh_from_db()
+        self.assertEqual((self.post.plain_text, self.post.word_count), ('One two three', 3))
+
+
+class StemmerTests(SimpleTestCase):
+    """Porter's published examples, one or more per step"""
+
+    CASES = {
+        # Step 1a, 1b, 1c
+        'caresses': 'caress', 'ponies': 'poni', 'ties': 'ti', 'caress': 'caress', 'cats': 'cat',
+        'feed': 'feed', 'agreed': 'agre', 'plastered': 'plaster', 'bled': 'bled', 'motoring': 'motor',
+        'sing': 'sing', 'conflated': 'conflat', 'troubled': 'troubl', 'sized': 'size', 'hopping': 'hop',
+        'tanned': 'tan', 'falling': 'fall', 'hissing': 'hiss', 'fizzed': 'fizz', 'failing': 'fail',
+        'filing': 'file', 'happy': 'happi', 'sky': 'sky',
+        # Steps 2 and 3
+        'relational': 'relat', 'conditional': 'condit', 'rational': 'ration', 'digitizer': 'digit',
+        'vietnamization': 'vietnam', 'operator': 'oper', 'feudalism': 'feudal', 'decisiveness': 'decis',
+        'hopefulness': 'hope', 'sensibiliti': 'sensibl', 'triplicate': 'triplic', 'formative': 'form',
+        'electrical': 'electr', 'goodness': 'good',
+        # Steps 4 and 5
+        'revival': 'reviv', 'allowance': 'allow', 'inference': 'infer', 'adjustable': 'adjust',
+        'replacement': 'replac', 'adoption': 'adopt', 'communism': 'commun', 'effective': 'effect',
+        'bowdlerize': 'bowdler', 'probate': 'probat', 'rate': 'rate', 'cease': 'ceas',
+        'controll': 'control', 'roll': 'roll',
+        # Several steps together
+        'generalizations': 'gener', 'oscillators': 'oscil', 'running': 'run',
+    }
+
+    def test_porter_examples(self):
+        for word, expected in self.CASES.items():
+            with self.subTest(word=word):
+                self.assertEqual(stem(word), expected)
+
+    def test_short_words_unchanged(self):
+        self.assertEqual(stem('is'), 'is')
+
+
+class InvertedIndexTests(SimpleTestCase):
+    """BM25F ranking, incremental updates and the on-disk format"""
+
+    def build(self):
+        index = InvertedIndex()
+        index.add(1, ('Caching guide', '', 'How we cache pages.'), 100.0)
+        index.add(2, ('Release notes', '', 'Caching, caching and more caching.'), 200.0)
+        index.add(3, ('Team lunch', '', 'Pizza for everyone.'), 300.0)
+        index.add(4, ('Launch day', '', 'Nothing about the topic.'), 400.0)
+        return index
+
+    def test_title_match_outranks_body_match(self):
+        self.assertEqual(self.build().search('caching'), [1, 2])
+
+    def test_rare_terms_weigh_more(self):
+        # "pizza" occurs in one post, "caching" in two
+        self.assertEqual(self.build().search('caching pizza')[0], 3)
+
+    def test_ties_broken_by_recency(self):
+        index = InvertedIndex()
+        index.add(1, ('Same words', '', ''), 100.0)
+        index.add(2, ('Same words', '', ''), 200.0)
+        self.assertEqual(index.search('words'), [2, 1])
+
+    def test_stop_words_and_unknown_terms(self):
+        index = self.build()
+        self.assertEqual(index.search('the and'), [])
+        self.assertEqual(index.search('kubernetes'), [])
+
+    def test_reindex_replaces_and_remove_drops(self):
+        index = self.build()
+        index.add(1, ('Gardening', '', 'Tomatoes.'), 100.0)
+        self.assertEqual(index.search('caching'), [2])
+        self.assertEqual(index.search('tomatoes'), [1])
+        index.remove(2)
+        self.assertEqual(index.search('caching'), [])
+        self.assertEqual((len(index), index.retired), (3, 2))
+
+    def test_compact_keeps_results(self):
+        index = self.build()
+        index.add(3, ('Team dinner', '', 'Pasta and caching.'), 300.0)
+        before = index.search('caching team')
+        index.compact()
+        self.assertEqual(index.retired, 0)
+        self.assertEqual(index.search('caching team'), before)
+
+    def test_dump_load_round_trip(self):
+        index = self.build()
+        index.remove(4)
+        fh = io.BytesIO()
+        index.dump(fh)
+        fh.seek(0)
+        loaded = InvertedIndex.load(fh)
+        self.assertEqual(len(loaded), 3)
+        self.assertEqual(loaded.total_length, index.total_length)
+        for query in ('caching', 'pizza', 'launch', 'release caching'):
+            self.assertEqual(loaded.search(query), index.search(query))
+
+    def test_load_rejects_other_files(self):
+        with self.assertRaises(ValueError):
+            InvertedIndex.load(io.BytesIO(b'not an index'))
+
+
+class InvertedIndexBackendTests(TestCase):
+    """Updates are journaled; the base file is only rewritten when compacting"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user('indexer')
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory, ignore_errors=True)
+        self.path = os.path.join(self.directory, 'posts.idx')
+        self.backend = InvertedIndexBackend(self.path)
+        self.backend.rebuild()
+
+    def make_post(self, title, status='published'):
+        # Not through save(), whose signal feeds the process-wide backend
+        post = Post(title=title, slug=title.lower().replace(' ', '-'), content=f'<p>{title}</p>',
+                    author=self.author, status=status)
+        post.plain_text = title
+        post.pk = Post.all_objects.count() + 1000
+        return post
+
+    def test_update_appends_to_journal_only(self):
+        base_mtime = os.stat(self.path).st_mtime_ns
+        self.backend.index(self.make_post('Journal entry'))
+        self.assertEqual(os.stat(self.path).st_mtime_ns, base_mtime)
+        self.assertGreater(os.path.getsize(self.backend.journal_path), 0)
+        self.assertEqual(len(self.backend.search('journal')), 1)
+
+    def test_other_process_sees_journaled_updates(self):
+        post = self.make_post('Shared update')
+        other = InvertedIndexBackend(self.path)
+        self.assertEqual(other.search('shared'), [])
+        self.backend.index(post)
+        self.assertEqual(other.search('shared'), [post.pk])
+        post.status = 'draft'
+        self.backend.index(post)
+        self.assertEqual(other.search('shared'), [])
+
+    def test_unindexed_draft_writes_nothing(self):
+        self.backend.index(self.make_post('Autosaved draft', status='draft'))
+        self.assertFalse(os.path.exists(self.backend.journal_path) and os.path.getsize(self.backend.journal_path))
+
+    def test_compacts_after_threshold(self):
+        with mock.patch.object(inverted, 'COMPACT_AFTER', 3):
+            posts = [self.make_post(f'Batch {word}') for word in ('alpha', 'beta', 'gamma')]
+            for number, post in enumerate(posts):
+                post.pk += number
+                self.backend.index(post)
+        self.assertEqual(os.path.getsize(self.backend.journal_path), 0)
+        reloaded = InvertedIndexBackend(self.path)
+        self.assertEqual(len(reloaded.search('batch')), 3)
+
+
+class PostgresSearchTests(SimpleTestCase):
+    """The full-text query and document built for PostgreSQL; the SQL itself needs a PostgreSQL server"""
+
+    def test_queries_use_websearch_syntax(self):
+        self.assertEqual(
+            postgres.search_query('"dark mode" -light'),
+            SearchQuery('"dark mode" -light', search_type='websearch', config='english'),
+        )
+        self.assertEqual(postgres.search_query('dark').function, 'websearch_to_tsquery')
+
+    @override_settings(SEARCH_CONFIG='simple')
+    def test_text_search_configuration_is_a_setting(self):
+        self.assertEqual(postgres.search_query('dark'), SearchQuery('dark', search_type='websearch', config='simple'))
+
+    def test_document_weights(self):
+        post = Post(title='Dark mode', excerpt='<p>Less &amp; glare</p>', plain_text='Body text')
+        self.assertEqual(
+            postgres.build_search_vector(post),
+            SearchVector(Value('Dark mode'), weight='A', config='english') +
+            SearchVector(Value('Less & glare'), weight='B', config='english') +
+            SearchVector(Value('Body text'), weight='C', config='english'),
+        )
+
+    def test_only_document_changes_reindex(self):
+        backend = postgres.PostgresSearchBackend()
+        post = Post(pk=1, title='Dark mode')
+        with mock.patch.object(postgres, 'update_search_vector') as update:
+            backend.index(post, update_fields=['status', 'is_trashed'])
+            update.assert_not_called()
+            backend.index(post, update_fields=['title', 'updated_at'])
+            backend.index(post)
+        self.assertEqual(update.call_count, 2)
+
+    def test_backend_follows_the_database(self):
+        for vendor, backend in (('postgresql', postgres.PostgresSearchBackend), ('sqlite', InvertedIndexBackend)):
+            with self.subTest(vendor=vendor), override_settings(SEARCH_BACKEND=None), \
+                    mock.patch.object(search, '_backend', None), \
+                    mock.patch.object(search.connection, 'vendor', vendor):
+                self.assertIsInstance(search.get_backend(), backend)
+
+
+class SuggestTests(TestCase):
+    """Search-as-you-type answers from an in-memory prefix index of published titles"""
+
+    @classmethod
+    def setUpTestData(cls):
+        now = timezone.now()
+        cls.posts = [
+            Post.objects.create(
+                title=title, slug=slug, content='', status='published',
+                published_date=now - timezone.timedelta(days=age),
+            )
+            for title, slug, age in (
+                ('Caching in Django', 'caching-in-django', 3),
+                ('Django caching recipes', 'recipes', 1),
+                ('Café culture', 'cafe-culture', 2),
+            )
+        ]
+        Post.objects.create(title='Caching drafts', slug='caching-drafts', content='')
+
+    def setUp(self):
+        cache.clear()
+        prefix._index = None
+
+    def titles(self, query, limit=8):
+        return [result['title'] for result in search.suggest(query, limit)]
+
+    def test_prefix_lookup_ranks_earlier_words_first(self):
+        self.assertEqual(self.titles('cach'), ['Caching in Django', 'Django caching recipes'])
+        self.assertEqual(self.titles('django cach'), ['Caching in Django', 'Django caching recipes'])
+        self.assertEqual(self.titles('recipes dja'), ['Django caching recipes'])
+        # Earlier words are prefixes too, not whole words
+        self.assertEqual(self.titles('rec dja'), ['Django caching recipes'])
+        self.assertEqual(self.titles('caf cul'), ['Café culture'])
+        self.assertEqual(self.titles('cafes cul'), [])
+        self.assertEqual(self.titles('cach', limit=1), ['Caching in Django'])
+        self.assertEqual(self.titles('cafe'), ['Café culture'])
+        self.assertEqual(self.titles('recipes'), ['Django caching recipes'])
+        self.assertEqual(self.titles('pizza'), [])
+        self.assertEqual(self.titles('!!'), [])
+
+    def test_suggestions_carry_the_card_data(self):
+        result = search.suggest('cafe')[0]
+        self.assertEqual(result['url'], reverse('posts_by_category_page_or_post', kwargs={'slug': 'cafe-culture'}))
+        self.assertEqual(result['date'], self.posts[2].published_date.date().isoformat())
+        self.assertIsNone(result['image'])
+
+    def test_index_is_built_once_per_content_version(self):
+        search.suggest('cach')
+        with self.assertNumQueries(0):
+            search.suggest('django')
+        self.posts[0].status = 'draft'
+        self.posts[0].save()
+        self.assertEqual(self.titles('cach'), ['Django caching recipes'])
+
+    def test_endpoint_limits(self):
+        url = reverse('search_suggest')
+        response = self.client.get(url, {'q': ' cach '})
+        self.assertEqual(response.json()['query'], 'cach')
+        self.assertEqual(len(response.json()['results']), 2)
+        self.assertIn('max-age=60', response['Cache-Control'])
+
+        self.assertEqual(self.client.get(url, {'q': 'c'}).json()['results'], [])
+        self.assertEqual(len(self.client.get(url, {'q': 'cach', 'limit': '0'}).json()['results']), 1)
+        self.assertEqual(len(self.client.get(url, {'q': 'cach', 'limit': 'many'}).json()['results']), 2)
+        with mock.patch.object(prefix.PrefixIndex, 'lookup', return_value=[]) as lookup:
+            self.client.get(url, {'q': 'cach', 'limit': '500'})
+        lookup.assert_called_once_with('cach', 20)
+
+
+class ResultCacheTests(SimpleTestCase):
+    """Per-process LRU of result id lists, keyed on the normalized keyword and content version"""
+
+    def test_keywords_are_normalized(self):
+        self.assertEqual(results.normalize_keyword('  Dark\tMODE  '), 'dark mode')
+        self.assertEqual(results.normalize_keyword('STRASSE'), results.normalize_keyword('straße'))
+
+    def test_least_recently_used_entry_is_evicted(self):
+        cache = results.ResultCache(max_size=2, timeout=60)
+        cache.set('a', 1, [1])
+        cache.set('b', 1, [2])
+        self.assertEqual(cache.get('a', 1), (1,))
+        cache.set('c', 1, [3])
+        self.assertIsNone(cache.get('b', 1))
+        self.assertEqual(cache.get('a', 1), (1,))
+        self.assertEqual(len(cache), 2)
+        self.assertEqual((cache.hits, cache.misses), (2, 1))
+
+    def test_stale_and_expired_entries_miss(self):
+        cache = results.ResultCache(max_size=4, timeout=60)
+        with mock.patch.object(results.time, 'monotonic', return_value=100):
+            cache.set('a', 1, [1])
+            self.assertIsNone(cache.get('a', 2))
+        with mock.patch.object(results.time, 'monotonic', return_value=159):
+            self.assertEqual(cache.get('a', 1), (1,))
+        with mock.patch.object(results.time, 'monotonic', return_value=161):
+            self.assertIsNone(cache.get('a', 1))
+
+    def test_zero_size_disables_caching(self):
+        cache = results.ResultCache(max_size=0, timeout=60)
+        cache.set('a', 1, [1])
+        self.assertIsNone(cache.get('a', 1))
+
+
+class SearchResultCacheTests(TestCase):
+    """Repeated searches skip the backend until a published post changes"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.post = Post.objects.create(
+            title='Caching in Django', slug='caching-in-django', content='<p>Caching</p>', status='published',
+        )
+
+    def setUp(self):
+        cache.clear()
+        results.result_cache.clear()
+
+    def test_results_are_cached_per_version(self):
+        backend = search.get_backend()
+        with mock.patch.object(backend, 'search', wraps=backend.search) as backend_search:
+            self.assertEqual(search.search_post_ids('Caching'), [self.post.pk])
+            self.assertEqual(search.search_post_ids('  caching '), [self.post.pk])
+            self.assertEqual(backend_search.call_count, 1)
+
+            self.post.status = 'draft'
+            self.post.save()
+            self.assertEqual(search.search_post_ids('caching'), [])
+            self.assertEqual(backend_search.call_count, 2)
+
+            # Saves that can't change the results keep the cache
+            self.post.save(update_fields=['seo_keywords'])
+            search.search_post_ids('caching')
+            self.assertEqual(backend_search.call_count, 2)
+
+    def test_draft_autosaves_keep_cached_results(self):
+        author = User.objects.create_user('drafter')
+        draft = Post.objects.create(title='Caching draft', slug='caching-draft', content='', author=author)
+        search.search_post_ids('caching')
+        version = search.content_version()
+
+        self.client.force_login(author)
+        response = self.client.post(reverse('auto_save_post'), json.dumps({
+            'post_id': draft.pk, 'base_revision': 0,
+            'changes': {'title': 'Caching draft, edited', 'content': '<p>More caching</p>'},
+        }), content_type='application/json')
+        self.assertTrue(response.json()['success'])
+        self.assertEqual(search.content_version(), version)
+        with mock.patch.object(search.get_backend(), 'search') as backend_search:
+            self.assertEqual(search.search_post_ids('caching'), [self.post.pk])
+        backend_search.assert_not_called()
+
+        draft.refresh_from_db()
+        draft.status = 'published'
+        draft.save()
+        self.assertNotEqual(search.content_version(), version)
+        # The index outlives the test transaction
+        draft.delete()
+
+    def test_callers_get_a_copy(self):
+        search.search_post_ids('caching').append(0)
+        self.assertEqual(search.search_post_ids('caching'), [self.post.pk])
+
+
+class PageCacheTests(TestCase):
+    """Anonymous pages are served from the cache until a tag they depend on changes"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user('cached', password='secret')
+        UserProfile.objects.get_or_create(user=cls.author)
+        cls.category = Category.objects.create(name='Cached', slug='cached')
+        cls.post = Post.objects.create(
+            title='Cached post', slug='cached-post', content='<p>Body.</p>',
+            author=cls.author, status='published',
+        )
+        cls.post.category.set([cls.category])
+        cls.draft = Post.objects.create(title='Quiet draft', slug='quiet-draft', content='<p>Draft.</p>', author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+        self.detail_url = reverse('posts_by_category_page_or_post', kwargs={'slug': 'cached-post'})
+
+    def served_from_cache(self, url, client=None, **params):
+        with CaptureQueriesContext(connection) as queries:
+            response = (client or self.client).get(url, params)
+        self.assertEqual(response.status_code, 200)
+        return len(queries) == 0
+
+    def warm(self, *urls):
+        for url in urls:
+            self.served_from_cache(url)
+
+    def test_served_from_cache(self):
+        self.assertFalse(self.served_from_cache(reverse('blog')))
+        self.assertTrue(self.served_from_cache(reverse('blog')))
+
+    @override_settings(SINGLE_PROCESS_CACHE=False)
+    def test_process_local_cache_is_not_used(self):
+        self.assertFalse(is_shared_cache())
+        self.assertEqual([warning.id for warning in check_shared_cache(None)], ['utils.W001'])
+        self.warm(reverse('blog'))
+        self.assertFalse(self.served_from_cache(reverse('blog')))
+
+        dummy = {'default': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}}
+        with override_settings(CACHES=dummy):
+            self.assertTrue(is_shared_cache())
+            self.assertEqual(check_shared_cache(None), [])
+
+    def test_key_ignores_undeclared_query_params(self):
+        self.warm(reverse('blog'))
+        self.assertTrue(self.served_from_cache(reverse('blog'), utm_source='newsletter'))
+        self.assertFalse(self.served_from_cache(reverse('blog'), page='2'))
+        self.assertTrue(self.served_from_cache(reverse('blog'), page='2', utm_source='newsletter'))
+
+    def test_authenticated_requests_bypass_cache(self):
+        self.warm(reverse('blog'))
+        self.client.force_login(self.author)
+        self.assertFalse(self.served_from_cache(reverse('blog')))
+
+    def test_each_visitor_gets_own_csrf_token(self):
+        self.warm(self.detail_url)
+        visitor = Client(enforce_csrf_checks=True)
+        with CaptureQueriesContext(connection) as queries:
+            response = visitor.get(self.detail_url)
+        self.assertEqual(len(queries), 0)
+        self.assertNotIn(b'__page_cache_csrf_token__', response.content)
+        token = re.search(rb'name="csrfmiddlewaretoken" value="([^"]+)"', response.content).group(1).decode()
+        response = visitor.post(self.detail_url, {
+            'csrfmiddlewaretoken': token, 'name': 'Visitor', 'email': 'visitor@example.com', 'body': 'Hello',
+        })
+        self.assertEqual(response.status_code, 302)
+
+    def test_pending_messages_bypass_cache(self):
+        @cache_public_page('posts')
+        def view(request):
+            return HttpResponse('listing')
+
+        request = RequestFactory().get('/messages/')
+        request.user = AnonymousUser()
+        request._messages = CookieStorage(request)
+        view(request)
+        request._messages.add(messages.INFO, 'Saved.')
+        with mock.patch('utils.page_cache.cache.set') as cache_set:
+            view(request)
+        cache_set.assert_not_called()
+
+    def test_depends_on_adds_tags(self):
+        calls = []
+
+        @cache_public_page()
+        def view(request):
+            calls.append(request)
+            depends_on(request, 'extra')
+            return HttpResponse('page')
+
+        def get():
+            request = RequestFactory().get('/tagged/')
+            request.user = AnonymousUser()
+            request._messages = CookieStorage(request)
+            view(request)
+
+        get()
+        get()
+        invalidate_pages('extra')
+        get()
+        self.assertEqual(len(calls), 2)
+
+    def test_draft_saves_evict_nothing(self):
+        self.warm(reverse('blog'), self.detail_url)
+        self.draft.title = 'Renamed draft'
+        self.draft.save()
+        self.draft.category.add(self.category)
+        self.assertTrue(self.served_from_cache(reverse('blog')))
+        self.assertTrue(self.served_from_cache(self.detail_url))
+
+    def test_unlisted_edit_evicts_only_the_post_page(self):
+        self.warm(reverse('blog'), self.detail_url)
+        post = Post.objects.get(pk=self.post.pk)
+        post.seo_description = 'About caching'
+        post.save()
+        self.assertTrue(self.served_from_cache(reverse('blog')))
+        self.assertFalse(self.served_from_cache(self.detail_url))
+
+    def test_listed_field_edit_evicts_lists(self):
+        self.warm(reverse('blog'))
+        post = Post.objects.for_listing().get(pk=self.post.pk)
+        post.title = 'Retitled post'
+        post.save(update_fields=['title'])
+        self.assertFalse(self.served_from_cache(reverse('blog')))
+
+    def test_publishing_and_trashing_evict_lists(self):
+        for change in (
+            lambda: Post.objects.create(title='Fresh', slug='fresh', content='', author=self.author, status='published'),
+            lambda: Post.objects.get(pk=self.post.pk).move_to_trash(),
+            lambda: Post.objects.get(slug='fresh').delete(),
+        ):
+            self.warm(reverse('blog'))
+            change()
+            self.assertFalse(self.served_from_cache(reverse('blog')))
+
+    def test_comments_evict_their_post_page(self):
+        self.warm(reverse('blog'), self.detail_url)
+        Comment.objects.create(post=self.post, name='Reader', email='r@example.com', body='Nice', approved=True)
+        self.assertTrue(self.served_from_cache(reverse('blog')))
+        self.assertFalse(self.served_from_cache(self.detail_url))
+
+
+class CategoryCacheTests(TestCase):
+    """The navigation categories come from a per-process copy checked against a shared version"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.design = Category.objects.create(name='Design', slug='design', order=2)
+        cls.code = Category.objects.create(name='Code', slug='code', order=1)
+
+    def setUp(self):
+        cache.clear()
+        category_cache._process_cache.clear()
+
+    def test_warm_reads_skip_the_database_and_shared_cache(self):
+        with self.assertNumQueries(1):
+            self.assertEqual(category_cache.get_cached_categories(), [self.code, self.design])
+        # The process copy is used even when the shared entry is gone
+        cache.delete(versioned_key(category_cache.NAMESPACE, 'list'))
+        with self.assertNumQueries(0):
+            self.assertEqual(category_cache.get_cached_categories(), [self.code, self.design])
+
+    def test_other_processes_share_the_built_list(self):
+        category_cache.get_cached_categories()
+        category_cache._process_cache.clear()
+        with self.assertNumQueries(0):
+            self.assertEqual(len(category_cache.get_cached_categories()), 2)
+
+    @override_settings(SINGLE_PROCESS_CACHE=False)
+    def test_process_local_cache_is_not_used(self):
+        category_cache.get_cached_categories()
+        with self.assertNumQueries(1):
+            category_cache.get_cached_categories()
+        with self.assertNumQueries(1):
+            counters.pending_comment_count()
+        self.assertIsNone(cache.get(counters.PENDING_COMMENTS_KEY))
+
+    def test_category_changes_invalidate(self):
+        category_cache.get_cached_categories()
+        news = Category.objects.create(name='News', slug='news', order=0)
+        self.assertEqual(category_cache.get_cached_categories()[0], news)
+        news.delete()
+        self.assertEqual(category_cache.get_cached_categories(), [self.code, self.design])
+
+    def test_published_post_count_changes_invalidate(self):
+        category_cache.get_cached_categories()
+        post = Post.objects.create(title='Counted', slug='counted', content='<p>x</p>', status='published')
+        post.category.add(self.code)
+        self.assertEqual(category_cache.get_cached_categories()[0].published_post_count, 1)
+        post.move_to_trash()
+        self.assertEqual(category_cache.get_cached_categories()[0].published_post_count, 0)
+
+    def test_context_processors_are_lazy(self):
+        staff = User.objects.create_user('moderator', is_staff=True)
+        request = RequestFactory().get('/')
+        request.user = staff
+        Comment.objects.create(
+            post=Post.objects.create(title='Commented', slug='commented', content=''),
+            name='Reader', email='r@example.com', body='Hi',
+        )
+        with self.assertNumQueries(0):
+            context = {**get_categories(request), **comment_notifications(request)}
+            Template('{{ title }}').render(Context({**context, 'title': 'Unused'}))
+        with self.assertNumQueries(2):
+            rendered = Template(
+                '{% for category in categories %}{{ category.name }} {% endfor %}{{ pending_comments_count }}'
+            ).render(Context(context))
+        self.assertEqual(rendered, 'Code Design 1')
+
+        request.user = AnonymousUser()
+        self.assertEqual(comment_notifications(request), {})
+
+
+class DenormalizedCounterTests(TestCase):
+    """Stored counters and the pending badge always equal a fresh COUNT(*)"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user('counted')
+        cls.design = Category.objects.create(name='Design', slug='design')
+        cls.code = Category.objects.create(name='Code', slug='code')
+
+    def setUp(self):
+        cache.clear()
+
+    def assertCountersExact(self):
+        for category in Category.objects.all():
+            self.assertEqual(
+                category.published_post_count,
+                Post.objects.published().filter(category=category).count(),
+                category.name,
+            )
+        for post in Post.all_objects.all():
+            self.assertEqual(post.approved_comment_count, post.comments.filter(approved=True).count(), post.title)
+        self.assertEqual(counters.pending_comment_count(), Comment.objects.filter(approved=False).count())
+        # The running count must match without recounting too
+        self.assertEqual(cache.get(counters.PENDING_COMMENTS_KEY), Comment.objects.filter(approved=False).count())
+
+    def make_post(self, status='published', categories=()):
+        post = Post.objects.create(
+            title='Counted post', content='<p>x</p>', author=self.author, status=status,
+            slug=f'counted-{Post.all_objects.count()}',
+        )
+        post.category.set(categories)
+        return post
+
+    def test_publish_unpublish_and_trash(self):
+        post = self.make_post(status='draft', categories=[self.design])
+        self.assertCountersExact()
+        post.status = 'published'
+        post.save()
+        self.assertCountersExact()
+        post.move_to_trash()
+        self.assertCountersExact()
+        post.restore_from_trash()
+        self.assertCountersExact()
+        post.delete()
+        self.assertCountersExact()
+
+    def test_post_moves_between_categories(self):
+        post = self.make_post(categories=[self.design])
+        self.assertCountersExact()
+        post.category.set([self.code])
+        self.assertCountersExact()
+        post.category.add(self.design)
+        self.assertCountersExact()
+        post.category.clear()
+        self.assertCountersExact()
+        self.code.posts.add(post)
+        self.assertCountersExact()
+        self.code.posts.clear()
+        self.assertCountersExact()
+
+    def test_deferred_status_refreshes_anyway(self):
+        post = self.make_post(categories=[self.design])
+        deferred = Post.objects.defer('status').get(pk=post.pk)
+        self.assertIsNone(deferred._counted_public)
+        Post.objects.filter(pk=post.pk).update(status='draft')
+        deferred.save(update_fields=['title'])
+        self.assertCountersExact()
+
+    def test_comment_approved_then_deleted(self):
+        post = self.make_post()
+        counters.pending_comment_count()
+        comment = Comment.objects.create(post=post, name='Reader', email='r@example.com', body='Hi')
+        self.assertCountersExact()
+        comment.approved = True
+        comment.save()
+        self.assertCountersExact()
+        comment.approved = False
+        comment.save()
+        self.assertCountersExact()
+        comment.approved = True
+        comment.save()
+        comment.delete()
+        self.assertCountersExact()
+
+        pending = Comment.objects.create(post=post, name='Reader', email='r@example.com', body='Hi')
+        self.assertCountersExact()
+        pending.delete()
+        self.assertCountersExact()
+
+    def test_comment_deleted_with_its_post(self):
+        post = self.make_post(categories=[self.design])
+        counters.pending_comment_count()
+        Comment.objects.create(post=post, name='Reader', email='r@example.com', body='Hi')
+        Comment.objects.create(post=post, name='Reader', email='r@example.com', body='Hi', approved=True)
+        post.delete()
+        self.assertCountersExact()
+
+    def test_adjust_pending(self):
+        counters._adjust_pending(1)
+        self.assertIsNone(cache.get(counters.PENDING_COMMENTS_KEY))
+
+        cache.set(counters.PENDING_COMMENTS_KEY, 2)
+        counters._adjust_pending(1)
+        self.assertEqual(cache.get(counters.PENDING_COMMENTS_KEY), 3)
+        counters._adjust_pending(-3)
+        self.assertEqual(cache.get(counters.PENDING_COMMENTS_KEY), 0)
+        counters._adjust_pending(-1)
+        self.assertIsNone(cache.get(counters.PENDING_COMMENTS_KEY))
+
+
+class FragmentCacheTests(TestCase):
+    """Cached fragments are keyed on what they show and retired when it changes"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user('fragmented')
+        cls.profile, _ = UserProfile.objects.get_or_create(user=cls.author)
+        cls.category = Category.objects.create(name='Fragments', slug='fragments')
+        cls.post = Post.objects.create(
+            title='Fragment post', slug='fragment-post', content='<p>x</p>', author=cls.author, status='published',
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def render(self, source, **context):
+        return Template('{% load blog_tags %}' + source).render(Context(context))
+
+    def key(self, *vary_on, depends=()):
+        return fragment_cache.fragment_key('post-card', vary_on, depends)
+
+    def test_tag_serves_cached_html(self):
+        source = "{% fragment_cache 'post-sidebar' post %}{{ text }}{% endfragment_cache %}"
+        self.assertEqual(self.render(source, post=self.post, text='first'), 'first')
+        self.assertEqual(self.render(source, post=self.post, text='second'), 'first')
+        self.assertEqual(fragment_cache.fragment_stats()['post-sidebar'], (1, 1))
+        fragment_cache.reset_fragment_stats()
+        self.assertEqual(fragment_cache.fragment_stats()['post-sidebar'], (0, 0))
+
+    def test_tag_renders_every_time_without_shared_cache(self):
+        source = "{% fragment_cache 'post-sidebar' post %}{{ text }}{% endfragment_cache %}"
+        for settings_override in ({'SINGLE_PROCESS_CACHE': False}, {'FRAGMENT_CACHE_TIMEOUT': 0}):
+            with self.subTest(**settings_override), override_settings(**settings_override):
+                self.assertEqual(self.render(source, post=self.post, text='first'), 'first')
+                self.assertEqual(self.render(source, post=self.post, text='second'), 'second')
+        self.assertEqual(fragment_cache.fragment_stats()['post-sidebar'], (0, 0))
+
+    def test_tag_rejects_unknown_names(self):
+        for source in ("{% fragment_cache %}{% endfragment_cache %}", "{% fragment_cache 'nope' %}{% endfragment_cache %}"):
+            with self.subTest(source=source), self.assertRaises(TemplateSyntaxError):
+                self.render(source)
+
+    def test_key_follows_updated_at_and_tags(self):
+        key = self.key(self.post, 'latest')
+        self.assertEqual(self.key(self.post, 'latest'), key)
+        self.assertNotEqual(self.key(self.post, 'author'), key)
+        self.assertNotEqual(self.key(self.post, 'latest', depends=('categories',)), key)
+
+        tagged = self.key(self.post, depends=('categories',))
+        invalidate_pages('categories')
+        self.assertNotEqual(self.key(self.post, depends=('categories',)), tagged)
+
+        self.post.category.add(self.category)
+        self.post.refresh_from_db()
+        self.assertNotEqual(self.key(self.post, 'latest'), key)
+
+    def test_key_follows_user_and_profile_saves(self):
+        key = self.key(self.author)
+        self.author.last_login = timezone.now()
+        self.author.save(update_fields=['last_login'])
+        self.assertEqual(self.key(self.author), key)
+
+        self.author.first_name = 'Renamed'
+        self.author.save()
+        renamed = self.key(self.author)
+        self.assertNotEqual(renamed, key)
+
+        self.profile.bio = 'New bio'
+        self.profile.save()
+        self.assertNotEqual(self.key(self.author), renamed)
+
+    def test_cards_show_renamed_author(self):
+        url = reverse('posts_by_category_page_or_post', kwargs={'slug': 'fragments'})
+        self.post.category.add(self.category)
+        # The profile's blank names were copied to the user
+        self.assertContains(self.client.get(url), '>fragmented<')
+        profile = UserProfile.objects.get(pk=self.profile.pk)
+        profile.first_name, profile.last_name = 'Fresh', 'Name'
+        profile.save()
+        invalidate_pages('posts')
+        response = self.client.get(url)
+        self.assertContains(response, 'Fresh Name')
+        self.assertNotContains(response, '>fragmented<')
+
+
+class ResponsiveImageTests(TestCase):
+    """responsive_image renders a sized <picture> from renditions built once per file"""
+
+    def setUp(self):
+        cache.clear()
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        settings_override = override_settings(MEDIA_ROOT=media_root, MEDIA_PROCESSING_WORKERS=0)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        buffer = io.BytesIO()
+        Image.new('RGB', (1000, 600), 'teal').save(buffer, 'JPEG')
+        self.post = Post.objects.create(
+            title='Pictured', slug='pictured', content='',
+            featured_image=SimpleUploadedFile('pictured.jpg', buffer.getvalue()),
+        )
+
+    def render(self, image, **options):
+        source = '{% load blog_tags %}{% responsive_image image size=size alt="Cover" %}'
+        return Template(source).render(Context({'image': image, 'size': options.get('size', 400)}))
+
+    def test_picture_with_webp_and_intrinsic_size(self):
+        html = self.render(self.post.featured_image)
+        self.assertIn('<source type="image/webp" srcset="', html)
+        self.assertIn('/400.webp 400w', html)
+        self.assertIn('/1000.jpg 1000w', html)
+        self.assertIn('width="400" height="240"', html)
+        self.assertIn('alt="Cover"', html)
+
+    def test_manifest_is_cached(self):
+        self.render(self.post.featured_image)
+        with mock.patch('media_manager.renditions.generate_renditions') as generate:
+            self.render(self.post.featured_image, size=800)
+        generate.assert_not_called()
+
+    def test_missing_and_unreadable_images(self):
+        self.assertEqual(self.render(None), '')
+        with open(self.post.featured_image.path, 'wb') as fh:
+            fh.write(b'not an image')
+        cache.clear()
+        with self.assertLogs('media_manager.processing', 'WARNING'):
+            html = self.render(self.post.featured_image)
+        self.assertTrue(html.startswith('<img src="/media/uploads/pictured'))
+        self.assertNotIn('srcset', html)
+
+    @override_settings(MEDIA_PROCESSING_WORKERS=2)
+    def test_miss_is_queued_instead_of_rendered(self):
+        with mock.patch.object(processing, 'get_executor') as get_executor, \
+                self.captureOnCommitCallbacks(execute=True), self.assertNumQueries(0):
+            html = self.render(self.post.featured_image)
+            self.render(self.post.featured_image)
+        self.assertTrue(html.startswith('<img src="/media/uploads/pictured'))
+        get_executor.return_value.submit.assert_called_once_with(
+            processing._run_in_worker, processing.build_field_renditions,
+            self.post.featured_image.storage, self.post.featured_image.name,
+        )
+
+        processing.build_field_renditions(self.post.featured_image.storage, self.post.featured_image.name)
+        self.assertIn('/400.webp 400w', self.render(self.post.featured_image))
+
+    def test_library_images_use_the_stored_manifest(self):
+        media = MediaFile.objects.create(file=self.post.featured_image.name)
+        media.build_renditions()
+        with mock.patch('media_manager.renditions.generate_renditions') as generate:
+            self.assertIn('/400.webp 400w', self.render(self.post.featured_image))
+        generate.assert_not_called()
+
+        # A changed manifest is picked up once the cached one expires
+        MediaFile.objects.filter(pk=media.pk).update(renditions={})
+        self.assertIn('/400.webp 400w', self.render(self.post.featured_image))
+        later = time.time() + FIELD_MANIFEST_TIMEOUT + 1
+        with mock.patch('time.time', return_value=later), \
+                mock.patch.object(MediaFile, 'build_renditions', return_value={}):
+            self.assertNotIn('srcset', self.render(self.post.featured_image))
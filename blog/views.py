@@ -1,8 +1,8 @@
 from django.shortcuts import get_object_or_404, redirect, render
 from django.core.paginator import Paginator, EmptyPage, PageNotAnInteger
-from django.db.models import Q, Case, When, Value, IntegerField
 from django.template.loader import render_to_string
 from django.http import JsonResponse
+from django.utils.cache import patch_cache_control
 from django.urls import reverse
 from django.core.mail import send_mail
 from django.contrib import messages
@@ -10,15 +10,26 @@ from django.contrib.messages import get_messages
 from WTD import settings
 from blog.forms import CommentForm
 from .models import Page, Post, Category, Comment
+from .page_cache import comment_tags, post_tag
+from .search import add_snippets, fetch_posts, search_post_ids, suggest
 from django.contrib.auth.models import User
+from utils.page_cache import cache_public_page, depends_on
 
 
+SUGGEST_LIMIT = 8
+SUGGEST_MAX_LIMIT = 20
+SUGGEST_MIN_LENGTH = 2
+SUGGEST_CACHE_SECONDS = 60
 
+
+@cache_public_page('posts', 'categories', query_params=('page',))
 def blog(request):
-    featured_posts = Post.objects.published().filter(is_featured=True).order_by('-published_date')[:3]
-    featured_ids = list(featured_posts.values_list('id', flat=True))
+    featured_posts = list(
+        Post.objects.published().for_listing().filter(is_featured=True).order_by('-published_date')[:3]
+    )
+    featured_ids = [post.id for post in featured_posts]
     
-    posts = Post.objects.published().exclude(id__in=featured_ids).order_by('-published_date')
+    posts = Post.objects.published().for_listing().exclude(id__in=featured_ids).order_by('-published_date')
     
     # Pagination
     paginator = Paginator(posts, 4)
@@ -29,11 +40,13 @@ def blog(request):
         'page_obj': page_obj,
     })
 
+@cache_public_page('categories', query_params=('page', 'show_all_comments'))
 def posts_by_category_page_or_post(request, slug):
     # Check if it's a category
     category = Category.objects.filter(slug=slug).first()
     if category:
-        posts = Post.objects.filter(status='published', category=category).order_by('-published_date')
+        depends_on(request, 'posts')
+        posts = Post.objects.published().for_listing().filter(category=category).order_by('-published_date')
         paginator = Paginator(posts, 6)
         page_number = request.GET.get("page")
         page_obj = paginator.get_page(page_number)
@@ -41,29 +54,28 @@ def posts_by_category_page_or_post(request, slug):
         context = {
             'page_obj': page_obj,
             'category': category,
-            'categories': Category.objects.all(),
         }
         return render(request, 'blog/posts_by_category.html', context)
     
     # Check if it's a page
     page = Page.objects.filter(slug=slug, status='published').first()
     if page:
+        depends_on(request, 'pages')
         context = {'single_page': page}
         return render(request, 'blog/single_page.html', context)
 
     # If not category or page, treat as single post
-    single_post = get_object_or_404(Post, slug=slug, status='published')
+    single_post = get_object_or_404(Post.objects.for_detail(), slug=slug, status='published')
+    depends_on(request, 'posts', post_tag(single_post.pk), *comment_tags([single_post.pk]))
     
     # Related posts by category
     post_categories = single_post.category.all()
-    related_posts = Post.objects.filter(
+    related_posts = Post.objects.published().for_listing().filter(
         category__in=post_categories,
-        status='published'
     )[:4]
     
-    sidebar_related_posts = Post.objects.filter(
+    sidebar_related_posts = Post.objects.published().for_listing().filter(
         category__in=post_categories,
-        status='published'
     )[:5]
 
     # Comment handling
@@ -88,7 +100,7 @@ def posts_by_category_page_or_post(request, slug):
             )
             
             messages.success(request, 'Your comment is awaiting approval.')
-            return redirect('posts_by_category_or_post', slug=slug)
+            return redirect('posts_by_category_page_or_post', slug=slug)
 
     # Comments
     show_all = request.GET.get('show_all_comments')
@@ -112,7 +124,6 @@ def posts_by_category_page_or_post(request, slug):
         'total_comments': total_comments,
         'show_all': show_all,
         'view_messages': view_messages,
-        'categories': Category.objects.all(),
     }
     return render(request, 'blog/single_blog.html', context)
 
@@ -122,30 +133,19 @@ def search(request):
     page_number = request.GET.get('page', 1)
     is_ajax = request.headers.get('X-Requested-With') == 'XMLHttpRequest'
     
-    if keyword:
-        posts = Post.objects.filter(
-            Q(title__icontains=keyword) | 
-            Q(content__icontains=keyword) | 
-            Q(excerpt__icontains=keyword),
-            status='published'
-        ).annotate(
-            relevance=Case(
-                When(title__iexact=keyword, then=Value(3)),
-                When(title__icontains=keyword, then=Value(2)),
-                default=Value(1),
-                output_field=IntegerField()
-            )
-        ).order_by('-relevance', '-published_date')
-    else:
-        posts = Post.objects.none()
+    post_ids = search_post_ids(keyword) if keyword else []
     
-    paginator = Paginator(posts, 9)
+    # Paginate the id list, then load only the posts on this page
+    paginator = Paginator(post_ids, 9)
     page_obj = paginator.get_page(page_number)
+    page_obj.object_list = fetch_posts(page_obj.object_list)
     
     # AJAX for live search or load more
     if is_ajax:
         is_live = request.GET.get('live') == '1'
         template = 'blog/partials/live_search.html' if is_live else 'blog/partials/search_cards.html'
+        if not is_live:
+            add_snippets(page_obj.object_list, keyword)
         html = render_to_string(template, {'page_obj': page_obj, 'keyword': keyword})
         return JsonResponse({
             'html': html,
@@ -153,17 +153,32 @@ def search(request):
             'total': paginator.count
         })
     
+    add_snippets(page_obj.object_list, keyword)
     context = {
         'page_obj': page_obj,
         'keyword': keyword,
         'total_results': paginator.count,
-        'categories': Category.objects.all(),
     }
     return render(request, 'blog/search.html', context)
 
+
+def search_suggest(request):
+    """Title suggestions while typing, from the in-memory prefix index"""
+    query = request.GET.get('q', '').strip()
+    try:
+        limit = min(max(int(request.GET.get('limit', SUGGEST_LIMIT)), 1), SUGGEST_MAX_LIMIT)
+    except ValueError:
+        limit = SUGGEST_LIMIT
+
+    results = suggest(query, limit) if len(query) >= SUGGEST_MIN_LENGTH else []
+    response = JsonResponse({'query': query, 'results': results})
+    # Repeated keystrokes (backspace, retyping) are answered by the browser
+    patch_cache_control(response, public=True, max_age=SUGGEST_CACHE_SECONDS)
+    return response
+
 def author_page(request, username):
     author = get_object_or_404(User, username=username)
-    posts = Post.objects.filter(author=author, status='published').order_by('-published_date')
+    posts = Post.objects.published().for_listing().filter(author=author).order_by('-published_date')
     
     # Get author's most popular posts (you can customize this logic)
     featured_posts = posts[:3]
@@ -176,8 +191,7 @@ def author_page(request, username):
     context = {
         'author': author,
         'page_obj': page_obj,
-        'total_posts': posts.count(),
+        'total_posts': paginator.count,
         'featured_posts': featured_posts,
-        'categories': Category.objects.all(),
     }
     return render(request, 'blog/author_page.html', context)
\ No newline at end of file
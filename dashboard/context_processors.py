@@ -1,10 +1,13 @@
-from blog.models import Comment
+from blog.counters import pending_comment_count
 
 
 def comment_notifications(request):
-    """Add pending comments count to all templates"""
+    """Add pending comments count to staff templates"""
+    if not (request.user.is_authenticated and request.user.is_staff):
+        return {}
+    # Templates call the function only if they render the badge
     return {
-        'pending_comments_count': Comment.objects.filter(approved=False).count()
+        'pending_comments_count': pending_comment_count
     }
 
 def user_role_context(request):
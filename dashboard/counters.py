@@ -0,0 +1,147 @@
+"""
+Counters shown on dashboard widgets and filter tabs.
+
+Each function returns every count a widget needs from a single
+conditional-aggregation query (``COUNT(*) FILTER (WHERE ...)``). Results
+are cached for DASHBOARD_COUNTERS_CACHE_TIMEOUT seconds (0, or a cache
+that isn't shared between processes, disables it) and invalidated through model signals. Code that changes rows with
+``QuerySet.update()`` or ``bulk_create()`` bypasses those signals and must
+call ``invalidate_counters()`` itself.
+"""
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db.models import Count, Q
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+
+from blog.models import Comment, Page, Post
+from media_manager.models import MediaFile
+from portfolio.models import Project
+from utils.cache import bump_cache_version, is_shared_cache, versioned_key
+
+NAMESPACE = 'counters'
+
+
+def _cached(name, compute, *key_parts):
+    timeout = getattr(settings, 'DASHBOARD_COUNTERS_CACHE_TIMEOUT', 60)
+    if not timeout or not is_shared_cache():
+        return compute()
+    key = versioned_key(NAMESPACE, name, *key_parts)
+    counts = cache.get(key)
+    if counts is None:
+        counts = compute()
+        cache.set(key, counts, timeout)
+    return counts
+
+
+def invalidate_counters():
+    """Drop every cached counter"""
+    bump_cache_version(NAMESPACE)
+
+
+def post_counts(user=None):
+    """Post tab counts; ``mine`` is included when a user is given"""
+    def compute():
+        aggregates = {
+            'all': Count('id', filter=Q(is_trashed=False)),
+            'published': Count('id', filter=Q(is_trashed=False, status='published')),
+            'draft': Count('id', filter=Q(is_trashed=False, status='draft')),
+            'trash': Count('id', filter=Q(is_trashed=True)),
+        }
+        if user is not None:
+            aggregates['mine'] = Count('id', filter=Q(is_trashed=False, author=user))
+        return Post.objects.aggregate(**aggregates)
+    return _cached('posts', compute, user.pk if user is not None else '')
+
+
+def page_counts():
+    """Page tab counts"""
+    def compute():
+        return Page.objects.aggregate(
+            all=Count('id', filter=Q(is_trashed=False)),
+            published=Count('id', filter=Q(is_trashed=False, status='published')),
+            draft=Count('id', filter=Q(is_trashed=False, status='draft')),
+            trash=Count('id', filter=Q(is_trashed=True)),
+        )
+    return _cached('pages', compute)
+
+
+def comment_counts(user=None):
+    """Comment tab counts; ``mine`` counts comments on the user's posts"""
+    def compute():
+        aggregates = {
+            'all': Count('id'),
+            'pending': Count('id', filter=Q(approved=False)),
+            'approved': Count('id', filter=Q(approved=True)),
+        }
+        if user is not None:
+            aggregates['mine'] = Count('id', filter=Q(post__author=user))
+        return Comment.objects.aggregate(**aggregates)
+    return _cached('comments', compute, user.pk if user is not None else '')
+
+
+def media_counts():
+    """Media library filter counts, per category"""
+    def compute():
+        aggregates = {'all': Count('id')}
+        for category, _ in MediaFile.MEDIA_TYPES:
+            aggregates[category] = Count('id', filter=Q(category=category))
+        return MediaFile.objects.aggregate(**aggregates)
+    return _cached('media', compute)
+
+
+def user_counts():
+    """User list counts by role"""
+    def compute():
+        return User.objects.aggregate(
+            all=Count('id', distinct=True),
+            admin=Count('id', filter=Q(groups__name='Administrator'), distinct=True),
+            author=Count('id', filter=Q(groups__name='Author'), distinct=True),
+        )
+    return _cached('users', compute)
+
+
+def project_count():
+    return _cached('projects', Project.objects.count)
+
+
+def dashboard_counts():
+    """Totals for the dashboard home widgets; like the list tabs, they leave out trashed posts and pages"""
+    posts = post_counts()
+    comments = comment_counts()
+    return {
+        'posts_count': posts['published'],
+        'pages_count': page_counts()['published'],
+        'comments_count': comments['approved'],
+        'pending_comments_count': comments['pending'],
+        'projects_count': project_count(),
+    }
+
+
+@receiver(post_save, sender=Post)
+@receiver(post_delete, sender=Post)
+@receiver(post_save, sender=Page)
+@receiver(post_delete, sender=Page)
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+@receiver(post_save, sender=MediaFile)
+@receiver(post_delete, sender=MediaFile)
+@receiver(post_save, sender=Project)
+@receiver(post_delete, sender=Project)
+@receiver(post_delete, sender=User)
+def counted_model_changed(sender, **kwargs):
+    invalidate_counters()
+
+
+@receiver(post_save, sender=User)
+def user_saved(sender, created, **kwargs):
+    # Logins save last_login; only new users change the counts
+    if created:
+        invalidate_counters()
+
+
+@receiver(m2m_changed, sender=User.groups.through)
+def user_groups_changed(sender, action, **kwargs):
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        invalidate_counters()
@@ -0,0 +1,99 @@
+import random
+import statistics
+import time
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.contrib.postgres.search import SearchVector
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from blog.models import Post
+from dashboard import search as admin_search
+from utils.pagination import paginate
+
+WORDS = """
+brand launch design checklist processing invoice hosting migration portfolio
+analytics campaign newsletter mobile performance caching retainer onboarding
+wireframe prototype accessibility typography deployment security backup
+""".split()
+
+DEFAULT_TERMS = ['processing', 'procesing', 'launch checklist', 'typografy']
+
+
+class Command(BaseCommand):
+    help = "Compare the dashboard post search (ILIKE scan vs trigram index) on generated posts; PostgreSQL only"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, nargs='+', default=[10_000, 100_000],
+                            help='Numbers of generated posts to measure against')
+        parser.add_argument('--repeat', type=int, default=5, help='Runs per query; the median is reported')
+        parser.add_argument('--term', dest='terms', action='append', help='Search term (repeatable)')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            raise CommandError('The trigram search only exists on PostgreSQL.')
+
+        terms = options['terms'] or DEFAULT_TERMS
+        for rows in options['rows']:
+            # Generated posts are rolled back once measured
+            with transaction.atomic():
+                self.seed(rows)
+                self.stdout.write(f'\n{rows} generated posts')
+                self.stdout.write(f'{"term":<20} {"ILIKE":>10} {"trigram":>10} {"matches":>16}')
+                for term in terms:
+                    legacy = Post.objects.filter(is_trashed=False).filter(
+                        admin_search.contains_filter(term, ('title', 'content', 'excerpt'))
+                    ).order_by('-created_at')
+                    # The same call as the dashboard post list
+                    ranked = admin_search.search(
+                        Post.objects.filter(is_trashed=False), term, admin_search.CONTENT_FIELDS,
+                        body_fields=('content',), ordering=admin_search.RESULT_ORDERING,
+                    )
+                    legacy_ms, legacy_count = self.measure(legacy, options['repeat'])
+                    ranked_ms, ranked_count = self.measure(ranked, options['repeat'])
+                    self.stdout.write(
+                        f'{term:<20} {legacy_ms:>8.1f}ms {ranked_ms:>8.1f}ms {legacy_count:>7} / {ranked_count:<7}'
+                    )
+                transaction.set_rollback(True)
+
+        self.stdout.write(self.style.SUCCESS("✅ Admin search benchmark finished."))
+
+    def seed(self, rows):
+        author = User.objects.create_user(username='search-benchmark')
+        rng = random.Random(rows)
+
+        def text(words):
+            return ' '.join(rng.choice(WORDS) for _ in range(words))
+
+        for start in range(0, rows, 5000):
+            Post.objects.bulk_create(
+                Post(
+                    title=text(6).capitalize(),
+                    slug=f'search-benchmark-{number}',
+                    excerpt=text(20),
+                    content=f'<p>{text(120)}</p>',
+                    author=author,
+                )
+                for number in range(start, min(start + 5000, rows))
+            )
+
+        config = getattr(settings, 'SEARCH_CONFIG', 'english')
+        Post.all_objects.filter(author=author).update(search_vector=(
+            SearchVector('title', weight='A', config=config) +
+            SearchVector('excerpt', weight='B', config=config) +
+            SearchVector('content', weight='C', config=config)
+        ))
+        with connection.cursor() as cursor:
+            cursor.execute(f'ANALYZE {Post._meta.db_table}')
+
+    def measure(self, queryset, repeat):
+        """Median time of what the list view runs: the count and the first page"""
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            page = paginate(queryset, 20, keyset=False)[0]
+            count = page.paginator.count
+            list(page)
+            timings.append((time.perf_counter() - started) * 1000)
+        return statistics.median(timings), count
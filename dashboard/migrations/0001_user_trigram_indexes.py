@@ -0,0 +1,40 @@
+# Generated by Django 5.2.7 on 2026-10-17 09:12
+
+from django.db import migrations
+
+# Users search box (dashboard.search). auth.User belongs to Django, so the
+# indexes are created directly instead of through the model's Meta.
+USER_COLUMNS = ['username', 'first_name', 'last_name', 'email']
+
+
+def create_trigram_indexes(apps, schema_editor):
+    # pg_trgm is PostgreSQL-only; other databases keep the icontains search
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for column in USER_COLUMNS:
+        schema_editor.execute(
+            f'CREATE INDEX CONCURRENTLY IF NOT EXISTS auth_user_{column}_trgm '
+            f'ON auth_user USING gin ({column} gin_trgm_ops)'
+        )
+
+
+def drop_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for column in USER_COLUMNS:
+        schema_editor.execute(f'DROP INDEX CONCURRENTLY IF EXISTS auth_user_{column}_trgm')
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY can't run inside a transaction
+    atomic = False
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        # Creates the pg_trgm extension
+        ('blog', '0010_trigram_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_trigram_indexes, drop_trigram_indexes),
+    ]
@@ -0,0 +1,84 @@
+"""
+Search boxes of the dashboard list views (posts, pages, media, users).
+
+On PostgreSQL the short text columns carry pg_trgm GIN indexes, so the
+``ILIKE '%term%'`` match and the word-similarity operator ``<%`` are both
+answered from the index instead of a sequential scan. Results are ranked by
+their best word similarity across those columns, which also finds near
+misses such as "procesing" or "jon smith". Long HTML bodies are not trigram
+indexed; they are matched through the GIN-indexed ``search_vector`` that the
+PostgreSQL search backend keeps up to date.
+
+Other databases, and terms too short to have a trigram, keep the plain
+``icontains`` search over every field.
+"""
+from functools import reduce
+from operator import or_
+
+from django.contrib.postgres.lookups import TrigramWordSimilar
+from django.contrib.postgres.search import TrigramWordSimilarity
+from django.db import connection
+from django.db.models import F, Lookup, Q
+from django.db.models.functions import Greatest
+
+from blog.search.postgres import search_query
+
+# pg_trgm pads words to three characters; shorter terms match almost anything
+MIN_TRIGRAM_LENGTH = 3
+
+# Trigram indexed columns per search box; see the trigram index migrations
+CONTENT_FIELDS = ('title', 'excerpt')
+MEDIA_FIELDS = ('file', 'alt_text', 'description')
+USER_FIELDS = ('username', 'first_name', 'last_name', 'email')
+
+# Ties in rank, and every match off the trigram path, newest first
+RESULT_ORDERING = ('-created_at', 'id')
+
+
+class ILike(Lookup):
+    """
+    ``column ILIKE pattern`` on the bare column. ``icontains`` compiles to
+    ``UPPER(column::text) LIKE UPPER(...)``, which a trigram index on the
+    column can't answer.
+    """
+    lookup_name = 'ilike'
+
+    def as_sql(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        rhs, rhs_params = self.process_rhs(compiler, connection)
+        return f'{lhs} ILIKE {rhs}', [*lhs_params, *rhs_params]
+
+
+def use_trigrams(term):
+    return connection.vendor == 'postgresql' and len(term) >= MIN_TRIGRAM_LENGTH
+
+
+def contains_filter(term, fields):
+    return reduce(or_, (Q(**{f'{field}__icontains': term}) for field in fields))
+
+
+def search(queryset, term, fields, body_fields=(), ordering=()):
+    """
+    Filter ``queryset`` to rows matching ``term``, ordered by ``ordering``.
+
+    ``fields`` are trigram indexed columns; ``body_fields`` are long text
+    columns covered by the model's ``search_vector`` on PostgreSQL. On the
+    trigram path the best matches come first and ``ordering`` breaks ties.
+    The rank is a float, so the results are paged by offset, not by cursor.
+    """
+    if not use_trigrams(term):
+        return queryset.filter(contains_filter(term, (*fields, *body_fields))).order_by(*ordering)
+
+    # Lookup classes rather than ``__trigram_word_similar``, which is only
+    # registered on CharField and TextField, not FileField
+    pattern = f'%{connection.ops.prep_for_like_query(term)}%'
+    condition = reduce(or_, (
+        Q(ILike(F(field), pattern)) | Q(TrigramWordSimilar(F(field), term))
+        for field in fields
+    ))
+    if body_fields:
+        condition |= Q(search_vector=search_query(term))
+
+    similarities = [TrigramWordSimilarity(term, field) for field in fields]
+    rank = Greatest(*similarities) if len(similarities) > 1 else similarities[0]
+    return queryset.filter(condition).annotate(search_rank=rank).order_by('-search_rank', *ordering)
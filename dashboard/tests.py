@@ -1,3 +1,697 @@
-from django.test import TestCase
+import hashlib
+import io
+import json
+import os
+import re
+import shutil
+import sys
+import tempfile
+import time
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import Group, User
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection, transaction
+from django.db.models import F, FloatField, Q, Value
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import URLPattern, URLResolver, get_resolver, reverse
+from django.utils import timezone
+from PIL import Image
+
+from blog.models import Category, Comment, Page, Post, UserProfile
+from media_manager.models import MediaFile, UploadSession
+from portfolio.models import Project, Team, Testimonial
+from utils.pagination import CursorPaginator
+
+from . import counters
+from . import search as admin_search
+
+MEDIA_ROOT = tempfile.mkdtemp()
+
+# URL prefixes that belong to third-party apps
+SKIPPED_PREFIXES = ('admin/', 'tinymce/')
+
+# Most queries any role may cause on a cold cache, per route
+QUERY_BUDGETS = {
+    '': 4,
+    'about-us/': 3,
+    'contact-us/': 2,
+    'services/': 2,
+    'services/<slug:service_slug>/': 2,
+    'projects/': 5,
+    'blog/': 8,
+    # PostgreSQL full-text search adds a headline query
+    'blog/search/': 5,
+    'blog/search/suggest/': 0,
+    'blog/author/<str:username>/': 10,
+    'blog/<slug:slug>/': 14,
+    'dashboard/': 6,
+    'dashboard/posts/': 6,
+    'dashboard/posts/bulk-action/': 3,
+    'dashboard/posts/add-post/': 3,
+    'dashboard/posts/edit-post/<int:pk>/': 9,
+    'dashboard/posts/delete-post/<int:pk>/': 4,
+    'dashboard/posts/restore-post/<int:pk>/': 4,
+    'dashboard/post-preview/<int:pk>/': 4,
+    'dashboard/auto-save-post/': 2,
+    'dashboard/generate-slug/': 2,
+    'dashboard/remove-featured-image/': 2,
+    'dashboard/posts/categories/': 5,
+    'dashboard/posts/categories/add/': 3,
+    'dashboard/posts/categories/edit/<int:category_id>/': 4,
+    'dashboard/posts/categories/delete/<int:pk>/': 3,
+    'dashboard/categories/<slug:slug>/': 8,
+    'dashboard/comments/': 6,
+    'dashboard/comments/bulk-action/': 3,
+    'dashboard/comments/approve/<int:comment_id>/': 4,
+    'dashboard/comments/unapprove/<int:comment_id>/': 5,
+    'dashboard/comments/delete/<int:comment_id>/': 7,
+    'dashboard/comments/edit/<int:comment_id>/': 3,
+    'dashboard/comments/reply/<int:comment_id>/': 3,
+    'dashboard/pages/': 6,
+    'dashboard/pages/bulk-action/': 3,
+    'dashboard/pages/add-page/': 3,
+    'dashboard/pages/edit-page/<int:pk>/': 4,
+    'dashboard/pages/delete-page/<int:pk>/': 4,
+    'dashboard/pages/restore-page/<int:pk>/': 4,
+    'dashboard/pages/auto-save/': 3,
+    'dashboard/pages/generate-slug/': 3,
+    'dashboard/page-preview/<int:pk>/': 4,
+    'dashboard/media/': 8,
+    'dashboard/media/add-media/': 2,
+    'dashboard/media/<int:media_id>/': 3,
+    'dashboard/media/<int:media_id>/update/': 0,
+    'dashboard/media/<int:media_id>/delete/': 0,
+    'dashboard/media/bulk-delete/': 0,
+    'dashboard/media/processing-status/': 2,
+    'dashboard/media/uploads/': 0,
+    'dashboard/media/uploads/<uuid:upload_id>/': 3,
+    'dashboard/media/uploads/<uuid:upload_id>/chunk/': 0,
+    'dashboard/media/uploads/<uuid:upload_id>/complete/': 0,
+    'dashboard/projects/': 5,
+    'dashboard/projects/add/': 3,
+    'dashboard/projects/edit/<int:pk>/': 4,
+    'dashboard/projects/delete/<int:pk>/': 4,
+    'dashboard/testimonials/': 4,
+    'dashboard/testimonials/add/': 3,
+    'dashboard/testimonials/edit/<int:pk>/': 4,
+    'dashboard/testimonials/delete/<int:pk>/': 4,
+    'dashboard/team/': 4,
+    'dashboard/team/add-member/': 3,
+    'dashboard/team/edit-member/<int:pk>/': 4,
+    'dashboard/team/delete-member/<int:pk>/': 4,
+    'dashboard/users/': 7,
+    'dashboard/users/add-user/': 5,
+    'dashboard/users/delete/<int:user_id>/': 5,
+    'dashboard/users/profile/': 8,
+    'dashboard/users/profile/<int:user_id>/': 11,
+    'dashboard/login/': 2,
+    'dashboard/logout/': 4,
+    'media-library/': 2,
+}
+
+# URL arguments for routes that take them, built from the seeded fixtures
+URL_KWARGS = {
+    'services/<slug:service_slug>/': lambda t: {'service_slug': 'web-development'},
+    'blog/author/<str:username>/': lambda t: {'username': t.author.username},
+    'blog/<slug:slug>/': lambda t: {'slug': t.post.slug},
+    'dashboard/posts/edit-post/<int:pk>/': lambda t: {'pk': t.post.pk},
+    'dashboard/posts/delete-post/<int:pk>/': lambda t: {'pk': t.post.pk},
+    'dashboard/posts/restore-post/<int:pk>/': lambda t: {'pk': t.post.pk},
+    'dashboard/post-preview/<int:pk>/': lambda t: {'pk': t.post.pk},
+    'dashboard/posts/categories/edit/<int:category_id>/': lambda t: {'category_id': t.category.pk},
+    'dashboard/posts/categories/delete/<int:pk>/': lambda t: {'pk': t.category.pk},
+    'dashboard/categories/<slug:slug>/': lambda t: {'slug': t.category.slug},
+    'dashboard/comments/approve/<int:comment_id>/': lambda t: {'comment_id': t.comment.pk},
+    'dashboard/comments/unapprove/<int:comment_id>/': lambda t: {'comment_id': t.comment.pk},
+    'dashboard/comments/delete/<int:comment_id>/': lambda t: {'comment_id': t.comment.pk},
+    'dashboard/comments/edit/<int:comment_id>/': lambda t: {'comment_id': t.comment.pk},
+    'dashboard/comments/reply/<int:comment_id>/': lambda t: {'comment_id': t.comment.pk},
+    'dashboard/pages/edit-page/<int:pk>/': lambda t: {'pk': t.page.pk},
+    'dashboard/pages/delete-page/<int:pk>/': lambda t: {'pk': t.page.pk},
+    'dashboard/pages/restore-page/<int:pk>/': lambda t: {'pk': t.page.pk},
+    'dashboard/page-preview/<int:pk>/': lambda t: {'pk': t.page.pk},
+    'dashboard/media/<int:media_id>/': lambda t: {'media_id': t.media[0].pk},
+    'dashboard/media/<int:media_id>/update/': lambda t: {'media_id': t.media[0].pk},
+    'dashboard/media/<int:media_id>/delete/': lambda t: {'media_id': t.media[0].pk},
+    'dashboard/media/uploads/<uuid:upload_id>/': lambda t: {'upload_id': t.upload.pk},
+    'dashboard/media/uploads/<uuid:upload_id>/chunk/': lambda t: {'upload_id': t.upload.pk},
+    'dashboard/media/uploads/<uuid:upload_id>/complete/': lambda t: {'upload_id': t.upload.pk},
+    'dashboard/projects/edit/<int:pk>/': lambda t: {'pk': t.project.pk},
+    'dashboard/projects/delete/<int:pk>/': lambda t: {'pk': t.project.pk},
+    'dashboard/testimonials/edit/<int:pk>/': lambda t: {'pk': t.testimonial.pk},
+    'dashboard/testimonials/delete/<int:pk>/': lambda t: {'pk': t.testimonial.pk},
+    'dashboard/team/edit-member/<int:pk>/': lambda t: {'pk': t.member.pk},
+    'dashboard/team/delete-member/<int:pk>/': lambda t: {'pk': t.member.pk},
+    'dashboard/users/delete/<int:user_id>/': lambda t: {'user_id': t.author.pk},
+    'dashboard/users/profile/<int:user_id>/': lambda t: {'user_id': t.author.pk},
+}
+
+CONVERTER_RE = re.compile(r'<(?:\w+:)?(\w+)>')
+
+
+def crawlable_routes(patterns=None, prefix=''):
+    """Every named route of the project, outside the admin and TinyMCE"""
+    if patterns is None:
+        patterns = get_resolver().url_patterns
+    routes = []
+    for pattern in patterns:
+        route = prefix + str(pattern.pattern)
+        if isinstance(pattern, URLResolver):
+            if not route.startswith(SKIPPED_PREFIXES):
+                routes += crawlable_routes(pattern.url_patterns, route)
+        elif isinstance(pattern, URLPattern) and pattern.name:
+            routes.append(route)
+    return routes
+
+
+def image_file(name='image.png'):
+    buffer = io.BytesIO()
+    Image.new('RGB', (40, 30), 'teal').save(buffer, 'PNG')
+    return SimpleUploadedFile(name, buffer.getvalue(), content_type='image/png')
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT, MEDIA_PROCESSING_WORKERS=1)
+class QueryBudgetTests(TestCase):
+    """
+    Request every named URL as an anonymous visitor, an author and an
+    administrator, and fail when a view runs more queries than its budget.
+
+    Caches are cleared before each request, so budgets cover the cold path.
+    Background media work is queued as in production; it would only start
+    once the test transaction commits, so it never counts against a view.
+    Each request runs in a savepoint that is rolled back, so a URL that
+    deletes or changes something doesn't affect the next one. Set
+    QUERY_BUDGET_REPORT=1 to print queries, SQL time and total time per URL.
+    """
+
+    results = []
+
+    @classmethod
+    def setUpTestData(cls):
+        administrators = Group.objects.create(name='Administrator')
+        authors = Group.objects.create(name='Author')
+        cls.administrator = User.objects.create_user('admin', password='x', is_staff=True)
+        cls.administrator.groups.add(administrators)
+        cls.author = User.objects.create_user('author', password='x', first_name='Ada', last_name='Lovelace')
+        cls.author.groups.add(authors)
+        for user in (cls.administrator, cls.author):
+            UserProfile.objects.get_or_create(user=user)
+
+        categories = [
+            Category.objects.create(name=name, slug=name.lower(), order=order)
+            for order, name in enumerate(['Design', 'Development', 'Marketing'])
+        ]
+        for i in range(12):
+            post = Post.objects.create(
+                title=f'Budget post {i}',
+                content='<p>Counting queries on every page.</p>',
+                author=cls.author if i % 2 else cls.administrator,
+                status='published' if i < 10 else 'draft',
+                is_featured=i < 3,
+            )
+            post.category.set(categories[:i % 3 + 1])
+            for j in range(3):
+                comment = Comment.objects.create(
+                    post=post, name=f'Reader {j}', email='reader@example.com',
+                    body='Useful, thanks.', approved=j != 2,
+                )
+            Comment.objects.create(
+                post=post, parent=comment, name='Ada', email='ada@example.com',
+                body='Thanks!', approved=True,
+            )
+        cls.post = Post.objects.get(title='Budget post 1')
+        cls.category = categories[0]
+        cls.comment = Comment.objects.filter(post=cls.post).first()
+        cls.page = Page.objects.create(title='Privacy policy', content='<p>Policy.</p>', status='published')
+
+        cls.media = [
+            MediaFile.objects.create(file=image_file(f'image-{i}.png'), alt_text=f'Image {i}')
+            for i in range(3)
+        ]
+        cls.upload = UploadSession.objects.create(user=cls.author, filename='big.png', total_size=1024)
+
+        for i in range(3):
+            Project.objects.create(
+                title=f'Project {i}', description='A project.', client='Client', category='web',
+                completion_date=timezone.now().date(), image=image_file(), is_featured=True, top_rated=i == 0,
+            )
+            Testimonial.objects.create(
+                name=f'Client {i}', position='CEO', company='Acme', image=image_file(), message='Great work.',
+            )
+            Team.objects.create(name=f'Member {i}', position='Developer', bio='Builds things.', image=image_file(), order=i)
+        cls.project = Project.objects.first()
+        cls.testimonial = Testimonial.objects.first()
+        cls.member = Team.objects.first()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        if os.environ.get('QUERY_BUDGET_REPORT'):
+            for role, route, queries, sql_ms, total_ms in cls.results:
+                sys.stderr.write(f'{role:<14} {route:<60} {queries:>4} queries {sql_ms:>8.1f} ms SQL {total_ms:>8.1f} ms\n')
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    def url_for(self, route):
+        kwargs = URL_KWARGS[route](self) if route in URL_KWARGS else {}
+        return '/' + CONVERTER_RE.sub(lambda match: str(kwargs[match.group(1)]), route)
+
+    def crawl(self, role, user=None):
+        for route in crawlable_routes():
+            with self.subTest(role=role, route=route):
+                if CONVERTER_RE.search(route) and route not in URL_KWARGS:
+                    self.fail(f'Declare URL arguments for {route} in URL_KWARGS')
+                self.assertIn(route, QUERY_BUDGETS, f'Declare a query budget for {route}')
+
+                url = self.url_for(route)
+                if user is not None:
+                    self.client.force_login(user)
+                cache.clear()
+                with transaction.atomic():
+                    started = time.perf_counter()
+                    with CaptureQueriesContext(connection) as queries:
+                        response = self.client.get(url)
+                    total_ms = (time.perf_counter() - started) * 1000
+                    transaction.set_rollback(True)
+
+                sql_ms = sum(float(query['time']) for query in queries.captured_queries) * 1000
+                self.results.append((role, route, len(queries), sql_ms, total_ms))
+                self.assertLess(response.status_code, 500, f'GET {url} failed')
+                self.assertLessEqual(
+                    len(queries), QUERY_BUDGETS[route],
+                    f'GET {url} as {role} ran {len(queries)} queries, budget {QUERY_BUDGETS[route]}:\n'
+                    + '\n'.join(query['sql'] for query in queries.captured_queries),
+                )
+
+    def test_anonymous(self):
+        self.crawl('anonymous')
+
+    def test_author(self):
+        self.crawl('author', self.author)
+
+    def test_administrator(self):
+        self.crawl('administrator', self.administrator)
+
+
+class CursorPaginationTests(TestCase):
+    """Keyset pages cover every row once, in order, in both directions"""
+
+    @classmethod
+    def setUpTestData(cls):
+        author = User.objects.create_user('pager')
+        created = timezone.now()
+        for i in range(25):
+            Post.objects.create(title=f'Paged {i}', slug=f'paged-{i}', content='<p>x</p>', author=author)
+        # Shared timestamps make the id tie-breaker matter
+        Post.objects.filter(id__in=Post.objects.order_by('id').values('id')[:10]).update(created_at=created)
+        cls.expected = list(Post.objects.order_by('-created_at', '-id').values_list('id', flat=True))
+
+    def paginator(self):
+        return CursorPaginator(Post.objects.order_by('-created_at'), 10)
+
+    def test_forwards_and_back(self):
+        pages, cursor = [], None
+        while True:
+            page = self.paginator().get_page(cursor)
+            pages.append([post.id for post in page])
+            if not page.has_next():
+                break
+            cursor = page.next_cursor
+        self.assertEqual([post_id for ids in pages for post_id in ids], self.expected)
+        self.assertEqual([len(ids) for ids in pages], [10, 10, 5])
+
+        # Walking back from the last page revisits the same pages
+        for ids in reversed(pages[:-1]):
+            page = self.paginator().get_page(page.previous_cursor)
+            self.assertEqual([post.id for post in page], ids)
+        self.assertFalse(page.has_previous())
+
+    def test_invalid_cursor_gives_first_page(self):
+        for cursor in ('2', 'not-a-cursor', ''):
+            page = self.paginator().get_page(cursor)
+            self.assertEqual([post.id for post in page], self.expected[:10])
+            self.assertFalse(page.has_previous())
+
+    def test_count(self):
+        self.assertEqual(self.paginator().count, 25)
+
+    def test_rejects_unstable_sort_keys(self):
+        ranked = Post.objects.annotate(search_rank=Value(0.5, output_field=FloatField()))
+        for queryset in (ranked.order_by('-search_rank'), Post.objects.order_by('author__username')):
+            with self.subTest(ordering=queryset.query.order_by), self.assertRaises(ValueError):
+                CursorPaginator(queryset, 10)
+
+    def test_listing_uses_cursors_and_search_uses_page_numbers(self):
+        self.client.force_login(User.objects.get(username='pager'))
+        listing = self.client.get(reverse('posts'))
+        self.assertEqual(listing.context['next_page'], listing.context['posts'].next_cursor)
+
+        ids, page = [], 1
+        while page:
+            response = self.client.get(reverse('posts'), {'search': 'Paged', 'page': page})
+            ids.extend(post.id for post in response.context['posts'])
+            self.assertEqual(response.context['total_items'], 25)
+            page = response.context['next_page']
+        self.assertEqual(response.context['previous_page'], 1)
+        # Off the trigram path every match ranks alike: newest first, then by id
+        self.assertEqual(ids, list(
+            Post.objects.order_by('-created_at', 'id').values_list('id', flat=True)
+        ))
+
+
+class AdminSearchTests(TestCase):
+    """Dashboard search boxes: trigram matching on PostgreSQL, icontains elsewhere"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.title_match = Post.objects.create(title='Caching layers', slug='caching-layers', content='<p>x</p>')
+        cls.body_match = Post.objects.create(title='Notes', slug='notes', content='<p>On caching</p>')
+        cls.excerpt_match = Post.objects.create(title='Misc', slug='misc', content='', excerpt='Caching tips')
+        Post.objects.create(title='Unrelated', slug='unrelated', content='<p>Nothing</p>')
+
+    def on_postgresql(self):
+        return mock.patch.object(admin_search.connection, 'vendor', 'postgresql')
+
+    def test_use_trigrams(self):
+        self.assertFalse(admin_search.use_trigrams('caching'))
+        with self.on_postgresql():
+            self.assertTrue(admin_search.use_trigrams('cac'))
+            self.assertFalse(admin_search.use_trigrams('ca'))
+
+    def test_ilike_compiles_on_the_bare_column(self):
+        sql = str(Post.objects.filter(admin_search.ILike(F('title'), '%cach%')).query)
+        self.assertIn('"blog_post"."title" ILIKE %cach%', sql)
+        self.assertNotIn('UPPER', sql)
+
+    def test_contains_filter_matches_any_field(self):
+        condition = admin_search.contains_filter('caching', ('title', 'excerpt'))
+        self.assertEqual(condition, Q(title__icontains='caching') | Q(excerpt__icontains='caching'))
+        self.assertCountEqual(Post.objects.filter(condition), [self.title_match, self.excerpt_match])
+
+    def test_icontains_path_covers_body_fields(self):
+        results = admin_search.search(
+            Post.objects.all(), 'CACHING', admin_search.CONTENT_FIELDS, body_fields=('content',), ordering=('id',),
+        )
+        self.assertEqual(list(results), [self.title_match, self.body_match, self.excerpt_match])
+        self.assertNotIn('search_rank', results.query.annotations)
+
+    def test_trigram_path(self):
+        with self.on_postgresql():
+            ranked = admin_search.search(
+                Post.objects.all(), '50%_off', admin_search.CONTENT_FIELDS,
+                body_fields=('content',), ordering=admin_search.RESULT_ORDERING,
+            )
+            sql, params = ranked.query.sql_with_params()
+        self.assertEqual(ranked.query.order_by, ('-search_rank', '-created_at', 'id'))
+        self.assertIn('GREATEST(WORD_SIMILARITY', sql)
+        self.assertIn('"blog_post"."search_vector" @@ (websearch_to_tsquery', sql)
+        # LIKE wildcards in the term are matched literally
+        self.assertIn('%50\\%\\_off%', params)
+
+
+class DeltaAutosaveTests(TestCase):
+    """Autosaves send changed fields against a revision and never overwrite newer edits"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user('drafter')
+        cls.category = Category.objects.create(name='Notes', slug='notes')
+
+    def setUp(self):
+        self.client.force_login(self.author)
+        self.post = Post.objects.create(
+            title='Draft', slug='draft', content='<p>First words</p>', author=self.author,
+        )
+        self.post.category.set([self.category])
+
+    def autosave(self, payload):
+        return self.client.post(reverse('auto_save_post'), json.dumps(payload), content_type='application/json')
+
+    def test_changed_fields_only(self):
+        response = self.autosave({'post_id': self.post.pk, 'base_revision': 0, 'changes': {'excerpt': 'Short'}})
+        self.assertEqual(response.json()['revision'], 1)
+        self.post.refresh_from_db()
+        self.assertEqual((self.post.excerpt, self.post.title, self.post.slug), ('Short', 'Draft', 'draft'))
+        self.assertEqual(list(self.post.category.all()), [self.category])
+
+    def test_content_change_updates_derived_text(self):
+        self.autosave({'post_id': self.post.pk, 'base_revision': 0, 'changes': {'content': '<p>Three new words</p>'}})
+        self.post.refresh_from_db()
+        self.assertEqual((self.post.plain_text, self.post.word_count), ('Three new words', 3))
+
+    def test_stale_revision_is_rejected(self):
+        self.autosave({'post_id': self.post.pk, 'base_revision': 0, 'changes': {'title': 'From tab one'}})
+        response = self.autosave({'post_id': self.post.pk, 'base_revision': 0, 'changes': {'title': 'From tab two'}})
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.json()['revision'], 1)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.title, 'From tab one')
+
+    def test_title_without_slug_reslugs(self):
+        self.autosave({'post_id': self.post.pk, 'base_revision': 0, 'changes': {'title': 'Better title'}})
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.slug, 'better-title')
+
+        # A slug sent with the title wins
+        self.autosave({'post_id': self.post.pk, 'base_revision': 1, 'changes': {'title': 'Other', 'slug': 'kept'}})
+        self.post.refresh_from_db()
+        self.assertEqual((self.post.title, self.post.slug), ('Other', 'kept'))
+
+    def test_full_payload_still_accepted(self):
+        response = self.autosave({
+            'post_id': self.post.pk, 'title': 'Whole form', 'content': '<p>Body</p>', 'excerpt': '',
+            'seo_description': '', 'seo_keywords': '', 'slug': '', 'category': [],
+        })
+        self.assertEqual(response.json()['revision'], 1)
+        self.post.refresh_from_db()
+        self.assertEqual((self.post.title, self.post.slug), ('Whole form', 'whole-form'))
+        self.assertFalse(self.post.category.exists())
+
+
+@override_settings(
+    MEDIA_ROOT=MEDIA_ROOT, MEDIA_UPLOAD_STAGING_DIR=os.path.join(MEDIA_ROOT, 'staging'),
+    MEDIA_UPLOAD_CHUNK_SIZE=16, MEDIA_PROCESSING_WORKERS=0,
+)
+class ChunkedUploadTests(TestCase):
+    """Uploads resume from the server's offset and are verified before they become media"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user('uploader')
+        cls.other = User.objects.create_user('someone-else')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        self.client.force_login(self.author)
+        self.data = image_file().read()
+
+    def start(self, **extra):
+        response = self.client.post(
+            reverse('create_upload_session'),
+            json.dumps({'filename': 'photo.png', 'size': len(self.data), **extra}),
+            content_type='application/json',
+        )
+        self.assertEqual(response.status_code, 201)
+        return response.json()['upload_id']
+
+    def send(self, upload_id, start, end=None):
+        end = min(start + 16, len(self.data)) if end is None else end
+        return self.client.put(
+            reverse('upload_chunk', args=[upload_id]), self.data[start:end],
+            content_type='application/octet-stream',
+            headers={'Content-Range': f'bytes {start}-{end - 1}/{len(self.data)}'},
+        )
+
+    def send_rest(self, upload_id):
+        offset = self.client.get(reverse('upload_session', args=[upload_id])).json()['offset']
+        while offset < len(self.data):
+            response = self.send(upload_id, offset)
+            self.assertEqual(response.status_code, 200)
+            offset = response.json()['offset']
+
+    def complete(self, upload_id):
+        return self.client.post(reverse('complete_upload_session', args=[upload_id]))
+
+    def test_resume_and_complete(self):
+        upload_id = self.start(sha256=hashlib.sha256(self.data).hexdigest())
+        self.send(upload_id, 0)
+        self.send(upload_id, 16)
+        # Connection dropped; the client asks where to carry on
+        self.send_rest(upload_id)
+
+        response = self.complete(upload_id)
+        self.assertEqual(response.status_code, 200)
+        media_id = response.json()['file']['id']
+
+        status = self.client.get(reverse('media_processing_status'), {'ids': str(media_id)}).json()
+        self.assertEqual(status['pending'], 0)
+        self.assertEqual(status['files'][0]['status'], MediaFile.PROCESSING_READY)
+        self.assertEqual(status['files'][0]['dimensions'], '40 × 30')
+
+        # Completing again is idempotent
+        self.assertEqual(self.complete(upload_id).json()['file']['id'], media_id)
+
+    def test_offset_mismatch_returns_resume_offset(self):
+        upload_id = self.start()
+        self.send(upload_id, 0)
+        for start in (0, 32):
+            response = self.send(upload_id, start)
+            self.assertEqual(response.status_code, 409)
+            self.assertEqual(response.json()['offset'], 16)
+
+    def test_lost_staging_data_returns_conflict(self):
+        upload_id = self.start()
+        self.send(upload_id, 0)
+        os.remove(UploadSession.objects.get(id=upload_id).staging_path)
+        response = self.send(upload_id, 16)
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.json()['offset'], 0)
+        self.send_rest(upload_id)
+        self.assertEqual(self.complete(upload_id).status_code, 200)
+
+    def test_checksum_mismatch(self):
+        upload_id = self.start(sha256='0' * 64)
+        self.send_rest(upload_id)
+        response = self.complete(upload_id)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json()['error'], 'Checksum mismatch')
+        self.assertFalse(MediaFile.objects.exists())
+
+    def test_identical_uploads_share_media(self):
+        media_ids = []
+        for _ in range(2):
+            upload_id = self.start()
+            self.send_rest(upload_id)
+            media_ids.append(self.complete(upload_id).json()['file']['id'])
+        self.assertEqual(media_ids[0], media_ids[1])
+        self.assertEqual(MediaFile.objects.count(), 1)
+
+    def test_other_users_session_is_not_found(self):
+        upload_id = self.start()
+        self.send(upload_id, 0)
+        self.client.force_login(self.other)
+        self.assertEqual(self.client.get(reverse('upload_session', args=[upload_id])).status_code, 404)
+        self.assertEqual(self.send(upload_id, 16).status_code, 404)
+        self.assertEqual(self.complete(upload_id).status_code, 404)
+        self.assertEqual(UploadSession.objects.get(id=upload_id).received_bytes, 16)
+
+
+class CounterCacheTests(TestCase):
+    """Cached dashboard counts follow every way posts, pages and comments change"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser('counter-admin', password='x')
+        cls.admin.groups.add(Group.objects.create(name='Administrator'))
+        cls.posts = [
+            Post.objects.create(title=f'Counted {i}', slug=f'counted-{i}', content='<p>x</p>', author=cls.admin)
+            for i in range(3)
+        ]
+        cls.page = Page.objects.create(title='Counted page', slug='counted-page', content='<p>x</p>')
+        cls.comments = [
+            Comment.objects.create(post=cls.posts[0], name='Reader', email='r@example.com', body='Hi')
+            for _ in range(2)
+        ]
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.admin)
+
+    def counts(self):
+        return {
+            'posts': counters.post_counts(self.admin),
+            'pages': counters.page_counts(),
+            'comments': counters.comment_counts(self.admin),
+            'home': counters.dashboard_counts(),
+        }
+
+    def assertCountsChange(self, mutate):
+        before = self.counts()
+        mutate()
+        after = self.counts()
+        with override_settings(DASHBOARD_COUNTERS_CACHE_TIMEOUT=0):
+            self.assertEqual(after, self.counts())
+        self.assertNotEqual(before, after)
+
+    def admin_action(self, model, action, objects):
+        response = self.client.post(
+            reverse(f'admin:blog_{model._meta.model_name}_changelist'),
+            {'action': action, '_selected_action': [obj.pk for obj in objects]},
+        )
+        self.assertEqual(response.status_code, 302)
+
+    def test_admin_publish_and_draft(self):
+        self.assertCountsChange(lambda: self.admin_action(Post, 'mark_as_published', self.posts[:2]))
+        self.assertCountsChange(lambda: self.admin_action(Post, 'mark_as_draft', self.posts[:1]))
+        self.assertCountsChange(lambda: self.admin_action(Page, 'mark_as_published', [self.page]))
+
+    def test_admin_approve_comments(self):
+        self.assertCountsChange(lambda: self.admin_action(Comment, 'approve_comments', self.comments))
+
+    def test_dashboard_bulk_actions(self):
+        ids = [post.pk for post in self.posts]
+        self.assertCountsChange(lambda: self.client.post(reverse('bulk_action'), {'action': 'publish', 'post_ids': ids}))
+        self.assertCountsChange(lambda: self.client.post(reverse('bulk_action'), {'action': 'trash', 'post_ids': ids[:1]}))
+        self.assertCountsChange(lambda: self.client.post(reverse('bulk_action_pages'), {'action': 'publish', 'page_ids': [self.page.pk]}))
+        self.assertCountsChange(lambda: self.client.post(
+            reverse('bulk_comment_action'), {'bulk_action': 'approve', 'comment_ids': [self.comments[0].pk]},
+        ))
+
+    def test_model_saves_and_deletes(self):
+        self.assertCountsChange(lambda: Post.objects.create(title='New', slug='new', content='', status='published'))
+        self.assertCountsChange(lambda: self.posts[1].move_to_trash())
+        self.assertCountsChange(lambda: self.comments[1].delete())
+
+    def test_each_widget_is_one_aggregate_query(self):
+        self.posts[2].move_to_trash()
+        Post.objects.filter(pk=self.posts[1].pk).update(status='published')
+        cache.clear()
+        with self.assertNumQueries(1):
+            self.assertEqual(
+                counters.post_counts(self.admin),
+                {'all': 2, 'published': 1, 'draft': 1, 'trash': 1, 'mine': 2},
+            )
+        with self.assertNumQueries(1):
+            self.assertEqual(counters.comment_counts(), {'all': 2, 'pending': 2, 'approved': 0})
+        with self.assertNumQueries(1):
+            self.assertEqual(counters.user_counts(), {'all': 1, 'admin': 1, 'author': 0})
+        with self.assertNumQueries(0):
+            counters.post_counts(self.admin)
+            counters.comment_counts()
+
+    @override_settings(SINGLE_PROCESS_CACHE=False)
+    def test_process_local_cache_is_not_used(self):
+        counters.post_counts()
+        with self.assertNumQueries(1):
+            counters.post_counts()
+
+    def test_home_widgets_leave_out_trash(self):
+        Post.objects.filter(pk__in=[post.pk for post in self.posts]).update(status='published')
+        Page.objects.filter(pk=self.page.pk).update(status='published')
+        self.posts[0].move_to_trash()
+        self.page.refresh_from_db()
+        self.page.move_to_trash()
+        counts = counters.dashboard_counts()
+        self.assertEqual(counts['posts_count'], 2)
+        self.assertEqual(counts['pages_count'], 0)
+        self.assertEqual(counts['posts_count'], counters.post_counts()['published'])
+
+    def test_counts_are_cached_per_user(self):
+        other = User.objects.create_user('counter-author')
+        self.assertEqual(counters.post_counts(self.admin)['mine'], 3)
+        self.assertEqual(counters.post_counts(other)['mine'], 0)
+        self.assertNotIn('mine', counters.post_counts())
+
+    def test_logins_keep_the_cache(self):
+        counters.user_counts()
+        self.client.force_login(self.admin)
+        with self.assertNumQueries(0):
+            counters.user_counts()
+        User.objects.create_user('counter-new')
+        self.assertEqual(counters.user_counts()['all'], 2)
@@ -54,6 +54,11 @@ path('media/<int:media_id>/', views.media_detail, name='media_detail'),
 path('media/<int:media_id>/update/', views.update_media, name='update_media'),
 path('media/<int:media_id>/delete/', views.delete_media, name='delete_media'),
 path('media/bulk-delete/', views.bulk_delete_media, name='bulk_delete_media'),
+path('media/processing-status/', views.media_processing_status, name='media_processing_status'),
+path('media/uploads/', views.create_upload_session, name='create_upload_session'),
+path('media/uploads/<uuid:upload_id>/', views.upload_session, name='upload_session'),
+path('media/uploads/<uuid:upload_id>/chunk/', views.upload_chunk, name='upload_chunk'),
+path('media/uploads/<uuid:upload_id>/complete/', views.complete_upload_session, name='complete_upload_session'),
 # Media management URLs
 
 # Projects
@@ -1,4 +1,5 @@
 import os
+import re
 from django.utils import timezone
 from django.shortcuts import get_object_or_404, redirect, render
 from django.urls import reverse
@@ -6,6 +7,9 @@ from django.core.paginator import Paginator
 from django.db.models import Q, F, Count
 from django.http import JsonResponse, QueryDict
 from blog.models import Category, Page, Post, Comment, UserProfile
+from blog.counters import refresh_category_counts, refresh_comment_counts, reset_pending_comment_count
+from blog.page_cache import comment_tags
+from blog.search import reindex_posts
 from django.contrib import messages
 from django.views.decorators.http import require_http_methods
 from django.contrib.auth import authenticate, login as auth_login, logout as auth_logout
@@ -13,12 +17,20 @@ import json
 from django.views.decorators.csrf import csrf_exempt
 from django.utils.text import slugify
 from dashboard.forms import BulkActionForm, PageForm, PostForm, ProjectForm, UserCreateForm, UserEditForm, UserProfileEditForm, set_user_permissions_by_role
-from media_manager.models import MediaFile
+from media_manager.models import MediaFile, UploadSession
+from media_manager.metadata import upload_digest
+from media_manager.utils import finalize_upload_session
+from media_manager.processing import schedule_processing
+from django.conf import settings
 from portfolio.models import Project, Team, Testimonial
 from django.db import transaction
+from utils.page_cache import invalidate_pages
+from utils.pagination import CursorPaginator, paginate
 from django.contrib.auth.models import User, Group
 from django.contrib.auth.decorators import login_required, user_passes_test
 from .decorators import administrator_required, author_or_admin_required
+from . import autosave, counters
+from . import search as admin_search
 
 def build_filtered_url(base_url, **params):
     query_dict = QueryDict(mutable=True)
@@ -31,19 +43,7 @@ def build_filtered_url(base_url, **params):
     return base_url
 @login_required(login_url='login')
 def dashboard(request):
-    posts_count = Post.objects.filter(status='published').count()
-    pages_count = Page.objects.filter(status='published').count()
-    comments_count = Comment.objects.filter(approved=True).count()
-    pending_comments_count = Comment.objects.filter(approved=False).count()
-    projects_count = Project.objects.count()
-    
-    context = {
-        'posts_count': posts_count,
-        'pages_count': pages_count,
-        'comments_count': comments_count,
-        'pending_comments_count': pending_comments_count,
-        'projects_count': projects_count,
-    }
+    context = counters.dashboard_counts()
     
     return render(request, 'dashboard/dashboard.html', context)
 
@@ -55,9 +55,7 @@ def posts(request):
     search_query = request.GET.get('search', '').strip()
     
     
-    posts_queryset = Post.objects.select_related('author').prefetch_related('category').annotate(
-    comment_count=Count('comments', filter=Q(comments__approved=True))
-)
+    posts_queryset = Post.objects.select_related('author').prefetch_related('category')
     # Filter by trash status
     if status_filter == 'trash':
         posts_queryset = posts_queryset.filter(is_trashed=True)
@@ -66,11 +64,12 @@ def posts(request):
     
     
     if search_query:
-        posts_queryset = posts_queryset.filter(
-            Q(title__icontains=search_query) | 
-            Q(content__icontains=search_query) |
-            Q(excerpt__icontains=search_query)
+        posts_queryset = admin_search.search(
+            posts_queryset, search_query, admin_search.CONTENT_FIELDS,
+            body_fields=('content',), ordering=admin_search.RESULT_ORDERING,
         )
+    else:
+        posts_queryset = posts_queryset.order_by('-created_at')
     
     if status_filter == 'mine':
         posts_queryset = posts_queryset.filter(author=request.user)
@@ -97,27 +96,15 @@ def posts(request):
         except (ValueError, IndexError):
             pass
     
-    posts_queryset = posts_queryset.order_by('-created_at')
-    
     # Get counts for tabs
-    def get_tab_counts(user):
-        base_posts = Post.objects.select_related('author')
-        return {
-            'all': base_posts.filter(is_trashed=False).count(),
-            'mine': base_posts.filter(is_trashed=False, author=user).count(),
-            'published': base_posts.filter(is_trashed=False, status='published').count(),
-            'draft': base_posts.filter(is_trashed=False, status='draft').count(),
-            'trash': base_posts.filter(is_trashed=True).count(),
-        }
-
-    tab_counts = get_tab_counts(request.user)
+    tab_counts = counters.post_counts(request.user)
 
     categories = Category.objects.all().order_by('name')
     
-    # Pagination
-    paginator = Paginator(posts_queryset, 20)
-    page_number = request.GET.get('page', 1)
-    posts_page = paginator.get_page(page_number)
+    # Keyset cursors for the listing, page numbers for ranked search results
+    posts_page, previous_page, next_page = paginate(
+        posts_queryset, 20, request.GET.get('page'), keyset=not search_query,
+    )
     
     
     # Generate date options (last 12 months)
@@ -147,13 +134,11 @@ def posts(request):
         'current_category': category_filter,
         'date_options': date_filter,
         'search_query': search_query,
-        'total_items': paginator.count,
-        'current_page': posts_page.number,
-        'total_pages': paginator.num_pages,
+        'total_items': posts_page.paginator.count,
         'has_previous': posts_page.has_previous(),
         'has_next': posts_page.has_next(),
-        'previous_page': posts_page.previous_page_number() if posts_page.has_previous() else None,
-        'next_page': posts_page.next_page_number() if posts_page.has_next() else None,
+        'previous_page': previous_page,
+        'next_page': next_page,
     }
     
     return render(request, 'dashboard/posts/posts.html', context)
@@ -211,6 +196,12 @@ def bulk_action(request):
             posts_to_update.update(status='draft')
             messages.success(request, f'{len(post_ids)} posts moved to draft.')
         
+        # QuerySet.update() sends no signals
+        counters.invalidate_counters()
+        refresh_category_counts(Category.objects.filter(posts__in=post_ids).values_list('pk', flat=True))
+        reindex_posts(post_ids)
+        invalidate_pages('posts')
+        
         # Build redirect URL with preserved parameters
         redirect_url = reverse('posts') + f'?status={status_filter}&category={category_filter}&date={date_filter}&search={search_query}&page={page}'
         return redirect(redirect_url)
@@ -478,10 +469,27 @@ def generate_unique_slug(title, exclude_id=None):
         slug = f"{base_slug}-{counter}"
         counter += 1
 
+def set_post_categories(post, category_ids):
+    """Replace a post's categories with the valid ones among ``category_ids``"""
+    if not isinstance(category_ids, list):
+        category_ids = [category_ids] if category_ids not in (None, '') else []
+    try:
+        post.category.set(Category.objects.filter(pk__in=category_ids))
+    except (ValueError, TypeError):
+        pass
+
+def stale_autosave_response(kind, revision):
+    return JsonResponse({
+        'success': False,
+        'error': 'stale',
+        'message': f'This {kind} was changed elsewhere. Reload it before saving again.',
+        'revision': revision,
+    }, status=409)
+
 @csrf_exempt
 @login_required(login_url='login')
 def auto_save_post(request):
-    """Enhanced auto-save with comprehensive field support"""
+    """Enhanced auto-save with comprehensive field support; see dashboard.autosave"""
     if request.method != 'POST':
         return JsonResponse({'success': False, 'error': 'Invalid request method'})
     
@@ -489,9 +497,26 @@ def auto_save_post(request):
         data = json.loads(request.body)
         post_id = data.get('post_id')
         
-        saveable_fields = ['title', 'content', 'excerpt', 'seo_description', 'seo_keywords', 'slug']
+        saveable_fields = list(autosave.SAVEABLE_FIELDS)
         
-        if post_id:
+        if autosave.is_delta(data) and not post_id:
+            # A new post starts from its changes
+            data = {**data, **data['changes']}
+        
+        if post_id and autosave.is_delta(data):
+            changes = data['changes']
+            try:
+                post = autosave.apply_changes(
+                    Post.objects.filter(author=request.user), post_id,
+                    autosave.parse_revision(data.get('base_revision')), changes, generate_unique_slug,
+                )
+            except autosave.StaleRevision as e:
+                return stale_autosave_response('post', e.revision)
+            
+            if 'category' in changes:
+                set_post_categories(post, changes['category'])
+        
+        elif post_id:
             # Update existing post
             post = get_object_or_404(Post, pk=post_id, author=request.user)
             
@@ -510,15 +535,7 @@ def auto_save_post(request):
             post.save()
             
             # Handle category after saving
-            category_ids = data.get('category', [])
-            if category_ids:
-                try:
-                    valid_categories = Category.objects.filter(pk__in=category_ids)
-                    post.category.set(valid_categories)
-                except (ValueError, TypeError):
-                    pass
-            else:
-                post.category.clear()
+            set_post_categories(post, data.get('category', []))
             
         else:
             # Create new post
@@ -536,19 +553,14 @@ def auto_save_post(request):
             post = Post.objects.create(**post_data)
             
             # Handle category for new post
-            category_id = data.get('category')
-            if category_id and category_id != '':
-                try:
-                    category = Category.objects.get(pk=int(category_id))
-                    post.category = category
-                    post.save()
-                except (Category.DoesNotExist, ValueError, TypeError):
-                    pass
+            if data.get('category'):
+                set_post_categories(post, data['category'])
         
         return JsonResponse({
             'success': True,
             'post_id': post.pk,
             'slug': post.slug,
+            'revision': post.revision,
             'message': 'Auto-saved'
         })
         
@@ -662,9 +674,7 @@ def preview_post(request, pk):
 @login_required(login_url='login')
 def categories(request):
     search_query = request.GET.get('search', '')
-    categories_list = Category.objects.annotate(
-        posts_count=Count('posts', filter=Q(posts__status='published'))
-    ).order_by('name')
+    categories_list = Category.objects.order_by('name')
     
     if search_query:
         categories_list = categories_list.filter(
@@ -788,7 +798,7 @@ def view_category(request, slug):
     """Public view for category posts"""
     category = get_object_or_404(Category, slug=slug)
     
-    posts = Post.objects.filter(status='published', category=category).order_by('-published_date')
+    posts = Post.objects.published().for_listing().filter(category=category).order_by('-published_date')
     paginator = Paginator(posts, 6)
     page_number = request.GET.get("page")
     page_obj = paginator.get_page(page_number)
@@ -807,7 +817,7 @@ def view_category(request, slug):
 def comment(request):
     # Get filter parameters
     status = request.GET.get('status', 'all')
-    page = request.GET.get('page', 1)
+    page = request.GET.get('page')
     
     # Base queryset
     comments = Comment.objects.select_related('post').order_by('-created_on')
@@ -821,13 +831,14 @@ def comment(request):
         comments = comments.filter(approved=True)
     
     # Count for each status
-    all_count = Comment.objects.count()
-    mine_count = Comment.objects.filter(post__author=request.user).count()
-    pending_count = Comment.objects.filter(approved=False).count()
-    approved_count = Comment.objects.filter(approved=True).count()
-    
-    # Pagination
-    paginator = Paginator(comments, 10)
+    comment_counts = counters.comment_counts(request.user)
+    all_count = comment_counts['all']
+    mine_count = comment_counts['mine']
+    pending_count = comment_counts['pending']
+    approved_count = comment_counts['approved']
+    
+    # Keyset pagination; ``page`` carries the opaque cursor
+    paginator = CursorPaginator(comments, 10)
     page_obj = paginator.get_page(page)
     
     context = {
@@ -852,6 +863,7 @@ def bulk_comment_action(request):
         
         if comment_ids:
             comments = Comment.objects.filter(id__in=comment_ids)
+            post_ids = list(comments.values_list('post_id', flat=True).distinct())
             
             if action == 'approve':
                 comments.update(approved=True)
@@ -859,6 +871,10 @@ def bulk_comment_action(request):
                 comments.update(approved=False)
             elif action == 'delete':
                 comments.delete()
+            counters.invalidate_counters()
+            refresh_comment_counts(post_ids)
+            reset_pending_comment_count()
+            invalidate_pages(*comment_tags(post_ids))
     
     return redirect('comments')
 
@@ -929,11 +945,12 @@ def pages(request):
     
     # Apply filters
     if search_query:
-        pages_queryset = pages_queryset.filter(
-            Q(title__icontains=search_query) | 
-            Q(content__icontains=search_query) |
-            Q(excerpt__icontains=search_query)
+        pages_queryset = admin_search.search(
+            pages_queryset, search_query, admin_search.CONTENT_FIELDS,
+            body_fields=('content',), ordering=admin_search.RESULT_ORDERING,
         )
+    else:
+        pages_queryset = pages_queryset.order_by('-created_at')
     
     if status_filter == 'published':
         pages_queryset = pages_queryset.filter(status='published')
@@ -950,24 +967,13 @@ def pages(request):
         except (ValueError, IndexError):
             pass
     
-    pages_queryset = pages_queryset.order_by('-created_at')
-    
     # Tab counts
-    def get_tab_counts():
-        base_pages = Page.objects.all()
-        return {
-            'all': base_pages.filter(is_trashed=False).count(),
-            'published': base_pages.filter(is_trashed=False, status='published').count(),
-            'draft': base_pages.filter(is_trashed=False, status='draft').count(),
-            'trash': base_pages.filter(is_trashed=True).count(),
-        }
-
-    tab_counts = get_tab_counts()
+    tab_counts = counters.page_counts()
     
-    # Pagination
-    paginator = Paginator(pages_queryset, 20)
-    page_number = request.GET.get('page', 1)
-    pages_page = paginator.get_page(page_number)
+    # Keyset cursors for the listing, page numbers for ranked search results
+    pages_page, previous_page, next_page = paginate(
+        pages_queryset, 20, request.GET.get('page'), keyset=not search_query,
+    )
     
     context = {
         'pages': pages_page,
@@ -975,13 +981,11 @@ def pages(request):
         'current_status': status_filter,
         'current_date': date_filter,
         'search_query': search_query,
-        'total_items': paginator.count,
-        'current_page': pages_page.number,
-        'total_pages': paginator.num_pages,
+        'total_items': pages_page.paginator.count,
         'has_previous': pages_page.has_previous(),
         'has_next': pages_page.has_next(),
-        'previous_page': pages_page.previous_page_number() if pages_page.has_previous() else None,
-        'next_page': pages_page.next_page_number() if pages_page.has_next() else None,
+        'previous_page': previous_page,
+        'next_page': next_page,
     }
     
     return render(request, 'dashboard/pages/pages.html', context)
@@ -1037,6 +1041,10 @@ def bulk_action_pages(request):
             pages_to_update.update(status='draft')
             messages.success(request, f'{len(page_ids)} pages moved to draft.')
         
+        # QuerySet.update() sends no signals
+        counters.invalidate_counters()
+        invalidate_pages('pages')
+        
         redirect_url = reverse('pages') + f'?status={status_filter}&date={date_filter}&search={search_query}&page={page}'
         return redirect(redirect_url)
     
@@ -1216,7 +1224,7 @@ def generate_unique_slug_page(title, exclude_id=None):
 @administrator_required
 @login_required(login_url='login')
 def auto_save_page(request):
-    """Auto-save for pages"""
+    """Auto-save for pages; see dashboard.autosave"""
     if request.method != 'POST':
         return JsonResponse({'success': False, 'error': 'Invalid request method'})
     
@@ -1224,9 +1232,21 @@ def auto_save_page(request):
         data = json.loads(request.body)
         page_id = data.get('page_id')
         
-        saveable_fields = ['title', 'content', 'excerpt', 'seo_description', 'seo_keywords', 'slug']
+        saveable_fields = list(autosave.SAVEABLE_FIELDS)
+        
+        if autosave.is_delta(data) and not page_id:
+            data = {**data, **data['changes']}
         
-        if page_id:
+        if page_id and autosave.is_delta(data):
+            try:
+                page = autosave.apply_changes(
+                    Page.objects.all(), page_id,
+                    autosave.parse_revision(data.get('base_revision')), data['changes'], generate_unique_slug_page,
+                )
+            except autosave.StaleRevision as e:
+                return stale_autosave_response('page', e.revision)
+        
+        elif page_id:
             page = get_object_or_404(Page, pk=page_id)
             
             for field in saveable_fields:
@@ -1255,6 +1275,7 @@ def auto_save_page(request):
             'success': True,
             'page_id': page.pk,
             'slug': page.slug,
+            'revision': page.revision,
             'message': 'Auto-saved'
         })
         
@@ -1314,10 +1335,8 @@ def media_library(request):
         media_files = media_files.filter(category=media_type)
     
     if search_query:
-        media_files = media_files.filter(
-            Q(file__icontains=search_query) |
-            Q(alt_text__icontains=search_query) |
-            Q(description__icontains=search_query)
+        media_files = admin_search.search(
+            media_files, search_query, admin_search.MEDIA_FIELDS, ordering=admin_search.RESULT_ORDERING,
         )
     
     # Date filtering (simplified)
@@ -1325,9 +1344,8 @@ def media_library(request):
         pass
     
     
-    paginator = Paginator(media_files, 20)
-    page_number = request.GET.get('page', 1)
-    page_obj = paginator.get_page(page_number)
+    # Keyset cursors for the infinite scroll, page numbers for ranked search results
+    page_obj, _, next_page = paginate(media_files, 20, request.GET.get('page'), keyset=not search_query)
     
     # AJAX request for load more
     if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
@@ -1352,7 +1370,10 @@ def media_library(request):
             return JsonResponse({
                 'media_files': media_data,
                 'has_next': page_obj.has_next(),
-                'next_page_number': page_obj.next_page_number() if page_obj.has_next() else None,
+                'next_cursor': next_page,
+                # The load-more script sends this back as ?page=
+                'next_page_number': next_page,
+                'total': page_obj.paginator.count,
             })
         elif request.GET.get('page'):  # load more 
             media_data = []
@@ -1373,18 +1394,14 @@ def media_library(request):
             return JsonResponse({
                 'media_files': media_data,
                 'has_next': page_obj.has_next(),
-                'next_page_number': page_obj.next_page_number() if page_obj.has_next() else None,
+                'next_cursor': next_page,
+                # The load-more script sends this back as ?page=
+                'next_page_number': next_page,
+                'total': page_obj.paginator.count,
             })
     
     # Get media type counts for filter buttons
-    media_counts = {
-        'all': MediaFile.objects.count(),
-        'image': MediaFile.objects.filter(category='image').count(),
-        'document': MediaFile.objects.filter(category='document').count(),
-        'video': MediaFile.objects.filter(category='video').count(),
-        'audio': MediaFile.objects.filter(category='audio').count(),
-        'other': MediaFile.objects.filter(category='other').count(),
-    }
+    media_counts = counters.media_counts()
     
     context = {
         'media_files': page_obj,
@@ -1393,7 +1410,7 @@ def media_library(request):
         'date_filter': date_filter,
         'media_counts': media_counts,
         'has_next': page_obj.has_next(),
-        'next_page_number': page_obj.next_page_number() if page_obj.has_next() else None,
+        'next_page_number': next_page,
     }
     
     return render(request, 'dashboard/media_library/media.html', context)
@@ -1404,16 +1421,30 @@ def add_media(request):
     if request.method == 'POST':
         files = request.FILES.getlist('files')
         uploaded_files = []
+        pending_ids = []
+        reused_count = 0
         
         for file in files:
-            # Create MediaFile instance
-            media_file = MediaFile(file=file)
+            # Reuse an identical file already in the library instead of storing a copy
+            existing = MediaFile.objects.find_by_digest(upload_digest(file))
+            if existing:
+                uploaded_files.append(existing)
+                reused_count += 1
+                continue
+            
+            # Create MediaFile instance; metadata and thumbnails are built in the background
+            media_file = MediaFile(file=file, processing_status=MediaFile.PROCESSING_PENDING)
+            media_file.sha256 = upload_digest(file)
+            media_file.size_bytes = file.size
             
             # Set alt_text to filename without extension
             media_file.alt_text = os.path.splitext(file.name)[0]
             
             media_file.save()
             uploaded_files.append(media_file)
+            pending_ids.append(media_file.id)
+        
+        schedule_processing(pending_ids)
         
         if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
             # AJAX response - check if request came from media library
@@ -1427,12 +1458,18 @@ def add_media(request):
                     'url': media.file.url,
                     'type': media.file_type,
                     'size': media.file_size,
+                    'processing_status': media.processing_status,
                 })
             
+            message = f'Successfully uploaded {len(uploaded_files)} file(s)'
+            if reused_count:
+                message += f' ({reused_count} already in the library)'
+            
             response_data = {
                 'success': True,
                 'files': files_data,
-                'message': f'Successfully uploaded {len(uploaded_files)} file(s)'
+                'message': message,
+                'status_url': reverse('media_processing_status'),
             }
             
             # If not from media library page, redirect to media library
@@ -1441,7 +1478,10 @@ def add_media(request):
             
             return JsonResponse(response_data)
         else:
-            messages.success(request, f'Successfully uploaded {len(uploaded_files)} file(s)')
+            message = f'Successfully uploaded {len(uploaded_files)} file(s)'
+            if reused_count:
+                message += f' ({reused_count} already in the library)'
+            messages.success(request, message)
             return redirect('/dashboard/media/')  
     
     return render(request, 'dashboard/media_library/add_media.html')
@@ -1463,7 +1503,10 @@ def media_detail(request, media_id):
             'created_at': media_file.created_at.strftime('%B %d, %Y'),
             'file_extension': media_file.file_extension,
             'thumbnail_url': media_file.get_thumbnail_url(),
-            'dimensions': getattr(media_file, 'dimensions', None),  
+            'dimensions': media_file.dimensions,
+            'width': media_file.width,
+            'height': media_file.height,
+            'mime_type': media_file.mime_type,
         }
         return JsonResponse(data)
     
@@ -1535,6 +1578,148 @@ def bulk_delete_media(request):
     return JsonResponse({'error': 'Invalid request'}, status=400)
 
 
+
+# Chunked / resumable uploads
+CONTENT_RANGE_RE = re.compile(r'^bytes (\d+)-(\d+)/(\d+)$')
+
+def upload_session_data(session):
+    return {
+        'upload_id': str(session.id),
+        'filename': session.filename,
+        'offset': session.received_bytes,
+        'total_size': session.total_size,
+        'status': session.status,
+        'chunk_size': settings.MEDIA_UPLOAD_CHUNK_SIZE,
+    }
+
+@require_http_methods(["POST"])
+@login_required(login_url='login')
+def create_upload_session(request):
+    """Start a chunked upload; the client then PUTs byte ranges to the session"""
+    try:
+        data = json.loads(request.body)
+        filename = os.path.basename(data['filename'])
+        total_size = int(data['size'])
+    except (ValueError, KeyError, TypeError):
+        return JsonResponse({'success': False, 'error': 'filename and size are required'}, status=400)
+    
+    if not filename or total_size <= 0:
+        return JsonResponse({'success': False, 'error': 'Invalid filename or size'}, status=400)
+    
+    session = UploadSession.objects.create(
+        user=request.user,
+        filename=filename[:255],
+        total_size=total_size,
+        sha256=(data.get('sha256') or '')[:64],
+    )
+    return JsonResponse({'success': True, **upload_session_data(session)}, status=201)
+
+@require_http_methods(["GET", "DELETE"])
+@login_required(login_url='login')
+def upload_session(request, upload_id):
+    """Report the resume offset of an upload, or abort it"""
+    session = get_object_or_404(UploadSession, id=upload_id, user=request.user)
+    
+    if request.method == 'DELETE':
+        session.discard()
+        session.delete()
+        return JsonResponse({'success': True, 'message': 'Upload aborted'})
+    
+    return JsonResponse({'success': True, **upload_session_data(session)})
+
+@require_http_methods(["PUT", "POST"])
+@login_required(login_url='login')
+def upload_chunk(request, upload_id):
+    """Append one byte range (``Content-Range: bytes start-end/total``) to an upload"""
+    match = CONTENT_RANGE_RE.match(request.headers.get('Content-Range', ''))
+    if not match:
+        return JsonResponse({'success': False, 'error': 'Missing or invalid Content-Range header'}, status=400)
+    start, end, total = (int(value) for value in match.groups())
+    length = end - start + 1
+    
+    if length <= 0 or length > settings.MEDIA_UPLOAD_CHUNK_SIZE:
+        return JsonResponse({'success': False, 'error': 'Invalid chunk size'}, status=400)
+    
+    with transaction.atomic():
+        session = get_object_or_404(
+            UploadSession.objects.select_for_update(), id=upload_id, user=request.user
+        )
+        if session.status != 'active':
+            return JsonResponse({'success': False, 'error': 'Upload is not active'}, status=409)
+        if total != session.total_size or end >= session.total_size:
+            return JsonResponse({'success': False, 'error': 'Range does not match upload size'}, status=400)
+        if start != session.received_bytes:
+            # Client is out of sync (e.g. after a dropped connection); tell it where to resume
+            return JsonResponse({'success': False, 'error': 'Unexpected offset', **upload_session_data(session)}, status=409)
+        
+        try:
+            session.append_chunk(request, length)
+        except ValueError as e:
+            return JsonResponse({'success': False, 'error': str(e), **upload_session_data(session)}, status=409)
+    
+    return JsonResponse({'success': True, **upload_session_data(session)})
+
+@require_http_methods(["POST"])
+@login_required(login_url='login')
+def complete_upload_session(request, upload_id):
+    """Verify the checksum of a fully received upload and turn it into a MediaFile"""
+    with transaction.atomic():
+        session = get_object_or_404(
+            UploadSession.objects.select_for_update(), id=upload_id, user=request.user
+        )
+        if session.status == 'complete' and session.media_file:
+            media = session.media_file
+        else:
+            try:
+                media = finalize_upload_session(session)
+            except ValueError as e:
+                return JsonResponse({'success': False, 'error': str(e), **upload_session_data(session)}, status=400)
+    
+    if media.processing_status == MediaFile.PROCESSING_PENDING:
+        schedule_processing([media.id])
+    
+    return JsonResponse({
+        'success': True,
+        'file': {
+            'id': media.id,
+            'name': os.path.basename(media.file.name),
+            'url': media.file.url,
+            'type': media.file_type,
+            'size': media.file_size,
+            'processing_status': media.processing_status,
+        },
+        'status_url': reverse('media_processing_status'),
+    })
+
+@require_http_methods(["GET"])
+@login_required(login_url='login')
+def media_processing_status(request):
+    """Report background processing progress for ?ids=1,2,3"""
+    try:
+        ids = [int(value) for value in request.GET.get('ids', '').split(',') if value.strip()]
+    except ValueError:
+        return JsonResponse({'success': False, 'error': 'Invalid ids'}, status=400)
+    
+    files = MediaFile.objects.all_including_missing().filter(id__in=ids[:200])
+    files_data = []
+    for media in files:
+        data = {
+            'id': media.id,
+            'status': media.processing_status,
+            'error': media.processing_error,
+        }
+        if media.is_processed:
+            data.update({
+                'size': media.file_size,
+                'mime_type': media.mime_type,
+                'dimensions': media.dimensions,
+                'thumbnail': media.get_thumbnail_url(150),
+            })
+        files_data.append(data)
+    
+    pending = sum(1 for data in files_data if data['status'] in (MediaFile.PROCESSING_PENDING, MediaFile.PROCESSING_RUNNING))
+    return JsonResponse({'success': True, 'files': files_data, 'pending': pending})
+
 # Projects
 @administrator_required
 @login_required(login_url='login')
@@ -1734,20 +1919,16 @@ def user_list(request):
     ).order_by('-date_joined')
     
     if search:
-        users = users.filter(
-            Q(username__icontains=search) |
-            Q(first_name__icontains=search) |
-            Q(last_name__icontains=search) |
-            Q(email__icontains=search)
-        )
+        users = admin_search.search(users, search, admin_search.USER_FIELDS, ordering=('-date_joined',))
     
     if role_filter:
         users = users.filter(groups__name=role_filter)
     
     # Get user counts
-    all_count = User.objects.count()
-    admin_count = User.objects.filter(groups__name='Administrator').count()
-    author_count = User.objects.filter(groups__name='Author').count()
+    user_counts = counters.user_counts()
+    all_count = user_counts['all']
+    admin_count = user_counts['admin']
+    author_count = user_counts['author']
     
     # Pagination
     paginator = Paginator(users, 10)
@@ -1838,15 +2019,15 @@ def delete_user(request, user_id):
     return JsonResponse({'success': False, 'message': 'Invalid request method'})
 
 @login_required(login_url='login')
-def profile(request, user_id):
+def profile(request, user_id=None):
     # Check permissions
-    if user_id == request.user.id:
+    if user_id is None or user_id == request.user.id:
         target_user = request.user
         is_admin_editing = False
     else:
         if not (request.user.is_staff or request.user.groups.filter(name='Administrator').exists()):
             messages.error(request, 'You do not have permission to edit other users.')
-            return redirect('profile', user_id=request.user.id)
+            return redirect('profile')
         target_user = get_object_or_404(User, id=user_id)
         is_admin_editing = True
     
@@ -1907,7 +2088,7 @@ def handle_profile_update(request, target_user, profile, is_admin_editing):
         
         # Fix the redirect
         if is_admin_editing:
-            return redirect('profile', user_id=target_user.id)
+            return redirect('edit_user_profile', user_id=target_user.id)
         
     except Exception as e:
         messages.error(request, 'Error updating profile. Please try again.')
@@ -42,13 +42,13 @@ class MediaTypeListFilter(admin.SimpleListFilter):
 @admin.register(MediaFile)
 class MediaFileAdmin(admin.ModelAdmin):
     list_display = ('file_preview', 'file_name', 'file_type_display', 'file_size_display', 'created_at')
-    list_filter = (MediaTypeListFilter, 'created_at')
+    list_filter = (MediaTypeListFilter, 'file_exists', 'processing_status', 'created_at')
     search_fields = ('file', 'alt_text', 'description')
     list_per_page = 20
     actions = ['bulk_delete_files', 'bulk_download_files', 'bulk_change_category']
     
     # Custom fields for list display
-    readonly_fields = ('file_preview_large', 'file_size_display', 'file_type_display')
+    readonly_fields = ('file_preview_large', 'file_size_display', 'file_type_display', 'mime_type', 'dimensions', 'sha256', 'processing_status', 'processing_error', 'file_exists', 'last_verified_at')
     
     fieldsets = (
         ('File Information', {
@@ -58,11 +58,15 @@ class MediaFileAdmin(admin.ModelAdmin):
             'fields': ('alt_text', 'description', 'category')
         }),
         ('Metadata', {
-            'fields': ('file_size_display', 'file_type_display',),
+            'fields': ('file_size_display', 'file_type_display', 'mime_type', 'dimensions', 'sha256', 'processing_status', 'processing_error', 'file_exists', 'last_verified_at'),
             'classes': ('collapse',)
         })
     )
 
+    def get_queryset(self, request):
+        # Show missing files too so they can be cleaned up from the admin
+        return MediaFile.objects.all_including_missing()
+
     def get_urls(self):
         urls = super().get_urls()
         custom_urls = [
@@ -91,7 +95,7 @@ class MediaFileAdmin(admin.ModelAdmin):
         if obj.file_type == 'image':
             return format_html(
                 '<img src="{}" style="width: 50px; height: 50px; object-fit: cover; border-radius: 4px;" />',
-                obj.file.url
+                obj.get_thumbnail_url(150)
             )
         else:
             return format_html(
@@ -105,7 +109,7 @@ class MediaFileAdmin(admin.ModelAdmin):
         if obj.file_type == 'image':
             return format_html(
                 '<img src="{}" style="max-width: 300px; max-height: 300px; object-fit: contain;" />',
-                obj.file.url
+                obj.get_thumbnail_url(400)
             )
         else:
             return format_html(
@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand
+from media_manager.models import MediaFile
+
+METADATA_FIELDS = ['size_bytes', 'mime_type', 'width', 'height', 'sha256']
+
+
+class Command(BaseCommand):
+    help = "Populate stored size, MIME type, dimensions and digest for existing media"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=200)
+        parser.add_argument('--all', action='store_true', help='Recompute metadata for every file')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        queryset = MediaFile.objects.all()
+        if not options['all']:
+            queryset = queryset.filter(sha256='')
+
+        updated = failed = 0
+        batch = []
+        for media in queryset.iterator(chunk_size=batch_size):
+            try:
+                media.populate_metadata()
+            except (FileNotFoundError, OSError) as e:
+                failed += 1
+                self.stderr.write(f"Skipped {media.file.name}: {e}")
+                continue
+
+            batch.append(media)
+            if len(batch) >= batch_size:
+                MediaFile.objects.bulk_update(batch, METADATA_FIELDS)
+                updated += len(batch)
+                batch = []
+
+        if batch:
+            MediaFile.objects.bulk_update(batch, METADATA_FIELDS)
+            updated += len(batch)
+
+        self.stdout.write(self.style.SUCCESS(f"✅ Backfilled metadata for {updated} file(s), {failed} skipped."))
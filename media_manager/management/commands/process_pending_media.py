@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+from media_manager.models import MediaFile
+from media_manager.processing import process_media_file
+
+
+class Command(BaseCommand):
+    help = "Finish post-upload processing left pending by a restarted server"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--retry-failed', action='store_true', help='Also retry files whose processing failed')
+
+    def handle(self, *args, **options):
+        statuses = [MediaFile.PROCESSING_PENDING, MediaFile.PROCESSING_RUNNING]
+        if options['retry_failed']:
+            statuses.append(MediaFile.PROCESSING_FAILED)
+
+        ids = list(
+            MediaFile.objects.all_including_missing()
+            .filter(processing_status__in=statuses)
+            .values_list('id', flat=True)
+        )
+        for media_id in ids:
+            process_media_file(media_id)
+
+        failed = MediaFile.objects.all_including_missing().filter(
+            id__in=ids, processing_status=MediaFile.PROCESSING_FAILED
+        ).count()
+        self.stdout.write(self.style.SUCCESS(f"✅ Processed {len(ids) - failed} file(s), {failed} failed."))
@@ -0,0 +1,25 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from media_manager.models import UploadSession
+
+
+class Command(BaseCommand):
+    help = "Delete abandoned chunked uploads and their staging files"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hours', type=int, default=24, help='Age of the last received chunk')
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(hours=options['hours'])
+        stale = UploadSession.objects.filter(updated_at__lt=cutoff).exclude(status='complete')
+
+        count = 0
+        for session in stale.iterator():
+            session.discard()
+            session.delete()
+            count += 1
+
+        UploadSession.objects.filter(status='complete', updated_at__lt=cutoff).delete()
+        self.stdout.write(self.style.SUCCESS(f"✅ Purged {count} abandoned upload(s)."))
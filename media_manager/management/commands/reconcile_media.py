@@ -0,0 +1,137 @@
+import json
+import os
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from dashboard.counters import invalidate_counters
+from media_manager.models import MediaFile, detect_file_type
+from media_manager.utils import iter_media_paths, path_sort_key
+
+
+class Command(BaseCommand):
+    help = "Reconcile MEDIA_ROOT with the Media Manager in both directions"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument(
+            '--checkpoint',
+            help='Progress file used to resume an interrupted run '
+                 '(defaults to MEDIA_ROOT/.reconcile_checkpoint.json)',
+        )
+        parser.add_argument('--restart', action='store_true', help='Ignore any saved checkpoint')
+        parser.add_argument('--skip-import', action='store_true', help='Do not import new files from disk')
+        parser.add_argument('--skip-orphans', action='store_true', help='Do not mark missing files in the database')
+
+    def handle(self, *args, **options):
+        self.batch_size = options['batch_size']
+        media_root = str(settings.MEDIA_ROOT)
+        self.checkpoint_path = options['checkpoint'] or os.path.join(media_root, '.reconcile_checkpoint.json')
+
+        checkpoint = {} if options['restart'] else self.load_checkpoint()
+        resume_after = checkpoint.get('last_path')
+        if resume_after:
+            self.stdout.write(f"Resuming after {resume_after}")
+
+        # path -> (id, file_exists) for every known record
+        known = {
+            name: (pk, exists)
+            for pk, name, exists in MediaFile.objects.all_including_missing()
+            .values_list('id', 'file', 'file_exists')
+            .iterator(chunk_size=self.batch_size)
+        }
+        self.stdout.write(f"Loaded {len(known)} known path(s) from the database")
+
+        on_disk = set()
+        pending = []
+        scanned = imported = 0
+        started = time.monotonic()
+        resume_key = path_sort_key(resume_after) if resume_after else None
+
+        for relative_path in iter_media_paths(media_root):
+            on_disk.add(relative_path)
+            scanned += 1
+
+            if options['skip_import'] or relative_path in known:
+                continue
+            if resume_key and path_sort_key(relative_path) <= resume_key:
+                continue
+
+            pending.append(relative_path)
+            if len(pending) >= self.batch_size:
+                imported += self.import_batch(pending)
+                self.save_checkpoint(pending[-1])
+                self.report(scanned, started)
+                pending = []
+
+        if pending:
+            imported += self.import_batch(pending)
+            self.save_checkpoint(pending[-1])
+
+        self.stdout.write(self.style.SUCCESS(f"Imported {imported} new file(s)"))
+
+        if not options['skip_orphans']:
+            missing, restored = self.update_integrity(known, on_disk)
+            self.stdout.write(self.style.SUCCESS(
+                f"Marked {missing} record(s) missing, {restored} restored"
+            ))
+
+        self.clear_checkpoint()
+        invalidate_counters()
+        self.report(scanned, started)
+        self.stdout.write(self.style.SUCCESS("✅ All media synced successfully."))
+
+    def import_batch(self, paths):
+        now = timezone.now()
+        records = [
+            MediaFile(
+                file=path,
+                category=detect_file_type(path),
+                file_exists=True,
+                last_verified_at=now,
+            )
+            for path in paths
+        ]
+        with transaction.atomic():
+            MediaFile.objects.bulk_create(records, batch_size=self.batch_size)
+        return len(records)
+
+    def update_integrity(self, known, on_disk):
+        """Flip file_exists for records whose presence on disk changed"""
+        now = timezone.now()
+        to_missing = [pk for name, (pk, exists) in known.items() if exists and name not in on_disk]
+        to_restore = [pk for name, (pk, exists) in known.items() if not exists and name in on_disk]
+
+        for ids, exists in ((to_missing, False), (to_restore, True)):
+            for start in range(0, len(ids), self.batch_size):
+                chunk = ids[start:start + self.batch_size]
+                MediaFile.objects.all_including_missing().filter(id__in=chunk).update(
+                    file_exists=exists, last_verified_at=now
+                )
+        return len(to_missing), len(to_restore)
+
+    def report(self, scanned, started):
+        elapsed = max(time.monotonic() - started, 1e-6)
+        self.stdout.write(f"Scanned {scanned} file(s) in {elapsed:.1f}s ({scanned / elapsed:.0f} files/sec)")
+
+    def load_checkpoint(self):
+        try:
+            with open(self.checkpoint_path) as fh:
+                return json.load(fh)
+        except (FileNotFoundError, ValueError):
+            return {}
+
+    def save_checkpoint(self, last_path):
+        tmp_path = f"{self.checkpoint_path}.tmp"
+        with open(tmp_path, 'w') as fh:
+            json.dump({'last_path': last_path, 'saved_at': timezone.now().isoformat()}, fh)
+        os.replace(tmp_path, self.checkpoint_path)
+
+    def clear_checkpoint(self):
+        try:
+            os.remove(self.checkpoint_path)
+        except FileNotFoundError:
+            pass
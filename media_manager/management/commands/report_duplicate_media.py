@@ -0,0 +1,48 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Count, Max
+from media_manager.metadata import format_file_size
+from media_manager.models import MediaFile
+
+
+class Command(BaseCommand):
+    help = "List media files with identical content and the space merging them would reclaim"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--limit', type=int, default=50, help='Number of duplicate groups to list')
+
+    def handle(self, *args, **options):
+        unhashed = MediaFile.objects.filter(sha256='').count()
+        if unhashed:
+            self.stdout.write(self.style.WARNING(
+                f"{unhashed} file(s) have no digest yet; run backfill_media_metadata first."
+            ))
+
+        groups = (
+            MediaFile.objects.exclude(sha256='')
+            .values('sha256')
+            .annotate(copies=Count('id'), size=Max('size_bytes'))
+            .filter(copies__gt=1)
+        )
+        groups = sorted(groups, key=lambda g: (g['copies'] - 1) * (g['size'] or 0), reverse=True)
+
+        total_reclaimable = 0
+        total_redundant = 0
+        for group in groups:
+            redundant = group['copies'] - 1
+            total_redundant += redundant
+            total_reclaimable += redundant * (group['size'] or 0)
+
+        for group in groups[:options['limit']]:
+            reclaimable = (group['copies'] - 1) * (group['size'] or 0)
+            self.stdout.write(
+                f"{group['sha256'][:12]}  {group['copies']} copies  "
+                f"{format_file_size(reclaimable)} reclaimable"
+            )
+            names = MediaFile.objects.filter(sha256=group['sha256']).values_list('file', flat=True)
+            for name in names:
+                self.stdout.write(f"    {name}")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ {len(groups)} duplicate group(s), {total_redundant} redundant file(s), "
+            f"{format_file_size(total_reclaimable)} reclaimable."
+        ))
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+from dashboard.counters import invalidate_counters
+from media_manager.models import MediaFile
+from media_manager.utils import verify_media_files
+
+
+class Command(BaseCommand):
+    help = "Verify media files against storage and update the integrity index"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument(
+            '--purge',
+            action='store_true',
+            help='Delete records whose files are missing from storage',
+        )
+
+    def handle(self, *args, **options):
+        checked, missing = verify_media_files(batch_size=options['batch_size'])
+        self.stdout.write(f"Checked {checked} file(s), {missing} missing.")
+
+        if options['purge'] and missing:
+            deleted, _ = MediaFile.objects.missing().delete()
+            self.stdout.write(self.style.WARNING(f"Purged {deleted} orphaned record(s)."))
+
+        invalidate_counters()
+        self.stdout.write(self.style.SUCCESS("✅ Media integrity index updated."))
@@ -0,0 +1,65 @@
+import hashlib
+import mimetypes
+
+from PIL import Image
+
+
+def extract_file_metadata(file, name=None):
+    """
+    Read size, MIME type, image dimensions and SHA-256 digest from a file.
+
+    ``file`` is any Django ``File`` (an upload being saved or an opened
+    FieldFile). It is read once in chunks and rewound afterwards.
+    """
+    name = name or file.name or ''
+    sha256 = getattr(file, 'sha256', None)
+    if sha256:
+        # Already hashed by the upload handler
+        size = file.size
+    else:
+        sha256, size = file_digest(file)
+
+    mime_type = mimetypes.guess_type(name)[0] or getattr(file, 'content_type', None) or ''
+
+    width = height = None
+    if mime_type.startswith('image/') and mime_type != 'image/svg+xml':
+        try:
+            file.seek(0)
+            with Image.open(file) as image:
+                width, height = image.size
+        except Exception:
+            pass
+
+    file.seek(0)
+    return {
+        'size_bytes': size,
+        'mime_type': mime_type[:100],
+        'width': width,
+        'height': height,
+        'sha256': sha256,
+    }
+
+
+def file_digest(file):
+    """Return the SHA-256 hex digest and size of a file, read in chunks"""
+    digest = hashlib.sha256()
+    size = 0
+    for chunk in file.chunks():
+        digest.update(chunk)
+        size += len(chunk)
+    file.seek(0)
+    return digest.hexdigest(), size
+
+
+def upload_digest(upload):
+    """SHA-256 of an UploadedFile, reusing the digest computed while streaming"""
+    return getattr(upload, 'sha256', None) or file_digest(upload)[0]
+
+
+def format_file_size(size):
+    """Format a byte count in human readable form"""
+    for unit in ['bytes', 'KB', 'MB', 'GB']:
+        if size < 1024.0:
+            return f"{size:.1f} {unit}"
+        size /= 1024.0
+    return f"{size:.1f} TB"
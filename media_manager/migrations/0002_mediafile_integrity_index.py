@@ -0,0 +1,27 @@
+# Generated by Django 5.2.7 on 2026-10-16 23:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('media_manager', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='mediafile',
+            name='file_exists',
+            field=models.BooleanField(default=True),
+        ),
+        migrations.AddField(
+            model_name='mediafile',
+            name='last_verified_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='mediafile',
+            index=models.Index(fields=['file_exists', '-created_at'], name='media_exists_created_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.7 on 2026-10-16 23:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('media_manager', '0003_mediafile_metadata'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='mediafile',
+            name='renditions',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
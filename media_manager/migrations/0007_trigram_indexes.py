@@ -0,0 +1,51 @@
+# Generated by Django 5.2.7 on 2026-10-17 09:12
+
+import django.contrib.postgres.indexes
+from django.db import migrations
+
+# Media library search box (dashboard.search)
+TRIGRAM_INDEXES = [
+    django.contrib.postgres.indexes.GinIndex(fields=['file'], name='media_file_trgm', opclasses=['gin_trgm_ops']),
+    django.contrib.postgres.indexes.GinIndex(fields=['alt_text'], name='media_alt_text_trgm', opclasses=['gin_trgm_ops']),
+    django.contrib.postgres.indexes.GinIndex(fields=['description'], name='media_description_trgm', opclasses=['gin_trgm_ops']),
+]
+
+
+def create_trigram_indexes(apps, schema_editor):
+    # pg_trgm is PostgreSQL-only; other databases keep the icontains search
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    model = apps.get_model('media_manager', 'mediafile')
+    for index in TRIGRAM_INDEXES:
+        schema_editor.add_index(model, index, concurrently=True)
+
+
+def drop_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    model = apps.get_model('media_manager', 'mediafile')
+    for index in TRIGRAM_INDEXES:
+        schema_editor.remove_index(model, index, concurrently=True)
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY can't run inside a transaction
+    atomic = False
+
+    dependencies = [
+        ('media_manager', '0006_mediafile_processing_status'),
+        # Creates the pg_trgm extension
+        ('blog', '0010_trigram_indexes'),
+    ]
+
+    operations = [
+        migrations.SeparateDatabaseAndState(
+            state_operations=[
+                migrations.AddIndex(model_name='mediafile', index=index)
+                for index in TRIGRAM_INDEXES
+            ],
+            database_operations=[
+                migrations.RunPython(create_trigram_indexes, drop_trigram_indexes),
+            ],
+        ),
+    ]
@@ -1,31 +1,71 @@
+from django.conf import settings
 from django.db import models
+from django.contrib.postgres.indexes import GinIndex
 from django.contrib.auth import get_user_model
+from django.utils import timezone
 import os
+import uuid
 from django.utils.html import format_html
+from .metadata import extract_file_metadata, format_file_size
+from . import renditions as rendition_utils
 
 User = get_user_model()
 
+
+def detect_file_type(name):
+    """Map a file name to one of the MediaFile.MEDIA_TYPES keys"""
+    name = name.lower()
+    if name.endswith(('.jpg', '.jpeg', '.png', '.gif', '.webp', '.svg', '.bmp')):
+        return 'image'
+    elif name.endswith(('.mp4', '.mov', '.avi', '.mkv', '.wmv', '.flv')):
+        return 'video'
+    elif name.endswith(('.mp3', '.wav', '.ogg', '.m4a', '.flac')):
+        return 'audio'
+    elif name.endswith(('.pdf', '.docx', '.pptx', '.doc', '.txt', '.rtf')):
+        return 'document'
+    elif name.endswith(('.xlsx', '.xls', '.csv', '.ods')):
+        return 'spreadsheet'
+    return 'other'
+
+
 class MediaFileManager(models.Manager):
-    """Custom manager to exclude missing files automatically"""
+    """Custom manager to exclude missing files automatically.
+
+    File presence is read from the persisted ``file_exists`` flag, which is
+    maintained by the ``verify_media`` management command rather than by
+    touching storage on every query.
+    """
     
     def get_queryset(self):
-        queryset = super().get_queryset()
-        # Filter out records where files don't exist
-        existing_files = []
-        for obj in queryset:
-            if obj.file and obj.file.storage.exists(obj.file.name):
-                existing_files.append(obj.id)
-            else:
-                # Silently delete orphaned records
-                obj.delete()
-        return super().get_queryset().filter(id__in=existing_files)
+        return super().get_queryset().filter(file_exists=True)
     
     def all_including_missing(self):
         """Method to get all records including missing files (for admin cleanup)"""
         return super().get_queryset()
+    
+    def missing(self):
+        """Records whose file was not found during the last verification"""
+        return super().get_queryset().filter(file_exists=False)
+    
+    def find_by_digest(self, sha256):
+        """Existing file with identical content, if any"""
+        if not sha256:
+            return None
+        return self.get_queryset().filter(sha256=sha256).order_by('created_at').first()
 
 
 class MediaFile(models.Model):
+    PROCESSING_PENDING = 'pending'
+    PROCESSING_RUNNING = 'processing'
+    PROCESSING_READY = 'ready'
+    PROCESSING_FAILED = 'failed'
+    PROCESSING_STATUSES = [
+        (PROCESSING_PENDING, 'Pending'),
+        (PROCESSING_RUNNING, 'Processing'),
+        (PROCESSING_READY, 'Ready'),
+        (PROCESSING_FAILED, 'Failed'),
+    ]
+
     MEDIA_TYPES = [
         ('image', 'Image'),
         ('document', 'Document'),
@@ -42,12 +82,36 @@ class MediaFile(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    # File metadata, captured once when the file is uploaded
+    size_bytes = models.PositiveBigIntegerField(null=True, blank=True)
+    mime_type = models.CharField(max_length=100, blank=True)
+    width = models.PositiveIntegerField(null=True, blank=True)
+    height = models.PositiveIntegerField(null=True, blank=True)
+    sha256 = models.CharField(max_length=64, blank=True, db_index=True)
+    
+    # Manifest of generated thumbnails, see media_manager.renditions
+    renditions = models.JSONField(default=dict, blank=True)
+    
+    # Post-upload work done by media_manager.processing
+    processing_status = models.CharField(max_length=10, choices=PROCESSING_STATUSES, default=PROCESSING_READY)
+    processing_error = models.CharField(max_length=255, blank=True)
+    
+    # Integrity index, updated by the verify_media command
+    file_exists = models.BooleanField(default=True)
+    last_verified_at = models.DateTimeField(null=True, blank=True)
+    
     objects = MediaFileManager()
 
     class Meta:
         ordering = ['-created_at']
         verbose_name = 'Media File'
         verbose_name_plural = 'Media Library'
+        indexes = [
+            models.Index(fields=['file_exists', '-created_at'], name='media_exists_created_idx'),
+            GinIndex(fields=['file'], opclasses=['gin_trgm_ops'], name='media_file_trgm'),
+            GinIndex(fields=['alt_text'], opclasses=['gin_trgm_ops'], name='media_alt_text_trgm'),
+            GinIndex(fields=['description'], opclasses=['gin_trgm_ops'], name='media_description_trgm'),
+        ]
 
     def __str__(self):
         return os.path.basename(self.file.name) if self.file else 'File'
@@ -56,6 +120,11 @@ class MediaFile(models.Model):
         # Delete the file from storage
         if self.file and self.file.storage.exists(self.file.name):
             self.file.delete(save=False)
+        # Renditions are content-addressed; keep them while another copy uses them
+        if self.renditions and not MediaFile.objects.all_including_missing().filter(
+            sha256=self.sha256
+        ).exclude(pk=self.pk).exists():
+            rendition_utils.delete_renditions(self.renditions, self.file.storage)
         super().delete(*args, **kwargs)
 
     @property
@@ -63,19 +132,7 @@ class MediaFile(models.Model):
         """Auto-detect file type based on extension"""
         if not self.file:
             return 'other'
-        
-        name = self.file.name.lower()
-        if name.endswith(('.jpg', '.jpeg', '.png', '.gif', '.webp', '.svg', '.bmp')):
-            return 'image'
-        elif name.endswith(('.mp4', '.mov', '.avi', '.mkv', '.wmv', '.flv')):
-            return 'video'
-        elif name.endswith(('.mp3', '.wav', '.ogg', '.m4a', '.flac')):
-            return 'audio'
-        elif name.endswith(('.pdf', '.docx', '.pptx', '.doc', '.txt', '.rtf')):
-            return 'document'
-        elif name.endswith(('.xlsx', '.xls', '.csv', '.ods')):
-            return 'spreadsheet'
-        return 'other'
+        return detect_file_type(self.file.name)
 
     @property
     def file_size(self):
@@ -83,16 +140,22 @@ class MediaFile(models.Model):
         if not self.file:
             return "0 bytes"
         
+        if self.size_bytes is not None:
+            return format_file_size(self.size_bytes)
+        
+        # Legacy rows not yet backfilled fall back to a storage stat
         try:
-            size = self.file.size
-            for unit in ['bytes', 'KB', 'MB', 'GB']:
-                if size < 1024.0:
-                    return f"{size:.1f} {unit}"
-                size /= 1024.0
-            return f"{size:.1f} TB"
+            return format_file_size(self.file.size)
         except:
             return "Unknown size"
 
+    @property
+    def dimensions(self):
+        """Image dimensions as 'W × H', if known"""
+        if self.width and self.height:
+            return f"{self.width} × {self.height}"
+        return None
+
     @property
     def file_extension(self):
         """Get file extension"""
@@ -104,23 +167,149 @@ class MediaFile(models.Model):
         # Auto-set category based on file type if not already set
         if not self.category or self.category == 'other':
             self.category = self.file_type
+        # Capture metadata while the new upload is still in memory/temp storage,
+        # unless it has been left to the background processing pool
+        if self.file and not self.file._committed and self.processing_status == self.PROCESSING_READY:
+            self.populate_metadata()
+        # A freshly uploaded file is known to be on disk
+        if self._state.adding:
+            self.file_exists = True
+            self.last_verified_at = timezone.now()
         super().save(*args, **kwargs)
 
-    def get_thumbnail_url(self):
-        """Return thumbnail URL for images"""
-        if self.file_type == 'image':
+    def populate_metadata(self):
+        """Fill size, MIME type, dimensions and digest from the file"""
+        if self.file._committed:
+            with self.file.open('rb') as fh:
+                metadata = extract_file_metadata(fh, self.file.name)
+        else:
+            metadata = extract_file_metadata(self.file.file, self.file.name)
+        for field, value in metadata.items():
+            setattr(self, field, value)
+
+    @property
+    def has_renditions(self):
+        return self.file_type == 'image' and rendition_utils.can_render(self.file.name)
+
+    def build_renditions(self, save=True):
+        """Generate thumbnails and WebP variants for an image file"""
+        if not self.has_renditions:
+            return {}
+        if not self.sha256:
+            self.populate_metadata()
+        with self.file.open('rb') as fh:
+            self.renditions = rendition_utils.generate_renditions(fh, self.sha256, self.file.storage)
+        if save and self.pk:
+            MediaFile.objects.all_including_missing().filter(pk=self.pk).update(
+                renditions=self.renditions, sha256=self.sha256
+            )
+        return self.renditions
+
+    @property
+    def is_processed(self):
+        return self.processing_status == self.PROCESSING_READY
+
+    def ensure_renditions(self):
+        """Build renditions on first use; falls back to none if the image can't be read"""
+        if not self.renditions and self.has_renditions and self.is_processed:
+            try:
+                self.build_renditions()
+            except (OSError, ValueError):
+                return {}
+        return self.renditions
+
+    def get_thumbnail_url(self, size=400):
+        """Return the URL of the smallest rendition at least ``size`` pixels wide"""
+        if self.file_type != 'image':
+            return None
+        picked = rendition_utils.pick_rendition(self.ensure_renditions(), size)
+        if picked is None:
             return self.file.url
-        return None
+        _, rendition = picked
+        return self.file.storage.url(rendition['webp'])
+
+    def get_srcset(self, fmt='fallback'):
+        """``srcset`` value listing every rendition of the image"""
+        return rendition_utils.srcset(self.ensure_renditions(), self.file.storage, fmt)
 
     def get_preview_html(self):
         """Get HTML preview for admin"""
         if self.file_type == 'image':
             return format_html(
                 '<img src="{}" style="max-width: 100px; max-height: 100px; object-fit: cover;" />',
-                self.file.url
+                self.get_thumbnail_url(150)
             )
         else:
             return format_html(
                 '<div style="width: 100px; height: 100px; background: #f0f0f0; display: flex; align-items: center; justify-content: center; font-size: 24px;">{}</div>',
                 self.file_extension or '📄'
-            )
\ No newline at end of file
+            )
+
+class UploadSession(models.Model):
+    """A resumable, chunked upload staged on disk until it is finalized"""
+    STATUS_CHOICES = [
+        ('active', 'Active'),
+        ('complete', 'Complete'),
+        ('failed', 'Failed'),
+    ]
+    
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='upload_sessions')
+    filename = models.CharField(max_length=255)
+    total_size = models.PositiveBigIntegerField()
+    received_bytes = models.PositiveBigIntegerField(default=0)
+    sha256 = models.CharField(max_length=64, blank=True, help_text="Expected checksum sent by the client")
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='active')
+    media_file = models.ForeignKey(MediaFile, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f'{self.filename} ({self.received_bytes}/{self.total_size})'
+
+    @property
+    def staging_path(self):
+        return os.path.join(settings.MEDIA_UPLOAD_STAGING_DIR, str(self.id))
+
+    @property
+    def is_complete(self):
+        return self.received_bytes >= self.total_size
+
+    def append_chunk(self, stream, length, block_size=64 * 1024):
+        """
+        Append ``length`` bytes read from ``stream`` to the staging file.
+
+        Data is copied in fixed-size blocks so memory use does not depend on
+        the chunk size. Returns the new offset.
+
+        Raises ValueError if the staging file holds fewer bytes than were
+        acknowledged (it was removed or cut short); the offset is moved back
+        to what is actually staged so the client can resume from there.
+        """
+        os.makedirs(settings.MEDIA_UPLOAD_STAGING_DIR, exist_ok=True)
+        written = 0
+        with open(self.staging_path, 'ab') as fh:
+            staged = fh.seek(0, os.SEEK_END)
+            if staged < self.received_bytes:
+                self.received_bytes = staged
+                self.save(update_fields=['received_bytes', 'updated_at'])
+                raise ValueError('Staged data is missing; resume from the returned offset')
+            # Drop bytes from an earlier attempt that were never acknowledged
+            fh.truncate(self.received_bytes)
+            while written < length:
+                block = stream.read(min(block_size, length - written))
+                if not block:
+                    break
+                fh.write(block)
+                written += len(block)
+        
+        self.received_bytes += written
+        self.save(update_fields=['received_bytes', 'updated_at'])
+        return self.received_bytes
+
+    def discard(self):
+        if os.path.exists(self.staging_path):
+            os.remove(self.staging_path)
@@ -0,0 +1,144 @@
+import hashlib
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import close_old_connections, connection, transaction
+
+from . import renditions as rendition_utils
+from .models import MediaFile
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    """Process-wide pool, created on first use and sized by MEDIA_PROCESSING_WORKERS"""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=settings.MEDIA_PROCESSING_WORKERS,
+                thread_name_prefix='media-processing',
+            )
+    return _executor
+
+
+def _submit(function, *args_list):
+    """
+    Run ``function(*args)`` for each tuple in ``args_list`` on the pool once
+    the surrounding transaction commits, or inline without workers.
+    """
+    if not settings.MEDIA_PROCESSING_WORKERS:
+        for args in args_list:
+            function(*args)
+        return
+
+    def submit():
+        executor = get_executor()
+        for args in args_list:
+            executor.submit(_run_in_worker, function, *args)
+
+    transaction.on_commit(submit)
+
+
+def schedule_processing(media_ids):
+    """
+    Queue metadata extraction and rendition generation for new uploads.
+
+    Work is submitted once the surrounding transaction commits so workers
+    never see uncommitted rows. With MEDIA_PROCESSING_WORKERS = 0 the files
+    are processed inline instead.
+    """
+    media_ids = list(media_ids)
+    if media_ids:
+        _submit(process_media_file, *((media_id,) for media_id in media_ids))
+
+
+def _run_in_worker(function, *args):
+    close_old_connections()
+    try:
+        function(*args)
+    finally:
+        # Worker threads own their connection; don't leak it between jobs
+        connection.close()
+
+
+def process_media_file(media_id):
+    """Extract metadata and build renditions for one MediaFile, recording the outcome"""
+    queryset = MediaFile.objects.all_including_missing().filter(pk=media_id)
+    media_file = queryset.first()
+    if media_file is None or media_file.processing_status == MediaFile.PROCESSING_READY:
+        return
+
+    queryset.update(processing_status=MediaFile.PROCESSING_RUNNING)
+    try:
+        media_file.populate_metadata()
+        media_file.build_renditions(save=False)
+    except Exception as e:
+        logger.exception("Processing failed for media file %s", media_id)
+        queryset.update(processing_status=MediaFile.PROCESSING_FAILED, processing_error=str(e)[:255])
+        return
+
+    queryset.update(
+        size_bytes=media_file.size_bytes,
+        mime_type=media_file.mime_type,
+        width=media_file.width,
+        height=media_file.height,
+        sha256=media_file.sha256,
+        renditions=media_file.renditions,
+        processing_status=MediaFile.PROCESSING_READY,
+        processing_error='',
+    )
+    _cache_field_manifest(media_file.file.name, media_file.renditions)
+
+
+def find_field_renditions(fieldfile):
+    """
+    Manifest of an image field's file on a cache miss, for
+    ``renditions.field_renditions``: the file is queued for
+    ``build_field_renditions`` at most once per PENDING_MANIFEST_TIMEOUT,
+    and an empty manifest is returned until that has run.
+    """
+    key = rendition_utils.field_manifest_key(fieldfile.name)
+    if cache.add(key, {}, rendition_utils.PENDING_MANIFEST_TIMEOUT):
+        _submit(build_field_renditions, (fieldfile.storage, fieldfile.name))
+    # Inline processing has finished already
+    return cache.get(key) or {}
+
+
+def build_field_renditions(storage, name):
+    """
+    Cache the rendition manifest of a file shown through an image field.
+
+    Images picked from the media library share their file with a MediaFile,
+    whose stored manifest is used (and built if it is missing); other files
+    are hashed and rendered here.
+    """
+    media_file = MediaFile.objects.all_including_missing().filter(file=name).first()
+    try:
+        if media_file is None:
+            with storage.open(name, 'rb') as fh:
+                digest = hashlib.sha256()
+                for chunk in fh.chunks():
+                    digest.update(chunk)
+                fh.seek(0)
+                manifest = rendition_utils.generate_renditions(fh, digest.hexdigest(), storage)
+        elif not media_file.is_processed:
+            # Cached with the rest of its processing
+            return
+        else:
+            manifest = media_file.renditions or media_file.build_renditions()
+    except (OSError, ValueError):
+        logger.warning("Renditions failed for %s", name, exc_info=True)
+        _cache_field_manifest(name, {}, rendition_utils.FAILED_MANIFEST_TIMEOUT)
+        return
+    _cache_field_manifest(name, manifest)
+
+
+def _cache_field_manifest(name, manifest, timeout=rendition_utils.FIELD_MANIFEST_TIMEOUT):
+    cache.set(rendition_utils.field_manifest_key(name), manifest, timeout)
@@ -0,0 +1,174 @@
+import hashlib
+from io import BytesIO
+
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.utils.html import format_html
+from PIL import Image, ImageOps
+
+# Widths generated for every image; never upscaled past the original
+RENDITION_WIDTHS = (150, 400, 800, 1600)
+RENDITIONS_DIR = 'renditions'
+
+# Formats Pillow cannot meaningfully resize (vector) or would flatten (animation)
+SKIPPED_EXTENSIONS = ('.svg', '.gif')
+
+WEBP_QUALITY = 80
+JPEG_QUALITY = 85
+
+# How long an unreadable image is remembered before it is retried
+FAILED_MANIFEST_TIMEOUT = 60 * 60
+
+# How long an image field's manifest is cached; a changed file shows after this
+FIELD_MANIFEST_TIMEOUT = 60 * 60
+
+# How long renditions queued for an image field are waited for before being queued again
+PENDING_MANIFEST_TIMEOUT = 5 * 60
+
+
+def can_render(name):
+    return not name.lower().endswith(SKIPPED_EXTENSIONS)
+
+
+def rendition_name(key, width, ext):
+    """Content-addressed storage path for one rendition"""
+    return f"{RENDITIONS_DIR}/{key[:2]}/{key}/{width}.{ext}"
+
+
+def _encode(image, fmt):
+    buffer = BytesIO()
+    if fmt == 'webp':
+        image.save(buffer, 'WEBP', quality=WEBP_QUALITY, method=4)
+    elif fmt == 'png':
+        image.save(buffer, 'PNG', optimize=True)
+    else:
+        image.convert('RGB').save(buffer, 'JPEG', quality=JPEG_QUALITY, optimize=True, progressive=True)
+    return ContentFile(buffer.getvalue())
+
+
+def generate_renditions(source, key, storage, widths=RENDITION_WIDTHS):
+    """
+    Build resized copies of an image plus WebP variants.
+
+    ``source`` is an open file object and ``key`` a content digest used to
+    address the output, so identical images share renditions and existing
+    files are never rebuilt. Returns a manifest::
+
+        {'width': 1920, 'height': 1080,
+         'renditions': {'400': {'height': 225, 'fallback': '...jpg', 'webp': '...webp'}}}
+    """
+    with Image.open(source) as original:
+        original = ImageOps.exif_transpose(original)
+        src_width, src_height = original.size
+        has_alpha = original.mode in ('RGBA', 'LA') or (
+            original.mode == 'P' and 'transparency' in original.info
+        )
+        fallback_ext = 'png' if has_alpha else 'jpg'
+
+        targets = sorted({min(width, src_width) for width in widths})
+        renditions = {}
+        for width in targets:
+            height = max(1, round(src_height * width / src_width))
+            names = {
+                'fallback': rendition_name(key, width, fallback_ext),
+                'webp': rendition_name(key, width, 'webp'),
+            }
+            resized = None
+            for fmt, name in names.items():
+                if storage.exists(name):
+                    continue
+                if resized is None:
+                    resized = original if width == src_width else original.resize((width, height), Image.LANCZOS)
+                    if resized.mode not in ('RGB', 'RGBA'):
+                        resized = resized.convert('RGBA' if has_alpha else 'RGB')
+                storage.save(name, _encode(resized, fallback_ext if fmt == 'fallback' else 'webp'))
+            renditions[str(width)] = {'height': height, **names}
+
+    return {'width': src_width, 'height': src_height, 'renditions': renditions}
+
+
+def field_manifest_key(name):
+    return 'renditions:' + hashlib.md5(name.encode()).hexdigest()
+
+
+def field_renditions(fieldfile):
+    """
+    Rendition manifest for any FileField/ImageField value.
+
+    Manifests are cached under the file name for FIELD_MANIFEST_TIMEOUT
+    seconds. A miss queues the file on the media processing pool instead of
+    rendering during the request, and the original image is shown until its
+    renditions exist. Library images reuse their MediaFile's stored manifest.
+    """
+    if not fieldfile or not can_render(fieldfile.name):
+        return {}
+
+    manifest = cache.get(field_manifest_key(fieldfile.name))
+    if manifest is None:
+        # Imported here: processing imports the models, which import this module
+        from .processing import find_field_renditions
+        manifest = find_field_renditions(fieldfile)
+    return manifest
+
+
+def pick_rendition(manifest, size):
+    """Return the smallest rendition at least ``size`` wide, or the largest one"""
+    renditions = manifest.get('renditions') or {}
+    if not renditions:
+        return None
+    widths = sorted(int(width) for width in renditions)
+    chosen = next((width for width in widths if width >= size), widths[-1])
+    return chosen, renditions[str(chosen)]
+
+
+def srcset(manifest, storage, fmt='fallback'):
+    """Build a ``srcset`` attribute value from a manifest"""
+    renditions = manifest.get('renditions') or {}
+    return ', '.join(
+        f"{storage.url(renditions[str(width)][fmt])} {width}w"
+        for width in sorted(int(width) for width in renditions)
+    )
+
+
+def delete_renditions(manifest, storage):
+    for rendition in (manifest.get('renditions') or {}).values():
+        for fmt in ('fallback', 'webp'):
+            name = rendition.get(fmt)
+            if name and storage.exists(name):
+                storage.delete(name)
+
+
+def default_sizes(width=None):
+    """A ``sizes`` value for an image rendered at most ``width`` CSS pixels wide"""
+    if width:
+        return f"(max-width: {width}px) 100vw, {width}px"
+    return '100vw'
+
+
+def render_picture(manifest, storage, fallback_url, alt='', sizes=None, css_class='', size=800, loading='lazy'):
+    """
+    Render a ``<picture>`` element with a WebP source and a sized ``<img>``.
+
+    ``size`` picks the rendition used for ``src``; browsers pick from
+    ``srcset`` using ``sizes``. Intrinsic width/height are emitted so the
+    layout does not shift while the image loads. Without renditions a plain
+    ``<img>`` pointing at ``fallback_url`` is returned.
+    """
+    picked = pick_rendition(manifest, size)
+    if picked is None:
+        return format_html(
+            '<img src="{}" alt="{}" class="{}" loading="{}" decoding="async">',
+            fallback_url, alt, css_class, loading,
+        )
+
+    width, rendition = picked
+    sizes = sizes or default_sizes(width)
+    return format_html(
+        '<picture style="display: contents">'
+        '<source type="image/webp" srcset="{}" sizes="{}">'
+        '<img src="{}" srcset="{}" sizes="{}" width="{}" height="{}" alt="{}" class="{}" loading="{}" decoding="async">'
+        '</picture>',
+        srcset(manifest, storage, 'webp'), sizes,
+        storage.url(rendition['fallback']), srcset(manifest, storage), sizes,
+        width, rendition['height'], alt, css_class, loading,
+    )
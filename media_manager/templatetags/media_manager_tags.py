@@ -0,0 +1,31 @@
+from django import template
+from media_manager.renditions import render_picture
+
+register = template.Library()
+
+
+@register.simple_tag
+def media_thumbnail(media, size=400):
+    """URL of a MediaFile rendition at least ``size`` pixels wide"""
+    return media.get_thumbnail_url(size) or ''
+
+
+@register.simple_tag
+def media_srcset(media, fmt='fallback'):
+    """``srcset`` value for a MediaFile image"""
+    return media.get_srcset(fmt)
+
+
+@register.simple_tag
+def media_picture(media, size=800, sizes=None, alt=None, css_class='', loading='lazy'):
+    """Responsive ``<picture>`` element for a MediaFile image"""
+    return render_picture(
+        media.ensure_renditions(),
+        media.file.storage,
+        media.file.url,
+        alt=media.alt_text if alt is None else alt,
+        sizes=sizes,
+        css_class=css_class,
+        size=size,
+        loading=loading,
+    )
@@ -1,3 +1,454 @@
-from django.test import TestCase
+import hashlib
+import io
+import json
+import os
+import shutil
+import tempfile
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.files.storage import FileSystemStorage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+
+from .models import MediaFile, UploadSession
+from . import processing, renditions
+from .metadata import extract_file_metadata
+from .utils import finalize_upload_session, iter_media_paths, path_sort_key
+
+MEDIA_ROOT = tempfile.mkdtemp()
+STAGING_DIR = os.path.join(MEDIA_ROOT, 'staging')
+
+
+def tearDownModule():
+    shutil.rmtree(MEDIA_ROOT, ignore_errors=True)
+
+
+def png_bytes(color='teal', size=(40, 30)):
+    buffer = io.BytesIO()
+    Image.new('RGB', size, color).save(buffer, 'PNG')
+    return buffer.getvalue()
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT, MEDIA_UPLOAD_STAGING_DIR=STAGING_DIR, MEDIA_PROCESSING_WORKERS=0)
+class UploadSessionTests(TestCase):
+    """Chunks are staged on disk and turned into one MediaFile per distinct content"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('uploader')
+
+    def receive(self, data, sha256=''):
+        session = UploadSession.objects.create(
+            user=self.user, filename='photo.png', total_size=len(data), sha256=sha256,
+        )
+        middle = len(data) // 2
+        session.append_chunk(io.BytesIO(data[:middle]), middle)
+        session.append_chunk(io.BytesIO(data[middle:]), len(data) - middle)
+        return session
+
+    def test_finalize_stores_file_and_digest(self):
+        data = png_bytes()
+        session = self.receive(data, sha256=hashlib.sha256(data).hexdigest().upper())
+        media = finalize_upload_session(session)
+
+        self.assertEqual(media.sha256, hashlib.sha256(data).hexdigest())
+        self.assertEqual(media.size_bytes, len(data))
+        self.assertEqual(media.processing_status, MediaFile.PROCESSING_PENDING)
+        with media.file.open('rb') as fh:
+            self.assertEqual(fh.read(), data)
+        session.refresh_from_db()
+        self.assertEqual((session.status, session.media_file), ('complete', media))
+        self.assertFalse(os.path.exists(session.staging_path))
+
+    def test_finalize_reuses_identical_file(self):
+        data = png_bytes('navy')
+        first = finalize_upload_session(self.receive(data))
+        second = finalize_upload_session(self.receive(data))
+        self.assertEqual(first, second)
+        self.assertEqual(MediaFile.objects.filter(sha256=first.sha256).count(), 1)
+
+    def test_finalize_rejects_checksum_mismatch(self):
+        session = self.receive(png_bytes(), sha256='0' * 64)
+        with self.assertRaisesMessage(ValueError, 'Checksum mismatch'):
+            finalize_upload_session(session)
+        self.assertEqual(session.status, 'active')
+        self.assertFalse(MediaFile.objects.exists())
+
+    def test_finalize_rejects_incomplete_upload(self):
+        data = png_bytes()
+        session = UploadSession.objects.create(user=self.user, filename='photo.png', total_size=len(data))
+        session.append_chunk(io.BytesIO(data), 10)
+        with self.assertRaisesMessage(ValueError, 'incomplete'):
+            finalize_upload_session(session)
+
+    def test_retried_chunk_replaces_unacknowledged_bytes(self):
+        session = UploadSession.objects.create(user=self.user, filename='notes.txt', total_size=6)
+        session.append_chunk(io.BytesIO(b'abc'), 3)
+        # A retry after a dropped connection left extra bytes behind
+        with open(session.staging_path, 'ab') as fh:
+            fh.write(b'zz')
+        session.append_chunk(io.BytesIO(b'def'), 3)
+        with open(session.staging_path, 'rb') as fh:
+            self.assertEqual(fh.read(), b'abcdef')
+
+    def test_lost_staging_file_rewinds_offset(self):
+        session = UploadSession.objects.create(user=self.user, filename='notes.txt', total_size=9)
+        session.append_chunk(io.BytesIO(b'abcdef'), 6)
+        with open(session.staging_path, 'r+b') as fh:
+            fh.truncate(2)
+        with self.assertRaises(ValueError):
+            session.append_chunk(io.BytesIO(b'ghi'), 3)
+        session.refresh_from_db()
+        self.assertEqual(session.received_bytes, 2)
+        with open(session.staging_path, 'rb') as fh:
+            self.assertEqual(fh.read(), b'ab')
+
+        session.discard()
+        with self.assertRaises(ValueError):
+            session.append_chunk(io.BytesIO(b'cdefghi'), 7)
+        self.assertEqual(session.received_bytes, 0)
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT, MEDIA_PROCESSING_WORKERS=0)
+class IntegrityIndexTests(TestCase):
+    """File presence is read from the stored flag that verify_media keeps up to date"""
+
+    def setUp(self):
+        self.kept = MediaFile.objects.create(file=SimpleUploadedFile('kept.txt', b'kept'))
+        self.lost = MediaFile.objects.create(file=SimpleUploadedFile('lost.txt', b'lost'))
+        os.remove(self.lost.file.path)
+
+    def verify(self, *args):
+        out = io.StringIO()
+        call_command('verify_media', *args, stdout=out)
+        return out.getvalue()
+
+    def test_default_manager_does_not_touch_storage(self):
+        with mock.patch.object(FileSystemStorage, 'exists') as exists:
+            self.assertEqual(set(MediaFile.objects.all()), {self.kept, self.lost})
+        exists.assert_not_called()
+
+    def test_verify_marks_missing_and_restored_files(self):
+        output = self.verify('--batch-size', '1')
+        self.assertIn('Checked 2 file(s), 1 missing.', output)
+        self.assertEqual(list(MediaFile.objects.all()), [self.kept])
+        self.assertEqual(list(MediaFile.objects.missing()), [self.lost])
+        self.assertEqual(MediaFile.objects.all_including_missing().filter(last_verified_at__isnull=True).count(), 0)
+
+        with open(self.lost.file.path, 'wb') as fh:
+            fh.write(b'back')
+        self.verify()
+        self.assertFalse(MediaFile.objects.missing().exists())
+
+    def test_purge_deletes_missing_records(self):
+        self.verify('--purge')
+        self.assertEqual(list(MediaFile.objects.all_including_missing()), [self.kept])
+
+
+class ReconcileMediaTests(TestCase):
+    """reconcile_media imports new files and flags missing ones, resuming from a checkpoint"""
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp(dir=MEDIA_ROOT)
+        settings_override = override_settings(MEDIA_ROOT=self.root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        for path in ('b.txt', 'a/z.txt', 'a/b/c.txt', 'c.txt', '.hidden', 'renditions/ab/x.webp', 'a/renditions/y.txt'):
+            self.write(path)
+
+    def write(self, relative_path):
+        path = os.path.join(self.root, relative_path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w') as fh:
+            fh.write(relative_path)
+
+    def reconcile(self, *args):
+        out = io.StringIO()
+        call_command('reconcile_media', *args, stdout=out)
+        return out.getvalue()
+
+    def test_traversal_order_matches_sort_key(self):
+        paths = list(iter_media_paths(self.root))
+        self.assertEqual(paths, ['b.txt', 'c.txt', 'a/z.txt', 'a/b/c.txt', 'a/renditions/y.txt'])
+        self.assertEqual(sorted(paths, key=path_sort_key), paths)
+
+    def test_imports_and_flags_files(self):
+        self.reconcile('--batch-size', '2')
+        names = set(MediaFile.objects.values_list('file', flat=True))
+        self.assertEqual(names, {'b.txt', 'c.txt', 'a/z.txt', 'a/b/c.txt', 'a/renditions/y.txt'})
+        self.assertEqual(MediaFile.objects.get(file='b.txt').category, 'document')
+        self.assertFalse(os.path.exists(os.path.join(self.root, '.reconcile_checkpoint.json')))
+
+        os.remove(os.path.join(self.root, 'b.txt'))
+        self.write('new.txt')
+        output = self.reconcile()
+        self.assertIn('Imported 1 new file(s)', output)
+        self.assertIn('Marked 1 record(s) missing, 0 restored', output)
+        self.assertEqual(list(MediaFile.objects.missing().values_list('file', flat=True)), ['b.txt'])
+
+        self.write('b.txt')
+        self.assertIn('Marked 0 record(s) missing, 1 restored', self.reconcile())
+        self.assertEqual(MediaFile.objects.all_including_missing().count(), 6)
+
+    def test_resumes_after_checkpoint(self):
+        with open(os.path.join(self.root, '.reconcile_checkpoint.json'), 'w') as fh:
+            json.dump({'last_path': 'a/z.txt'}, fh)
+        output = self.reconcile('--skip-orphans')
+        self.assertIn('Resuming after a/z.txt', output)
+        self.assertEqual(
+            sorted(MediaFile.objects.values_list('file', flat=True)), ['a/b/c.txt', 'a/renditions/y.txt'],
+        )
+        self.reconcile('--restart')
+        self.assertEqual(MediaFile.objects.count(), 5)
+
+    def test_skip_import(self):
+        MediaFile.objects.create(file='gone.txt')
+        self.reconcile('--skip-import')
+        self.assertEqual(list(MediaFile.objects.missing().values_list('file', flat=True)), ['gone.txt'])
+        self.assertFalse(MediaFile.objects.exists())
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT, MEDIA_PROCESSING_WORKERS=0)
+class MetadataTests(TestCase):
+    """Size, MIME type, dimensions and digest are read once, when the file is saved"""
+
+    def test_extract_from_image(self):
+        data = png_bytes(size=(64, 48))
+        upload = SimpleUploadedFile('photo.png', data)
+        metadata = extract_file_metadata(upload)
+        self.assertEqual(metadata, {
+            'size_bytes': len(data), 'mime_type': 'image/png', 'width': 64, 'height': 48,
+            'sha256': hashlib.sha256(data).hexdigest(),
+        })
+        self.assertEqual(upload.tell(), 0)
+
+    def test_extract_from_other_files(self):
+        metadata = extract_file_metadata(SimpleUploadedFile('notes.txt', b'plain words'))
+        self.assertEqual((metadata['mime_type'], metadata['width'], metadata['size_bytes']), ('text/plain', None, 11))
+        # Not an image despite the name
+        metadata = extract_file_metadata(SimpleUploadedFile('broken.png', b'not a png'))
+        self.assertEqual((metadata['width'], metadata['height']), (None, None))
+
+    def test_saved_on_upload_and_read_without_storage(self):
+        media = MediaFile.objects.create(file=SimpleUploadedFile('photo.png', png_bytes(size=(64, 48))))
+        media = MediaFile.objects.get(pk=media.pk)
+        self.assertEqual((media.category, media.mime_type, media.dimensions), ('image', 'image/png', '64 × 48'))
+        with mock.patch.object(FileSystemStorage, 'size') as size:
+            self.assertTrue(media.file_size.endswith('bytes'))
+        size.assert_not_called()
+
+    def test_backfill_command(self):
+        media = MediaFile.objects.create(file=SimpleUploadedFile('photo.png', png_bytes(size=(64, 48))))
+        MediaFile.objects.filter(pk=media.pk).update(sha256='', size_bytes=None, width=None, height=None, mime_type='')
+        call_command('backfill_media_metadata', stdout=io.StringIO())
+        media.refresh_from_db()
+        self.assertEqual((media.width, media.height, media.mime_type), (64, 48, 'image/png'))
+        self.assertEqual(len(media.sha256), 64)
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT, MEDIA_PROCESSING_WORKERS=0)
+class RenditionTests(TestCase):
+    """Resized JPEG/PNG and WebP copies, addressed by content and never upscaled"""
+
+    def setUp(self):
+        self.storage = FileSystemStorage(location=MEDIA_ROOT)
+
+    def generate(self, data, key):
+        return renditions.generate_renditions(io.BytesIO(data), key, self.storage)
+
+    def test_widths_capped_at_original(self):
+        manifest = self.generate(png_bytes(size=(1000, 500)), 'a' * 64)
+        self.assertEqual((manifest['width'], manifest['height']), (1000, 500))
+        self.assertEqual(sorted(manifest['renditions'], key=int), ['150', '400', '800', '1000'])
+        rendition = manifest['renditions']['400']
+        self.assertEqual(rendition['height'], 200)
+        self.assertTrue(rendition['fallback'].endswith('/400.jpg'))
+        with Image.open(self.storage.path(rendition['webp'])) as image:
+            self.assertEqual((image.format, image.size), ('WEBP', (400, 200)))
+
+    def test_transparent_images_keep_png_fallback(self):
+        buffer = io.BytesIO()
+        Image.new('RGBA', (200, 100), (0, 0, 0, 0)).save(buffer, 'PNG')
+        manifest = self.generate(buffer.getvalue(), 'b' * 64)
+        self.assertTrue(manifest['renditions']['150']['fallback'].endswith('.png'))
+
+    def test_existing_renditions_are_not_rebuilt(self):
+        data = png_bytes(size=(300, 200))
+        first = self.generate(data, 'c' * 64)
+        with mock.patch.object(self.storage, 'save') as save:
+            self.assertEqual(self.generate(data, 'c' * 64), first)
+        save.assert_not_called()
+
+    def test_pick_and_srcset(self):
+        manifest = self.generate(png_bytes(size=(1000, 500)), 'd' * 64)
+        self.assertEqual(renditions.pick_rendition(manifest, 300)[0], 400)
+        self.assertEqual(renditions.pick_rendition(manifest, 5000)[0], 1000)
+        self.assertIsNone(renditions.pick_rendition({}, 300))
+        srcset = renditions.srcset(manifest, self.storage, 'webp')
+        self.assertEqual([part.split()[-1] for part in srcset.split(', ')], ['150w', '400w', '800w', '1000w'])
+
+    def test_media_file_thumbnail_and_shared_cleanup(self):
+        data = png_bytes(size=(500, 250))
+        first = MediaFile.objects.create(file=SimpleUploadedFile('one.png', data))
+        second = MediaFile.objects.create(file=SimpleUploadedFile('two.png', data))
+        self.assertTrue(first.get_thumbnail_url(150).endswith('/150.webp'))
+        second.ensure_renditions()
+        self.assertEqual(second.renditions, MediaFile.objects.get(pk=first.pk).renditions)
+        webp = self.storage.path(first.renditions['renditions']['150']['webp'])
+
+        # Identical content shares renditions, which outlive all but the last copy
+        first.delete()
+        self.assertTrue(os.path.exists(webp))
+        MediaFile.objects.get(pk=second.pk).delete()
+        self.assertFalse(os.path.exists(webp))
+
+    def test_vector_and_animated_images_are_skipped(self):
+        media = MediaFile.objects.create(file=SimpleUploadedFile('logo.svg', b'<svg/>'))
+        self.assertEqual(media.build_renditions(), {})
+        self.assertEqual(media.get_thumbnail_url(), media.file.url)
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT, MEDIA_PROCESSING_WORKERS=0)
+class UploadDedupeTests(TestCase):
+    """Uploads are hashed as they stream in and identical content is stored once"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('deduper')
+
+    def setUp(self):
+        self.client.force_login(self.user)
+        self.data = png_bytes('olive')
+
+    def add_media(self, *names):
+        return self.client.post(
+            reverse('add_media'),
+            {'files': [SimpleUploadedFile(name, self.data, content_type='image/png') for name in names]},
+            headers={'X-Requested-With': 'XMLHttpRequest'},
+        ).json()
+
+    def test_identical_uploads_reuse_library_file(self):
+        first = self.add_media('one.png', 'copy.png')
+        self.assertEqual(first['message'], 'Successfully uploaded 2 file(s) (1 already in the library)')
+        self.assertEqual(first['files'][0]['id'], first['files'][1]['id'])
+
+        second = self.add_media('again.png')
+        self.assertEqual(second['files'][0]['id'], first['files'][0]['id'])
+        media = MediaFile.objects.get()
+        self.assertEqual(media.sha256, hashlib.sha256(self.data).hexdigest())
+
+    def test_handlers_hash_both_memory_and_temporary_uploads(self):
+        for limit in (10 * 1024 * 1024, 0):
+            with self.subTest(memory_limit=limit), override_settings(FILE_UPLOAD_MAX_MEMORY_SIZE=limit):
+                MediaFile.objects.all_including_missing().delete()
+                self.add_media('photo.png')
+                self.assertEqual(MediaFile.objects.get().sha256, hashlib.sha256(self.data).hexdigest())
+
+    def test_tinymce_upload_is_content_addressed(self):
+        def upload(name):
+            return self.client.post('/tinymce/upload/', {'file': SimpleUploadedFile(name, self.data)}).json()['location']
+
+        location = upload('inline.png')
+        self.assertIn(f'/tinymce/{hashlib.sha256(self.data).hexdigest()[:12]}-inline', location)
+        self.assertEqual(upload('inline.png'), location)
+
+        media = self.add_media('library.png')['files'][0]
+        self.assertEqual(upload('other.png'), media['url'])
+
+    def test_report_duplicates(self):
+        for name in ('a.png', 'b.png'):
+            MediaFile.objects.create(file=SimpleUploadedFile(name, self.data))
+        out = io.StringIO()
+        call_command('report_duplicate_media', stdout=out)
+        self.assertIn('1 duplicate group(s), 1 redundant file(s)', out.getvalue())
+        self.assertIn('2 copies', out.getvalue())
+
+
+@override_settings(MEDIA_ROOT=MEDIA_ROOT, MEDIA_PROCESSING_WORKERS=0)
+class ProcessingTests(TestCase):
+    """New uploads move from pending through processing to ready or failed"""
+
+    def pending(self, name='queued.png'):
+        return MediaFile.objects.create(
+            file=SimpleUploadedFile(name, png_bytes('navy')),
+            processing_status=MediaFile.PROCESSING_PENDING,
+        )
+
+    def status(self, media):
+        media.refresh_from_db()
+        return media.processing_status
+
+    def test_pending_upload_is_not_processed_on_save(self):
+        media = self.pending()
+        self.assertEqual(media.sha256, '')
+        self.assertFalse(media.is_processed)
+
+    def test_processing_marks_running_then_ready(self):
+        media = self.pending()
+        seen = []
+        populate = MediaFile.populate_metadata
+
+        def observe(instance):
+            seen.append(self.status(media))
+            populate(instance)
+
+        with mock.patch.object(MediaFile, 'populate_metadata', observe):
+            processing.process_media_file(media.pk)
+        self.assertEqual(seen, [MediaFile.PROCESSING_RUNNING])
+        self.assertEqual(self.status(media), MediaFile.PROCESSING_READY)
+        self.assertEqual((media.width, media.height), (40, 30))
+        self.assertEqual(media.sha256, hashlib.sha256(png_bytes('navy')).hexdigest())
+        self.assertTrue(media.renditions)
+
+    def test_failure_is_recorded(self):
+        media = self.pending()
+        with mock.patch.object(MediaFile, 'build_renditions', side_effect=OSError('disk full')), \
+                self.assertLogs('media_manager.processing', 'ERROR'):
+            processing.process_media_file(media.pk)
+        self.assertEqual(self.status(media), MediaFile.PROCESSING_FAILED)
+        self.assertEqual(media.processing_error, 'disk full')
+
+    def test_ready_files_are_left_alone(self):
+        media = MediaFile.objects.create(file=SimpleUploadedFile('done.png', png_bytes()))
+        with mock.patch.object(MediaFile, 'populate_metadata') as populate:
+            processing.process_media_file(media.pk)
+        populate.assert_not_called()
+
+    def test_without_workers_processing_is_inline(self):
+        media = self.pending()
+        with mock.patch.object(processing, 'get_executor') as get_executor:
+            processing.schedule_processing([media.pk])
+        get_executor.assert_not_called()
+        self.assertEqual(self.status(media), MediaFile.PROCESSING_READY)
+
+    @override_settings(MEDIA_PROCESSING_WORKERS=2)
+    def test_workers_receive_jobs_after_commit(self):
+        media = self.pending()
+        with mock.patch.object(processing, 'get_executor') as get_executor:
+            with self.captureOnCommitCallbacks() as callbacks:
+                processing.schedule_processing([media.pk])
+                get_executor.assert_not_called()
+            self.assertEqual(len(callbacks), 1)
+            callbacks[0]()
+        get_executor.return_value.submit.assert_called_once_with(
+            processing._run_in_worker, processing.process_media_file, media.pk,
+        )
+        self.assertEqual(self.status(media), MediaFile.PROCESSING_PENDING)
+
+    def test_process_pending_command(self):
+        queued = self.pending('queued.png')
+        broken = self.pending('broken.png')
+        MediaFile.objects.filter(pk=broken.pk).update(processing_status=MediaFile.PROCESSING_FAILED)
+
+        out = io.StringIO()
+        call_command('process_pending_media', stdout=out)
+        self.assertIn('Processed 1 file(s), 0 failed.', out.getvalue())
+        self.assertEqual(self.status(queued), MediaFile.PROCESSING_READY)
+        self.assertEqual(self.status(broken), MediaFile.PROCESSING_FAILED)
+
+        call_command('process_pending_media', '--retry-failed', stdout=out)
+        self.assertEqual(self.status(broken), MediaFile.PROCESSING_READY)
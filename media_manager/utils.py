@@ -0,0 +1,133 @@
+import os
+
+from django.core.files import File
+from django.utils import timezone
+
+from .metadata import file_digest
+from .models import MediaFile
+from .renditions import RENDITIONS_DIR
+
+# Directories under MEDIA_ROOT that never hold library uploads
+RECONCILE_EXCLUDED_DIRS = frozenset({RENDITIONS_DIR})
+
+
+def iter_media_paths(root, excluded_dirs=RECONCILE_EXCLUDED_DIRS):
+    """
+    Stream file paths under ``root`` as POSIX paths relative to it.
+
+    Entries are yielded depth-first in sorted order so a run can be resumed
+    from a checkpoint path. Hidden files and directories are skipped, as are
+    top-level directories listed in ``excluded_dirs``.
+    """
+    stack = ['']
+    while stack:
+        prefix = stack.pop()
+        try:
+            with os.scandir(os.path.join(root, prefix)) as it:
+                entries = sorted(it, key=lambda entry: entry.name)
+        except FileNotFoundError:
+            continue
+
+        subdirs = []
+        for entry in entries:
+            if entry.name.startswith('.'):
+                continue
+            relative_path = f"{prefix}/{entry.name}" if prefix else entry.name
+            if entry.is_dir(follow_symlinks=False):
+                if prefix or entry.name not in excluded_dirs:
+                    subdirs.append((entry.name, relative_path))
+            elif entry.is_file():
+                yield relative_path
+
+        # Files of a directory come before its subdirectories; push in
+        # reverse so subdirectories pop in sorted order.
+        for _, relative_path in reversed(subdirs):
+            stack.append(relative_path)
+
+
+def path_sort_key(relative_path):
+    """Order key matching the traversal order of iter_media_paths"""
+    *dirs, filename = relative_path.split('/')
+    return tuple((1, part) for part in dirs) + ((0, filename),)
+
+
+def verify_media_files(queryset=None, batch_size=500):
+    """
+    Check every MediaFile against storage and persist the result on the
+    integrity index (``file_exists`` / ``last_verified_at``).
+
+    Rows are streamed in batches and written back with two UPDATE queries per
+    batch, so the default manager can rely on a plain indexed filter.
+    Returns a ``(checked, missing)`` tuple.
+    """
+    if queryset is None:
+        queryset = MediaFile.objects.all_including_missing()
+
+    checked = 0
+    missing = 0
+    batch = []
+
+    def flush(rows):
+        present_ids = [pk for pk, exists in rows if exists]
+        missing_ids = [pk for pk, exists in rows if not exists]
+        now = timezone.now()
+        if present_ids:
+            MediaFile.objects.all_including_missing().filter(id__in=present_ids).update(
+                file_exists=True, last_verified_at=now
+            )
+        if missing_ids:
+            MediaFile.objects.all_including_missing().filter(id__in=missing_ids).update(
+                file_exists=False, last_verified_at=now
+            )
+        return len(missing_ids)
+
+    for obj in queryset.only('id', 'file').iterator(chunk_size=batch_size):
+        exists = bool(obj.file) and obj.file.storage.exists(obj.file.name)
+        batch.append((obj.id, exists))
+        checked += 1
+        if len(batch) >= batch_size:
+            missing += flush(batch)
+            batch = []
+
+    if batch:
+        missing += flush(batch)
+
+    return checked, missing
+
+
+def finalize_upload_session(session):
+    """
+    Turn a fully received UploadSession into a MediaFile.
+
+    The staging file is hashed once (streamed), checked against the
+    checksum the client announced, and either matched to an existing file
+    with the same content or stored as a new MediaFile. Raises ValueError
+    if the upload is incomplete or the checksum does not match.
+    """
+    if not session.is_complete:
+        raise ValueError('Upload is incomplete')
+
+    with open(session.staging_path, 'rb') as fh:
+        staged = File(fh, name=session.filename)
+        digest, size = file_digest(staged)
+        if size != session.total_size:
+            raise ValueError('Uploaded size does not match')
+        if session.sha256 and session.sha256.lower() != digest:
+            raise ValueError('Checksum mismatch')
+
+        media_file = MediaFile.objects.find_by_digest(digest)
+        if media_file is None:
+            media_file = MediaFile(
+                file=staged,
+                alt_text=os.path.splitext(session.filename)[0],
+                sha256=digest,
+                size_bytes=size,
+                processing_status=MediaFile.PROCESSING_PENDING,
+            )
+            media_file.save()
+
+    session.discard()
+    session.media_file = media_file
+    session.status = 'complete'
+    session.save(update_fields=['media_file', 'status', 'updated_at'])
+    return media_file
@@ -1,17 +1,13 @@
 
-from django.shortcuts import render, redirect
+from django.shortcuts import redirect
 from django.contrib.auth.decorators import login_required
-from .models import MediaFile
 
 
 
-@login_required
+@login_required(login_url='login')
 def media_library(request):
-    media_files = MediaFile.objects.all()
-    context = {
-        'media_files': media_files,
-    }
-    return render(request, 'media_manager/library.html', context)
+    # The library lives in the dashboard; this app has no template of its own
+    return redirect('media_library')
 
 
 
@@ -0,0 +1,23 @@
+"""Evict cached public pages when the portfolio content they show changes."""
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from utils.page_cache import invalidate_pages
+
+from .models import Project, Team, Testimonial
+
+PAGE_TAGS = {
+    Project: 'projects',
+    Testimonial: 'testimonials',
+    Team: 'team',
+}
+
+
+@receiver(post_save, sender=Project)
+@receiver(post_save, sender=Testimonial)
+@receiver(post_save, sender=Team)
+@receiver(post_delete, sender=Project)
+@receiver(post_delete, sender=Testimonial)
+@receiver(post_delete, sender=Team)
+def portfolio_content_changed(sender, **kwargs):
+    invalidate_pages(PAGE_TAGS[sender])
@@ -4,7 +4,9 @@ from .models import Project, Testimonial, Team
 from django.utils import timezone
 from django.contrib import messages
 from .utils import send_contact_email
+from utils.page_cache import cache_public_page
 
+@cache_public_page('projects', 'testimonials')
 def homepage(request):
     projects = Project.objects.filter(
         is_featured=True,
@@ -20,6 +22,7 @@ def homepage(request):
     return render(request, 'portfolio/homepage.html', context)
 
 
+@cache_public_page('team')
 def about(request):
     team_members = Team.objects.filter(is_active=True).order_by('order')
     context = {
@@ -65,10 +68,12 @@ def contact(request):
     
     return render(request, 'portfolio/contact.html')
 
+@cache_public_page()
 def services(request):
     return render(request, 'portfolio/services.html')
 
 
+@cache_public_page()
 def service_detail(request, service_slug):
     templates = {
         'web-development': 'portfolio/services/web_development.html',
@@ -88,6 +93,7 @@ def service_detail(request, service_slug):
     
     return render(request, template)
 
+@cache_public_page('projects', 'testimonials')
 def projects(request):
     featured_project = Project.objects.filter(top_rated=True).first()
     projects = Project.objects.all()
@@ -0,0 +1,89 @@
+"""
+Versioned cache namespaces.
+
+Invalidation bumps a version number stored in the default cache, so it only
+reaches the processes that read that cache. With a process-local backend
+(LocMemCache, the default when CACHES is not configured) a bump made by one
+worker is invisible to the others; caches built on these versions check
+``is_shared_cache()`` and stay off rather than serve stale content.
+"""
+import time
+
+from django.conf import settings
+from django.core import checks
+from django.core.cache import cache, caches
+from django.core.cache.backends.locmem import LocMemCache
+
+
+def _version_key(namespace):
+    return f'{namespace}:version'
+
+
+def _initial_version():
+    # Seeded from the clock so a version lost to eviction never reuses an old number
+    return int(time.time() * 1000)
+
+
+def get_cache_version(namespace):
+    """Current generation of a cache namespace"""
+    key = _version_key(namespace)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, _initial_version(), None)
+        version = cache.get(key) or _initial_version()
+    return version
+
+
+def get_cache_versions(namespaces):
+    """Current generations of several namespaces, with one cache read when all are set"""
+    keys = {_version_key(namespace): namespace for namespace in namespaces}
+    found = cache.get_many(list(keys))
+    return {
+        namespace: found[key] if key in found else get_cache_version(namespace)
+        for key, namespace in keys.items()
+    }
+
+
+def bump_cache_version(namespace):
+    """
+    Invalidate every key built with ``versioned_key(namespace, ...)``.
+
+    Old entries are not deleted; they simply stop being read and expire on
+    their own, so invalidation is a single atomic increment.
+    """
+    key = _version_key(namespace)
+    try:
+        return cache.incr(key)
+    except ValueError:
+        # The version was evicted; start a fresh generation
+        cache.add(key, _initial_version(), None)
+        return cache.incr(key)
+
+
+def versioned_key(namespace, *parts):
+    """Cache key that changes whenever the namespace is bumped"""
+    suffix = ':'.join(str(part) for part in parts)
+    return f'{namespace}:v{get_cache_version(namespace)}:{suffix}'
+
+
+def is_shared_cache():
+    """
+    Whether a version bump reaches every process serving the site: the
+    default cache is not process-local, or SINGLE_PROCESS_CACHE declares that
+    only one process serves it (runserver, a single worker).
+    """
+    if getattr(settings, 'SINGLE_PROCESS_CACHE', False):
+        return True
+    return not isinstance(caches['default'], LocMemCache)
+
+
+def check_shared_cache(app_configs, **kwargs):
+    if is_shared_cache():
+        return []
+    return [checks.Warning(
+        'The default cache is local to each process, so the page, fragment, '
+        'category, pending comment and dashboard counter caches are disabled.',
+        hint='Configure a shared cache (set REDIS_URL), or set SINGLE_PROCESS_CACHE '
+             'if only one process serves the site.',
+        id='utils.W001',
+    )]
@@ -0,0 +1,127 @@
+"""
+Full-page cache for anonymous visitors, invalidated by dependency tags.
+
+A view decorated with ``cache_public_page('projects', 'team')`` declares the
+content it displays; it can add tags known only while it runs with
+``depends_on(request, ...)``. Each cached page stores the version of every
+tag it depends on, and ``invalidate_pages('projects')`` bumps just that
+tag, so the next request for any page showing projects re-renders it while
+all other pages stay cached.
+
+Only GET and HEAD requests from anonymous visitors with no pending flash
+messages are served from or stored in the cache. Pages are keyed on the
+path plus the query parameters the view declares; other parameters (e.g.
+``utm_source``) don't split the cache. A page rendering a CSRF token is
+stored with a placeholder, and every visitor gets their own token in its
+place when it is served.
+
+The cache is off unless every process shares it; see ``utils.cache``.
+"""
+import hashlib
+import re
+from functools import wraps
+
+from django.conf import settings
+from django.contrib.messages import get_messages
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.middleware.csrf import get_token
+
+from .cache import bump_cache_version, get_cache_versions, is_shared_cache
+
+CSRF_PLACEHOLDER = b'__page_cache_csrf_token__'
+CSRF_INPUT_RE = re.compile(rb'name="csrfmiddlewaretoken" value="([^"]+)"')
+
+
+def _tag_namespace(tag):
+    return f'page-tag:{tag}'
+
+
+def invalidate_pages(*tags):
+    """Evict every cached page that depends on any of ``tags``"""
+    for tag in tags:
+        bump_cache_version(_tag_namespace(tag))
+
+
+def depends_on(request, *tags):
+    """Add dependency tags from inside a cached view"""
+    versions = getattr(request, '_page_cache_versions', None)
+    if versions is not None:
+        versions.update(tag_versions(tags))
+
+
+def tag_versions(tags):
+    versions = get_cache_versions([_tag_namespace(tag) for tag in tags])
+    return {tag: versions[_tag_namespace(tag)] for tag in tags}
+
+
+def _page_key(request, query_params):
+    query = '&'.join(
+        f'{name}={value}'
+        for name in sorted(query_params)
+        for value in request.GET.getlist(name)
+    )
+    digest = hashlib.md5(f'{request.path}?{query}'.encode()).hexdigest()
+    return f'page:{digest}'
+
+
+def _is_cacheable_request(request):
+    return (
+        request.method in ('GET', 'HEAD')
+        and not request.user.is_authenticated
+        and not len(get_messages(request))
+    )
+
+
+def _cached_response(request, entry):
+    content = entry['content']
+    if CSRF_PLACEHOLDER in content:
+        content = content.replace(CSRF_PLACEHOLDER, get_token(request).encode())
+    return HttpResponse(content, content_type=entry['content_type'], status=entry['status'])
+
+
+def _cache_entry(request, response, versions):
+    if response.status_code != 200 or response.streaming or response.cookies:
+        return None
+    if len(get_messages(request)):
+        return None
+
+    content = response.content
+    if request.META.get('CSRF_COOKIE_NEEDS_UPDATE'):
+        # Every {% csrf_token %} in a render shares one value; swap it out
+        match = CSRF_INPUT_RE.search(content)
+        if match is None:
+            return None
+        content = content.replace(match.group(1), CSRF_PLACEHOLDER)
+
+    return {
+        'content': content,
+        'content_type': response['Content-Type'],
+        'status': response.status_code,
+        'versions': versions,
+    }
+
+
+def cache_public_page(*tags, query_params=()):
+    """Cache a view's page for anonymous visitors until one of ``tags`` is invalidated"""
+    def decorator(view_func):
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            timeout = getattr(settings, 'PAGE_CACHE_TIMEOUT', 10 * 60)
+            if not timeout or not is_shared_cache() or not _is_cacheable_request(request):
+                return view_func(request, *args, **kwargs)
+
+            key = _page_key(request, query_params)
+            entry = cache.get(key)
+            if entry is not None and tag_versions(entry['versions']) == entry['versions']:
+                return _cached_response(request, entry)
+
+            # Read versions before rendering, so a change made meanwhile isn't masked
+            request._page_cache_versions = tag_versions(tags)
+            response = view_func(request, *args, **kwargs)
+            entry = _cache_entry(request, response, request._page_cache_versions)
+            if entry is not None:
+                cache.set(key, entry, timeout)
+            return response
+        return wrapper
+    return decorator
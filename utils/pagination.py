@@ -0,0 +1,235 @@
+"""
+Keyset ("cursor") pagination.
+
+``django.core.paginator.Paginator`` pages with ``COUNT(*)`` and ``OFFSET``,
+and both read every row before the page, so deep pages of a big table get
+slower and slower. ``CursorPaginator`` instead remembers the sort key of the
+first and last rows shown, e.g. ``(created_at, id)``, and asks for the rows
+just after (or before) them, which the listing indexes answer directly at
+any depth. The total is optional and, on PostgreSQL, estimated.
+
+Cursors are opaque URL-safe strings. A malformed cursor, including an old
+page number, gives the first page.
+
+Ranked search results are sorted by a float similarity, which can't be a
+cursor; ``paginate()`` pages those, already narrowed to the matches, by
+offset instead.
+"""
+import base64
+import binascii
+import datetime
+import decimal
+import json
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import FloatField, Q
+from django.utils.functional import cached_property
+
+# Below this many estimated rows an exact COUNT(*) is cheap and more useful
+EXACT_COUNT_BELOW = 1000
+
+
+def estimated_count(queryset, exact_below=EXACT_COUNT_BELOW):
+    """
+    Number of rows in ``queryset``.
+
+    On PostgreSQL a large result is not counted but estimated: from
+    ``pg_class.reltuples`` for a whole table, from the planner's row
+    estimate for a filtered queryset. Small results, and other databases,
+    get an exact count.
+    """
+    connection = connections[queryset.db]
+    if connection.vendor != 'postgresql':
+        return queryset.count()
+
+    with connection.cursor() as cursor:
+        if not queryset.query.where:
+            cursor.execute(
+                'SELECT reltuples FROM pg_class WHERE oid = %s::regclass',
+                [queryset.model._meta.db_table],
+            )
+            row = cursor.fetchone()
+            # -1 until the table has been vacuumed or analyzed
+            estimate = row[0] if row else -1
+        else:
+            sql, params = queryset.order_by().query.sql_with_params()
+            cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+            plan = cursor.fetchone()[0]
+            if isinstance(plan, str):
+                plan = json.loads(plan)
+            estimate = plan[0]['Plan']['Plan Rows']
+
+    if estimate < exact_below:
+        return queryset.count()
+    return int(estimate)
+
+
+def _encode(value):
+    if isinstance(value, (datetime.date, datetime.time)):
+        return value.isoformat()
+    if isinstance(value, (decimal.Decimal, datetime.timedelta)):
+        return str(value)
+    return value
+
+
+class CursorPage:
+    """One page of a CursorPaginator, shaped like a Paginator page for templates"""
+
+    def __init__(self, object_list, paginator, next_cursor=None, previous_cursor=None):
+        self.object_list = object_list
+        self.paginator = paginator
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __repr__(self):
+        return f'<CursorPage of {len(self.object_list)} objects>'
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+class CursorPaginator:
+    """
+    Pages through ``queryset`` in the order it is already sorted by.
+
+    The sort fields must be non-null columns of the model itself: not
+    relations, not annotations (which can't be filtered on reliably once
+    the queryset is sliced or combined) and not floats (which don't survive
+    the round trip through the cursor exactly, so rows at the page boundary
+    are repeated or skipped). The primary key is appended as a tie-breaker
+    unless it is already part of the ordering.
+    """
+
+    def __init__(self, queryset, per_page, ordering=None):
+        ordering = list(ordering or queryset.query.order_by or queryset.model._meta.ordering)
+        if not all(isinstance(name, str) for name in ordering):
+            raise ValueError('CursorPaginator only supports field names in the ordering.')
+        if not any(name.lstrip('-') in ('pk', queryset.model._meta.pk.name) for name in ordering):
+            ordering.append('-pk' if ordering and ordering[-1].startswith('-') else 'pk')
+
+        self.queryset = queryset.order_by(*ordering)
+        self.per_page = int(per_page)
+        self.keys = [(name.lstrip('-'), name.startswith('-')) for name in ordering]
+        for name, _ in self.keys:
+            self._key_field(name)
+
+    @cached_property
+    def count(self):
+        """Total number of objects, estimated for large PostgreSQL results"""
+        return estimated_count(self.queryset)
+
+    def get_page(self, cursor=None):
+        """The page after (or before) ``cursor``; the first page if it is missing or invalid"""
+        position = self.decode_cursor(cursor) if cursor else None
+        if position is None:
+            return self._page_after(None, has_previous=False)
+        backwards, values = position
+        if backwards:
+            return self._page_before(values)
+        return self._page_after(values, has_previous=True)
+
+    def _page_after(self, values, has_previous):
+        queryset = self.queryset if values is None else self.queryset.filter(self._beyond(values))
+        rows = list(queryset[:self.per_page + 1])
+        has_next = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        return CursorPage(
+            rows, self,
+            next_cursor=self.encode_cursor(rows[-1]) if has_next else None,
+            previous_cursor=self.encode_cursor(rows[0], backwards=True) if has_previous and rows else None,
+        )
+
+    def _page_before(self, values):
+        # Walk backwards with the ordering reversed, then restore it
+        reversed_order = [name if descending else f'-{name}' for name, descending in self.keys]
+        queryset = self.queryset.filter(self._beyond(values, backwards=True)).order_by(*reversed_order)
+        rows = list(queryset[:self.per_page + 1])
+        has_previous = len(rows) > self.per_page
+        rows = rows[:self.per_page][::-1]
+        if not rows:
+            return self._page_after(None, has_previous=False)
+        return CursorPage(
+            rows, self,
+            next_cursor=self.encode_cursor(rows[-1]),
+            previous_cursor=self.encode_cursor(rows[0], backwards=True) if has_previous else None,
+        )
+
+    def _beyond(self, values, backwards=False):
+        """Rows sorted after ``values``, or before them when walking ``backwards``"""
+        condition = Q()
+        for position, (name, descending) in enumerate(self.keys):
+            lookup = 'lt' if descending != backwards else 'gt'
+            term = Q(**{f'{name}__{lookup}': values[position]})
+            for earlier, (earlier_name, _) in enumerate(self.keys[:position]):
+                term &= Q(**{earlier_name: values[earlier]})
+            condition |= term
+        # Redundant, but lets the database use a range scan on the leading key
+        name, descending = self.keys[0]
+        lookup = 'lte' if descending != backwards else 'gte'
+        return Q(**{f'{name}__{lookup}': values[0]}) & condition
+
+    def encode_cursor(self, obj, backwards=False):
+        values = [_encode(getattr(obj, name)) for name, _ in self.keys]
+        payload = json.dumps([int(backwards), values], separators=(',', ':'))
+        return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+    def decode_cursor(self, cursor):
+        """(backwards, key values) for a cursor, or None if it isn't one of ours"""
+        try:
+            padded = cursor + '=' * (-len(cursor) % 4)
+            backwards, values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+            if len(values) != len(self.keys):
+                return None
+            return bool(backwards), [self._key_field(name).to_python(value) for (name, _), value in zip(self.keys, values)]
+        except (binascii.Error, UnicodeError, ValueError, TypeError, ValidationError):
+            return None
+
+    def _key_field(self, name):
+        query = self.queryset.query
+        if name in query.annotations:
+            raise ValueError(f'Cannot paginate on the annotation {name!r}.')
+        if name == 'pk':
+            return query.get_meta().pk
+        try:
+            field = query.get_meta().get_field(name)
+        except FieldDoesNotExist:
+            raise ValueError(f'Cannot paginate on {name!r}.')
+        if field.is_relation or not field.concrete or isinstance(field, FloatField):
+            raise ValueError(f'Cannot paginate on {name!r}.')
+        return field
+
+
+def paginate(queryset, per_page, page=None, keyset=True):
+    """
+    One page of ``queryset`` as ``(page, previous, next)``.
+
+    ``previous`` and ``next`` are the ``page`` parameter values of the
+    neighbouring pages, or None: cursors when ``keyset`` is true, page
+    numbers otherwise. ``page.paginator.count`` is the total either way.
+    """
+    if keyset:
+        current = CursorPaginator(queryset, per_page).get_page(page)
+        return current, current.previous_cursor, current.next_cursor
+    current = Paginator(queryset, per_page).get_page(page)
+    return (
+        current,
+        current.previous_page_number() if current.has_previous() else None,
+        current.next_page_number() if current.has_next() else None,
+    )
@@ -0,0 +1,28 @@
+import shutil
+import tempfile
+from pathlib import Path
+
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings
+
+
+class TestRunner(DiscoverRunner):
+    """
+    Keeps files written during a test run (the search index) out of the
+    project. Tests run in one process, so the local memory cache may back
+    the version-invalidated caches.
+    """
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self._search_index_dir = tempfile.mkdtemp(prefix='search_index-')
+        self._settings = override_settings(
+            SEARCH_INDEX_PATH=Path(self._search_index_dir) / 'posts.idx',
+            SINGLE_PROCESS_CACHE=True,
+        )
+        self._settings.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        self._settings.disable()
+        shutil.rmtree(self._search_index_dir, ignore_errors=True)
+        super().teardown_test_environment(**kwargs)